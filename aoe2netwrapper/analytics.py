@@ -0,0 +1,440 @@
+"""
+aoe2netwrapper.analytics
+------------------------
+
+This module implements vectorized statistics over rating histories: rolling win rate, rating volatility,
+peak and drawdown, streak distributions and games per day, computed for many players at once, and the
+alignment of a player's series on different leaderboards on a common timeline. Missing values of rating
+points are carried over from the previous point of their series.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+
+from loguru import logger
+
+try:
+    import numpy as np
+    import pandas as pd
+except ImportError as error:
+    logger.error("User tried to use the 'analytics' submodule without the 'pandas' library.")
+    msg = "The 'analytics' submodule requires the 'pandas' library to function."
+    raise NotImplementedError(msg) from error
+
+from aoe2netwrapper.timeseries import RatingSeriesStore
+
+# Columns identifying a series in a batch, used to group rows when present and 'by' is not given
+_SERIES_COLUMNS: tuple[str, ...] = ("profile_id", "leaderboard_id")
+_REQUIRED_COLUMNS: tuple[str, ...] = ("rating", "num_wins", "num_losses", "streak")
+
+
+def rating_frame(store: RatingSeriesStore, keys: Iterable[tuple[int, int]] | None = None) -> pd.DataFrame:
+    """
+    Gather series of a RatingSeriesStore into a single DataFrame, with 'profile_id' and 'leaderboard_id'
+    columns identifying each series, ready for the functions of this module.
+
+    Args:
+        store (RatingSeriesStore): the store holding the series.
+        keys (Iterable[tuple[int, int]]): Optional. The (profile_id, leaderboard_id) pairs of the series
+            to gather. Defaults to all series of the store.
+
+    Returns:
+        A pandas DataFrame with one row per rating point, in chronological order within each series,
+        and the 'timestamp' column of the points converted to a 'time' column of datetime objects.
+        Columns with missing values are floats, with NaN where values are missing.
+    """
+    keys = store.keys() if keys is None else list(keys)
+    logger.debug(f"Gathering {len(keys)} series from rating store")
+    series = [store.series(profile_id, leaderboard_id) for profile_id, leaderboard_id in keys]
+    lengths = np.array([len(arrays["timestamp"]) for arrays in series], dtype=np.int64)
+    profile_ids = np.array([key[0] for key in keys], dtype=np.int64)
+    leaderboard_ids = np.array([key[1] for key in keys], dtype=np.int64)
+
+    columns = {}
+    for column in ("rating", "num_wins", "num_losses", "streak", "drops", "timestamp"):
+        values = np.ma.concatenate([arrays[column] for arrays in series] or [np.empty(0, np.int64)])
+        columns[column] = values.astype(float).filled(np.nan) if np.ma.is_masked(values) else values.data
+    dframe = pd.DataFrame(
+        {
+            "profile_id": np.repeat(profile_ids, lengths),
+            "leaderboard_id": np.repeat(leaderboard_ids, lengths),
+            **columns,
+        }
+    )
+    dframe["time"] = pd.to_datetime(dframe["timestamp"], unit="s")
+    return dframe.drop(columns=["timestamp"])
+
+
+def rolling_win_rate(dframe: pd.DataFrame, window: int = 20, by: list[str] | None = None) -> pd.Series:
+    """
+    Compute the win rate over the last games of each rating point, from the increments of the
+    'num_wins' and 'num_losses' counters between consecutive points of a series. The first point of a
+    series has no previous counters, and its game is not counted.
+
+    Args:
+        dframe (pd.DataFrame): rating points, as output by 'Convert.rating_history' or 'rating_frame'.
+            Rows can be in any order.
+        window (int): Number of rating points in the rolling window. Defaults to 20.
+        by (list[str]): Optional. Columns identifying the series of a batch. Defaults to those of
+            'profile_id' and 'leaderboard_id' present in the DataFrame, or a single series if none is.
+
+    Returns:
+        A pandas Series of win rates between 0 and 1 aligned on the rows of the DataFrame, NaN where no
+        game was counted in the window.
+    """
+    layout = _SeriesLayout(dframe, by)
+    wins = np.clip(layout.deltas("num_wins"), 0, None)
+    games = wins + np.clip(layout.deltas("num_losses"), 0, None)
+    window_wins, _ = layout.rolling_sum(wins, window)
+    window_games, _ = layout.rolling_sum(games, window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rates = np.where(window_games > 0, window_wins / window_games, np.nan)
+    return layout.unsort(rates, name="win_rate")
+
+
+def rolling_volatility(dframe: pd.DataFrame, window: int = 20, by: list[str] | None = None) -> pd.Series:
+    """
+    Compute the standard deviation of the rating changes over the last games of each rating point.
+
+    Args:
+        dframe (pd.DataFrame): rating points, as output by 'Convert.rating_history' or 'rating_frame'.
+            Rows can be in any order.
+        window (int): Number of rating points in the rolling window. Defaults to 20.
+        by (list[str]): Optional. Columns identifying the series of a batch, see 'rolling_win_rate'.
+
+    Returns:
+        A pandas Series of sample standard deviations aligned on the rows of the DataFrame, NaN where
+        fewer than two rating changes are in the window.
+    """
+    layout = _SeriesLayout(dframe, by)
+    changes = layout.deltas("rating")
+    counted = layout.has_previous.astype(np.int64)  # the first point of a series has no change
+    sums, _ = layout.rolling_sum(changes, window)
+    squares, _ = layout.rolling_sum(changes * changes, window)
+    counts, _ = layout.rolling_sum(counted, window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        variances = (squares - sums * sums / counts) / (counts - 1)
+    volatility = np.where(counts > 1, np.sqrt(np.clip(variances, 0, None)), np.nan)
+    return layout.unsort(volatility, name="volatility")
+
+
+def drawdown(dframe: pd.DataFrame, by: list[str] | None = None) -> pd.DataFrame:
+    """
+    Compute the peak rating reached so far at each rating point, and how far below it the rating is.
+
+    Args:
+        dframe (pd.DataFrame): rating points, as output by 'Convert.rating_history' or 'rating_frame'.
+            Rows can be in any order.
+        by (list[str]): Optional. Columns identifying the series of a batch, see 'rolling_win_rate'.
+
+    Returns:
+        A pandas DataFrame aligned on the rows of the input, with the running 'peak' rating and the
+        'drawdown' from it (0 at a new peak).
+    """
+    layout = _SeriesLayout(dframe, by)
+    ratings = layout.column("rating")
+    peaks = pd.Series(ratings).groupby(layout.groups).cummax().to_numpy()
+    return pd.DataFrame(
+        {
+            "peak": layout.unsort(peaks).to_numpy(),
+            "drawdown": layout.unsort(peaks - ratings).to_numpy(),
+        },
+        index=dframe.index,
+    )
+
+
+def streak_distribution(dframe: pd.DataFrame, by: list[str] | None = None) -> pd.DataFrame:
+    """
+    Count the streaks of each length in each series, from the 'streak' column of the rating points
+    (positive for wins, negative for losses). A streak ends at the point after which the streak does
+    not keep growing with the same sign. The streak ongoing at the last point of a series is counted.
+
+    Args:
+        dframe (pd.DataFrame): rating points, as output by 'Convert.rating_history' or 'rating_frame'.
+            Rows can be in any order.
+        by (list[str]): Optional. Columns identifying the series of a batch, see 'rolling_win_rate'.
+
+    Returns:
+        A pandas DataFrame with the columns identifying the series, the signed 'streak' length and the
+        'count' of streaks of this length, sorted by series then streak.
+    """
+    layout = _SeriesLayout(dframe, by)
+    streaks = layout.column("streak")
+    following = np.append(streaks[1:], 0)
+    continued = (
+        np.append(layout.groups[1:] == layout.groups[:-1], False)
+        & (np.sign(following) == np.sign(streaks))
+        & (np.abs(following) > np.abs(streaks))
+    )
+    ends = ~continued & (streaks != 0)
+
+    ended = layout.series_columns().iloc[np.flatnonzero(ends)].reset_index(drop=True)
+    ended["streak"] = streaks[ends]
+    return ended.groupby([*layout.by, "streak"], sort=True).size().rename("count").reset_index()
+
+
+def games_per_day(dframe: pd.DataFrame, by: list[str] | None = None) -> pd.Series:
+    """
+    Count the games played each day, from the increments of the 'num_wins' and 'num_losses' counters
+    between consecutive points. The first point of a series counts for a single game.
+
+    Args:
+        dframe (pd.DataFrame): rating points, as output by 'Convert.rating_history' or 'rating_frame'.
+            Rows can be in any order.
+        by (list[str]): Optional. Columns identifying the series of a batch, see 'rolling_win_rate'.
+
+    Returns:
+        A pandas Series of game counts indexed by the columns identifying the series and the 'day',
+        for days with at least one game.
+    """
+    layout = _SeriesLayout(dframe, by)
+    days = layout.series_columns()
+    days["day"] = pd.to_datetime(layout.timestamps, unit="s").floor("D")
+    days["games"] = layout.games()
+    return days.groupby([*layout.by, "day"], sort=True)["games"].sum()
+
+
+def summary(dframe: pd.DataFrame, by: list[str] | None = None) -> pd.DataFrame:
+    """
+    Summarize each series of rating points in a single row, for reports across many players.
+
+    Args:
+        dframe (pd.DataFrame): rating points, as output by 'Convert.rating_history' or 'rating_frame'.
+            Rows can be in any order.
+        by (list[str]): Optional. Columns identifying the series of a batch, see 'rolling_win_rate'.
+
+    Returns:
+        A pandas DataFrame indexed by the columns identifying the series (a single unnamed row if there
+        are none), with the number of 'games', the 'win_rate' over the counted games, the last 'rating',
+        its 'peak' and the 'max_drawdown' from a peak, the 'volatility' of the rating changes, the
+        longest win and loss streaks, the number of 'active_days' and the 'first_time' and 'last_time'
+        of the series.
+    """
+    layout = _SeriesLayout(dframe, by)
+    ratings = layout.column("rating")
+    wins = np.clip(layout.deltas("num_wins"), 0, None)
+    peaks = pd.Series(ratings).groupby(layout.groups).cummax().to_numpy()
+    changes = layout.deltas("rating").astype(float)
+    changes[~layout.has_previous] = np.nan  # the first point of a series has no change
+    streaks = layout.column("streak")
+
+    columns = pd.DataFrame(
+        {
+            "group": layout.groups,
+            "games": layout.games(),
+            "wins": wins,
+            "counted": wins + np.clip(layout.deltas("num_losses"), 0, None),
+            "rating": ratings,
+            "peak": peaks,
+            "drawdown": peaks - ratings,
+            "change": changes,
+            "win_streak": np.clip(streaks, 0, None),
+            "loss_streak": np.clip(-streaks, 0, None),
+            "day": layout.timestamps // 86_400,
+            "time": pd.to_datetime(layout.timestamps, unit="s"),
+        }
+    )
+    grouped = columns.groupby("group", sort=True)
+    result = grouped.agg(
+        games=("games", "sum"),
+        wins=("wins", "sum"),
+        counted=("counted", "sum"),
+        rating=("rating", "last"),
+        peak=("peak", "last"),
+        max_drawdown=("drawdown", "max"),
+        volatility=("change", "std"),
+        longest_win_streak=("win_streak", "max"),
+        longest_loss_streak=("loss_streak", "max"),
+        active_days=("day", "nunique"),
+        first_time=("time", "first"),
+        last_time=("time", "last"),
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        win_rates = np.where(result["counted"] > 0, result["wins"] / result["counted"], np.nan)
+    result.insert(1, "win_rate", win_rates)
+    result = result.drop(columns=["wins", "counted"])
+
+    keys = layout.series_columns().iloc[layout.starts]
+    if len(layout.by) > 1:
+        result.index = pd.MultiIndex.from_frame(keys)
+    elif layout.by:
+        result.index = pd.Index(keys[layout.by[0]], name=layout.by[0])
+    else:
+        result.index = pd.RangeIndex(len(result))
+    return result
+
+
+def align_leaderboards(
+    dframe: pd.DataFrame,
+    freq: str = "D",
+    leaderboard_ids: Iterable[int] | None = None,
+    columns: Iterable[str] = ("rating",),
+    tolerance: str | pd.Timedelta | None = None,
+) -> pd.DataFrame:
+    """
+    Align the rating series of players on several leaderboards on a common timeline of time buckets,
+    to chart them together. Each player gets one row per bucket from their first to their last rating
+    point on any of the leaderboards, holding the last known value on each leaderboard as of the end
+    of the bucket. All players and leaderboards are aligned at once, with a single as-of join.
+
+    Args:
+        dframe (pd.DataFrame): rating points with 'profile_id' and 'leaderboard_id' columns, as output
+            by 'rating_frame'. Rows can be in any order.
+        freq (str): The pandas period frequency of the time buckets, for instance 'D' for daily or 'W'
+            for weekly (Monday to Sunday) buckets. Defaults to 'D'.
+        leaderboard_ids (Iterable[int]): Optional. The leaderboards to align, in the order of the
+            output's columns. Defaults to all leaderboards of the DataFrame, sorted.
+        columns (Iterable[str]): The columns of the rating points to align. Defaults to ('rating',).
+        tolerance (str | pd.Timedelta): Optional. How long a value is carried over buckets without a new
+            rating point on its leaderboard (ex: '30D'). Defaults to no limit.
+
+    Raises:
+        ValueError: if the DataFrame misses a column.
+
+    Returns:
+        A pandas DataFrame indexed by 'profile_id' and 'time', the start of each bucket, with a column
+        per aligned column and leaderboard ('leaderboard_id' level). Values are NaN before a player's
+        first rating point on a leaderboard.
+    """
+    columns = list(columns)
+    missing = [column for column in (*_SERIES_COLUMNS, *columns) if column not in dframe.columns]
+    if "time" not in dframe.columns and "timestamp" not in dframe.columns:
+        missing.append("time")
+    if missing:
+        logger.error(f"Rating points are missing columns {missing}")
+        msg = f"Provided DataFrame should have the columns {missing} of rating points."
+        raise ValueError(msg)
+
+    times = pd.to_datetime(dframe["timestamp"], unit="s") if "timestamp" in dframe.columns else dframe["time"]
+    points = pd.DataFrame(
+        {
+            "profile_id": dframe["profile_id"].to_numpy(dtype=np.int64),
+            "leaderboard_id": dframe["leaderboard_id"].to_numpy(dtype=np.int64),
+            "time": times.to_numpy(dtype="datetime64[ns]"),
+            **{column: dframe[column].to_numpy() for column in columns},
+        }
+    )
+    if leaderboard_ids is not None:
+        leaderboards = list(dict.fromkeys(leaderboard_ids))
+        points = points[points["leaderboard_id"].isin(leaderboards)]
+    else:
+        leaderboards = sorted(points["leaderboard_id"].unique().tolist())
+    logger.debug(f"Aligning {len(points)} rating points on leaderboards {leaderboards} by '{freq}' buckets")
+
+    # One bucket per period from each player's first to last rating point, built from period ordinals
+    ordinals = pd.PeriodIndex(points["time"].dt.to_period(freq)).asi8
+    spans = pd.Series(ordinals, index=points["profile_id"].to_numpy()).groupby(level=0).agg(["min", "max"])
+    lengths = (spans["max"] - spans["min"] + 1).to_numpy()
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    starts = np.repeat(spans["min"].to_numpy(), lengths)
+    buckets = pd.PeriodIndex(pd.arrays.PeriodArray(starts + offsets, dtype=pd.PeriodDtype(freq)))
+    grid = pd.DataFrame(
+        {
+            "profile_id": np.repeat(spans.index.to_numpy(dtype=np.int64), lengths),
+            "bucket": buckets.start_time,
+            "end": buckets.end_time,
+        }
+    ).merge(pd.DataFrame({"leaderboard_id": np.array(leaderboards, dtype=np.int64)}), how="cross")
+
+    aligned = pd.merge_asof(
+        grid.sort_values("end", kind="stable"),
+        points.sort_values("time", kind="stable"),
+        left_on="end",
+        right_on="time",
+        by=["profile_id", "leaderboard_id"],
+        tolerance=None if tolerance is None else pd.Timedelta(tolerance),
+        direction="backward",
+    )
+    result = aligned.set_index(["profile_id", "bucket", "leaderboard_id"])[columns].unstack("leaderboard_id")
+    result = result.reindex(
+        columns=pd.MultiIndex.from_product([columns, leaderboards], names=[None, "leaderboard_id"])
+    )
+    result.index = result.index.set_names(["profile_id", "time"])
+    return result.sort_index()
+
+
+# ----- Helpers ----- #
+
+
+class _SeriesLayout:
+    """
+    The rows of a batch of rating series sorted by series then time, with the boundaries of each series,
+    so that per-series computations are single passes over flat arrays instead of loops over series.
+    """
+
+    def __init__(self, dframe: pd.DataFrame, by: list[str] | None = None):
+        missing = [column for column in _REQUIRED_COLUMNS if column not in dframe.columns]
+        if "time" not in dframe.columns and "timestamp" not in dframe.columns:
+            missing.append("time")
+        if missing:
+            logger.error(f"Rating points are missing columns {missing}")
+            msg = f"Provided DataFrame should have the columns {missing} of rating points."
+            raise ValueError(msg)
+
+        self.dframe = dframe
+        self.by = list(by) if by is not None else [col for col in _SERIES_COLUMNS if col in dframe.columns]
+        if "timestamp" in dframe.columns:
+            timestamps = dframe["timestamp"].to_numpy(dtype=np.int64)
+        else:
+            timestamps = dframe["time"].to_numpy(dtype="datetime64[s]").astype(np.int64)
+        codes = (
+            dframe.groupby(self.by, sort=True).ngroup().to_numpy(dtype=np.int64)
+            if self.by
+            else np.zeros(len(dframe), dtype=np.int64)
+        )
+
+        self.order = np.lexsort((timestamps, codes))
+        self.timestamps = timestamps[self.order]
+        self.groups = codes[self.order]
+        self.has_previous = np.append(False, self.groups[1:] == self.groups[:-1])
+        self.starts = np.flatnonzero(~self.has_previous)
+        # Position of the first point of its series, for each point
+        self.first = np.repeat(self.starts, np.diff(np.append(self.starts, len(self.groups))))
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        The values of a column, sorted by series then time. Missing values (NaN or <NA>, as in compact
+        frames) are carried over from the previous point of the series, or are 0 at its start.
+        """
+        values = self.dframe[name].iloc[self.order]
+        if values.isna().any():
+            values = values.groupby(self.groups).ffill().fillna(0)
+        return values.to_numpy(dtype=np.int64)
+
+    def series_columns(self) -> pd.DataFrame:
+        """The columns identifying the series, sorted by series then time, with a fresh index."""
+        return self.dframe[self.by].iloc[self.order].reset_index(drop=True)
+
+    def deltas(self, name: str) -> np.ndarray:
+        """The increments of a column from the previous point of the series, 0 at their first point."""
+        values = self.column(name)
+        increments = np.diff(values, prepend=values[:1])
+        increments[~self.has_previous] = 0
+        return increments
+
+    def games(self) -> np.ndarray:
+        """The number of games played up to each point since the previous one, 1 at the first point."""
+        played = np.clip(self.deltas("num_wins"), 0, None) + np.clip(self.deltas("num_losses"), 0, None)
+        played[~self.has_previous] = 1
+        return played
+
+    def rolling_sum(self, values: np.ndarray, window: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Sums of values over a trailing window of points, not crossing the start of a series, from the
+        differences of a single cumulative sum. Also returns the number of points in each window.
+        """
+        if window < 1:
+            logger.error(f"Invalid rolling window of {window} points")
+            msg = "The rolling window should hold at least 1 point."
+            raise ValueError(msg)
+        cumulative = np.concatenate(([0], np.cumsum(values)))
+        positions = np.arange(len(values))
+        lower = np.maximum(positions + 1 - window, self.first)
+        return cumulative[positions + 1] - cumulative[lower], positions + 1 - lower
+
+    def unsort(self, values: np.ndarray, name: str | None = None) -> pd.Series:
+        """Put values computed on the sorted points back in the order of the DataFrame's rows."""
+        unsorted = np.empty_like(values)
+        unsorted[self.order] = values
+        return pd.Series(unsorted, index=self.dframe.index, name=name)
@@ -7,7 +7,8 @@ This module implements a high-level client to query the API at https://aoe2.net/
 
 from __future__ import annotations
 
-from typing import Any
+from collections.abc import Iterator
+from typing import TYPE_CHECKING, Any
 
 import requests
 
@@ -24,6 +25,9 @@ from aoe2netwrapper.models import (
     StringsResponse,
 )
 
+if TYPE_CHECKING:
+    from aoe2netwrapper.resolver import ProfileResolver
+
 _MAX_LEADERBOARD_COUNT: int = 10_000
 _MAX_MATCH_HISTORY_COUNT: int = 1_000
 _MAX_RATING_HISTORY_COUNT: int = 10_000
@@ -52,10 +56,20 @@ class AoE2NetAPI:
     _MATCH_ENDPOINT: str = _API_BASE_URL + "/match"
     _NUMBER_ONLINE_ENDPOINT: str = _API_BASE_URL + "/stats/players"
 
-    def __init__(self, timeout: float | tuple[float, float] = 5):
-        """Creating a Session for connection pooling since we're always querying the same host."""
+    def __init__(self, timeout: float | tuple[float, float] = 5, resolver: ProfileResolver | None = None):
+        """
+        Creating a Session for connection pooling since we're always querying the same host.
+
+        Args:
+            timeout (float | tuple[float, float]): Timeout of the requests, in seconds. Defaults to 5.
+            resolver (ProfileResolver): Optional. A cache of player names resolved to profile IDs, to
+                send 'leaderboard' queries by 'search' as queries by 'profile_id'. These then return
+                the entry of the player the name designates only, rather than of every player whose
+                name matches the search. Queries are sent as given if not provided.
+        """
         self.session = requests.Session()
         self.timeout = timeout
+        self.resolver = resolver
 
     def __repr__(self) -> str:
         return f"Client for <{self._API_BASE_URL}>"
@@ -109,6 +123,7 @@ class AoE2NetAPI:
             count (int): Number of leaderboard entries to get (warning: must be 10000 or less).
                 Defaults to 10.
             search (str): Optional. To perform the search for a specific player, from their name.
+                Sent as the resolved 'profile_id' if the client has a resolver.
             steam_id (int): Optional. To perform the search for a specific player, from their
                 steamID64 (ex: 76561199003184910).
             profile_id (int): Optional. To perform the search for a specific player, from their
@@ -137,6 +152,8 @@ class AoE2NetAPI:
             "steam_id": steam_id,
             "profile_id": profile_id,
         }
+        if self.resolver is not None:
+            query_params = self.resolver.rewrite(query_params)
 
         processed_response = _get_request_response_json(
             session=self.session,
@@ -482,3 +499,38 @@ def _get_request_response_json(
         msg = f"Expected status code 200 - got {response.status_code} instead"
         raise Aoe2NetError(msg)
     return response.json()
+
+
+def _iter_leaderboard_pages(
+    client: AoE2NetAPI,
+    game: str = "aoe2de",
+    leaderboard_id: int = 3,
+    page_size: int = _MAX_LEADERBOARD_COUNT,
+    max_entries: int | None = None,
+) -> Iterator[LeaderBoardResponse]:
+    """
+    Page through the leaderboard API endpoint from the top rank, until the end of the leaderboard or
+    until 'max_entries' entries were received.
+
+    Args:
+        client (AoE2NetAPI): the client to query the API with.
+        game (str): The game for which to query the leaderboard. Defaults to 'aoe2de'.
+        leaderboard_id (int): Leaderboard to query. Defaults to 3.
+        page_size (int): Number of entries to request per call. Defaults to 10 000.
+        max_entries (int): Optional. Maximum number of entries to receive.
+
+    Yields:
+        The LeaderBoardResponse of each page.
+    """
+    start, received = 1, 0
+    while max_entries is None or received < max_entries:
+        count = page_size if max_entries is None else min(page_size, max_entries - received)
+        page = client.leaderboard(game=game, leaderboard_id=leaderboard_id, start=start, count=count)
+        entries = len(page.leaderboard or [])
+        if not entries:
+            return
+        yield page
+        received += entries
+        start += entries
+        if page.total is not None and start > page.total:
+            return
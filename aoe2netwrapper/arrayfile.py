@@ -0,0 +1,102 @@
+"""
+aoe2netwrapper.arrayfile
+------------------------
+
+This module implements the single-file layout shared by the rating series store and leaderboard
+snapshots: named NumPy arrays written at aligned offsets after a JSON header, and memory-mapped when read.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+
+from pathlib import Path
+
+from loguru import logger
+
+try:
+    import numpy as np
+except ImportError as error:
+    logger.error("User tried to use the 'arrayfile' submodule without the 'numpy' library.")
+    msg = "The 'arrayfile' submodule requires the 'numpy' library to function."
+    raise NotImplementedError(msg) from error
+
+_ALIGNMENT: int = 64
+
+
+def write_arrays(
+    arrays: dict[str, np.ndarray], path: Path, magic: bytes, metadata: dict | None = None
+) -> None:
+    """
+    Write arrays to a single file made of a magic string, the length of a JSON header describing each
+    array's dtype, offset and length (as well as optional metadata), the header itself, then the arrays
+    at aligned offsets. The file is written under a temporary name then atomically renamed.
+
+    Args:
+        arrays (dict[str, np.ndarray]): the one-dimensional arrays to write, by name.
+        path (Path): the file to write to.
+        magic (bytes): the 8 bytes identifying the file format.
+        metadata (dict): Optional. JSON-serializable metadata to store in the header.
+    """
+    specs: dict[str, dict] = {}
+    offset = 0
+    for name, values in arrays.items():
+        dtype = values.dtype.descr if values.dtype.names else values.dtype.str
+        specs[name] = {"dtype": dtype, "offset": offset, "length": len(values)}
+        offset += _aligned(values.nbytes)
+    header_bytes = json.dumps({"arrays": specs, "metadata": metadata or {}}).encode()
+    data_start = _aligned(len(magic) + 8 + len(header_bytes))
+
+    temporary = path.with_name(f".{path.name}.tmp")
+    with temporary.open("wb") as fileobj:
+        fileobj.write(magic + len(header_bytes).to_bytes(8, "little") + header_bytes)
+        for name, values in arrays.items():
+            fileobj.seek(data_start + specs[name]["offset"])
+            fileobj.write(values.tobytes())
+        fileobj.truncate(data_start + offset)
+    os.replace(temporary, path)
+
+
+def map_arrays(path: Path, magic: bytes) -> tuple[dict[str, np.ndarray], dict]:
+    """
+    Memory-map (read-only) the arrays of a file written by 'write_arrays'.
+
+    Args:
+        path (Path): the file to read.
+        magic (bytes): the 8 bytes identifying the expected file format.
+
+    Raises:
+        ValueError: if the file does not start with the expected magic string.
+
+    Returns:
+        A tuple of the memory-mapped arrays, by name, and of the metadata stored in the header.
+    """
+    with path.open("rb") as fileobj:
+        if fileobj.read(len(magic)) != magic:
+            logger.error(f"File at '{path}' is not of the expected format")
+            msg = f"Invalid file format, expected a file starting with {magic!r}."
+            raise ValueError(msg)
+        header_length = int.from_bytes(fileobj.read(8), "little")
+        header = json.loads(fileobj.read(header_length))
+    data_start = _aligned(len(magic) + 8 + header_length)
+
+    arrays = {}
+    for name, spec in header["arrays"].items():
+        structured = isinstance(spec["dtype"], list)  # structured dtypes are described as lists of fields
+        dtype = np.dtype([tuple(field) for field in spec["dtype"]] if structured else spec["dtype"])
+        if spec["length"] == 0:  # zero-length mappings are not allowed
+            arrays[name] = np.empty(0, dtype=dtype)
+            continue
+        arrays[name] = np.memmap(
+            path, dtype=dtype, mode="r", offset=data_start + spec["offset"], shape=(spec["length"],)
+        )
+    return arrays, header["metadata"]
+
+
+# ----- Helpers ----- #
+
+
+def _aligned(size: int) -> int:
+    """Round a size up to the alignment of arrays in the file."""
+    return -(-size // _ALIGNMENT) * _ALIGNMENT
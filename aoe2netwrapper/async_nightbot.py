@@ -0,0 +1,345 @@
+"""
+aoe2netwrapper.async_nightbot
+-----------------------------
+
+This module implements an asynchronous high-level client to query the API at https://aoe2.net/#nightbot,
+for use in asyncio applications such as chat bots.
+"""
+
+from __future__ import annotations
+
+import asyncio
+
+from typing import Any
+
+from loguru import logger
+
+from aoe2netwrapper.exceptions import NightBotError
+from aoe2netwrapper.nightbot import _OK_STATUS_CODE, AoE2NightbotAPI, NightbotCache, NightbotOverview
+
+try:
+    import httpx
+except ImportError as error:
+    logger.error("User tried to use the 'async_nightbot' submodule without the 'httpx' library.")
+    msg = "The 'async_nightbot' submodule requires the 'httpx' library to function."
+    raise NotImplementedError(msg) from error
+
+
+class AsyncAoE2NightbotAPI:
+    """
+    The 'AsyncAoE2NightbotAPI' class is the asynchronous counterpart of 'AoE2NightbotAPI', with the same
+    methods and parameters, as coroutines. Queries go through a single pooled 'httpx.AsyncClient', so
+    that many concurrent chat commands share keep-alive connections to the host instead of each opening
+    their own, and never block the event loop.
+
+    The client should be closed once done with, either with 'aclose' or by using it as an asynchronous
+    context manager.
+    """
+
+    NIGHTBOT_BASE_URL: str = AoE2NightbotAPI.NIGHTBOT_BASE_URL
+    RANK_DETAILS_ENDPOINT = AoE2NightbotAPI.RANK_DETAILS_ENDPOINT
+    RECENT_OPPONENT_ENDPOINT = AoE2NightbotAPI.RECENT_OPPONENT_ENDPOINT
+    CURRENT_MATCH_ENDPOINT = AoE2NightbotAPI.CURRENT_MATCH_ENDPOINT
+    CURRENT_CIVS_ENDPOINT = AoE2NightbotAPI.CURRENT_CIVS_ENDPOINT
+    CURRENT_MAP_ENDPOINT = AoE2NightbotAPI.CURRENT_MAP_ENDPOINT
+
+    def __init__(
+        self,
+        timeout: float | tuple[float, float] = 5,
+        cache: NightbotCache | None = None,
+        max_connections: int = 100,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
+        """
+        Args:
+            timeout (float | tuple[float, float]): Timeout of the requests in seconds, or a tuple of
+                the connect and read timeouts. Defaults to 5.
+            cache (NightbotCache): Optional. A cache for the text responses of the endpoints. Responses
+                are not cached if not provided.
+            max_connections (int): Maximum number of concurrent connections to the host. Queries beyond
+                this wait for a free connection. Defaults to 100.
+            transport (httpx.AsyncBaseTransport): Optional. A custom transport for the underlying httpx
+                client, for instance to mock responses in tests.
+        """
+        self.timeout = timeout
+        self.cache = cache
+        if isinstance(timeout, tuple):  # (connect, read) as for requests
+            timeout = httpx.Timeout(timeout[1], connect=timeout[0])
+        self.client = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            transport=transport,
+        )
+
+    def __repr__(self) -> str:
+        return f"Async client for <{self.NIGHTBOT_BASE_URL}>"
+
+    async def __aenter__(self) -> AsyncAoE2NightbotAPI:
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Close the pooled connections of the client."""
+        await self.client.aclose()
+
+    async def rank(
+        self,
+        game: str = "aoe2de",
+        leaderboard_id: int = 3,
+        language: str = "en",
+        flag: str = "true",
+        search: str | None = None,
+        steam_id: int | None = None,
+        profile_id: int | None = None,
+    ) -> str:
+        """
+        Request rank details about a player. Either 'search', 'steam_id' or 'profile_id' required.
+        See 'AoE2NightbotAPI.rank' for the parameters.
+
+        Raises:
+            NightBotError: if the not one of 'search', 'steam_id' or 'profile_id' are provided.
+
+        Returns:
+            The text content of the response, with a quick sentence of information about the player.
+        """
+        _check_player_identifier(search, steam_id, profile_id)
+        logger.debug("Preparing parameters for rank details query")
+        query_params = {
+            "game": game,
+            "leaderboard_id": leaderboard_id,
+            "language": language,
+            "flag": flag,
+            "search": search,
+            "steam_id": steam_id,
+            "profile_id": profile_id,
+        }
+        return await self._query(url=self.RANK_DETAILS_ENDPOINT, params=query_params)
+
+    async def opponent(
+        self,
+        game: str = "aoe2de",
+        leaderboard_id: int = 3,
+        language: str = "en",
+        flag: str = "true",
+        search: str | None = None,
+        steam_id: int | None = None,
+        profile_id: int | None = None,
+    ) -> str:
+        """
+        Request rank details about a player's most recent opponent (1v1 only). Either 'search',
+        'steam_id' or 'profile_id' required. See 'AoE2NightbotAPI.opponent' for the parameters.
+
+        Raises:
+            NightBotError: if the not one of 'search', 'steam_id' or 'profile_id' are provided.
+
+        Returns:
+            The text content of the response, with a quick sentence of information about the opponent.
+        """
+        _check_player_identifier(search, steam_id, profile_id)
+        logger.debug("Preparing parameters for opponent details query")
+        query_params = {
+            "game": game,
+            "leaderboard_id": leaderboard_id,
+            "language": language,
+            "flag": flag,
+            "search": search,
+            "steam_id": steam_id,
+            "profile_id": profile_id,
+        }
+        return await self._query(url=self.RECENT_OPPONENT_ENDPOINT, params=query_params)
+
+    async def match(
+        self,
+        game: str = "aoe2de",
+        leaderboard_id: int = 3,
+        language: str = "en",
+        color: str = "true",
+        flag: str = "true",
+        search: str | None = None,
+        steam_id: int | None = None,
+        profile_id: int | None = None,
+    ) -> str:
+        """
+        Request details about the current or last match. Either 'search', 'steam_id' or 'profile_id'
+        required. See 'AoE2NightbotAPI.match' for the parameters.
+
+        Raises:
+            NightBotError: if the not one of 'search', 'steam_id' or 'profile_id' are provided.
+
+        Returns:
+            The text content of the response, with a quick sentence of information about the players
+            in the match.
+        """
+        _check_player_identifier(search, steam_id, profile_id)
+        logger.debug("Preparing parameters for match details query")
+        query_params = {
+            "game": game,
+            "leaderboard_id": leaderboard_id,
+            "language": language,
+            "color": color,
+            "flag": flag,
+            "search": search,
+            "steam_id": steam_id,
+            "profile_id": profile_id,
+        }
+        return await self._query(url=self.CURRENT_MATCH_ENDPOINT, params=query_params)
+
+    async def civs(
+        self,
+        game: str = "aoe2de",
+        leaderboard_id: int = 3,
+        language: str = "en",
+        search: str | None = None,
+        steam_id: int | None = None,
+        profile_id: int | None = None,
+    ) -> str:
+        """
+        Request civilisations from the current or last match. Either 'search', 'steam_id' or
+        'profile_id' required. See 'AoE2NightbotAPI.civs' for the parameters.
+
+        Raises:
+            NightBotError: if the not one of 'search', 'steam_id' or 'profile_id' are provided.
+
+        Returns:
+            The text content of the response, with the civilisations played in the match.
+        """
+        _check_player_identifier(search, steam_id, profile_id)
+        logger.debug("Preparing parameters for civilisations details query")
+        query_params = {
+            "game": game,
+            "leaderboard_id": leaderboard_id,
+            "language": language,
+            "search": search,
+            "steam_id": steam_id,
+            "profile_id": profile_id,
+        }
+        return await self._query(url=self.CURRENT_CIVS_ENDPOINT, params=query_params)
+
+    async def map(
+        self,
+        game: str = "aoe2de",
+        leaderboard_id: int = 3,
+        language: str = "en",
+        search: str | None = None,
+        steam_id: int | None = None,
+        profile_id: int | None = None,
+    ) -> str:
+        """
+        Request the map name from the current or last match. Either 'search', 'steam_id' or
+        'profile_id' required. See 'AoE2NightbotAPI.map' for the parameters.
+
+        Raises:
+            NightBotError: if the not one of 'search', 'steam_id' or 'profile_id' are provided.
+
+        Returns:
+            The text content of the response, with the name of the map.
+        """
+        _check_player_identifier(search, steam_id, profile_id)
+        logger.debug("Preparing parameters for map details query")
+        query_params = {
+            "game": game,
+            "leaderboard_id": leaderboard_id,
+            "language": language,
+            "search": search,
+            "steam_id": steam_id,
+            "profile_id": profile_id,
+        }
+        return await self._query(url=self.CURRENT_MAP_ENDPOINT, params=query_params)
+
+    async def overview(
+        self,
+        game: str = "aoe2de",
+        leaderboard_id: int = 3,
+        language: str = "en",
+        flag: str = "true",
+        search: str | None = None,
+        steam_id: int | None = None,
+        profile_id: int | None = None,
+    ) -> NightbotOverview:
+        """
+        Request rank details, last opponent, current match, civilisations and map of a player at once,
+        concurrently. A failing query does not fail the others: its field is left empty and its error
+        message is reported in the 'errors' field. See 'AoE2NightbotAPI.overview' for the parameters.
+
+        Raises:
+            NightBotError: if the not one of 'search', 'steam_id' or 'profile_id' are provided.
+
+        Returns:
+            A NightbotOverview validated object with the text content of each response.
+        """
+        _check_player_identifier(search, steam_id, profile_id)
+        player = {"search": search, "steam_id": steam_id, "profile_id": profile_id}
+        common = {"game": game, "leaderboard_id": leaderboard_id, "language": language, **player}
+        queries = {
+            "rank": self.rank(flag=flag, **common),
+            "opponent": self.opponent(flag=flag, **common),
+            "match": self.match(flag=flag, **common),
+            "civs": self.civs(**common),
+            "map": self.map(**common),
+        }
+        results = await asyncio.gather(*queries.values(), return_exceptions=True)
+
+        overview = NightbotOverview()
+        for field, result in zip(queries, results, strict=True):
+            if isinstance(result, (NightBotError, httpx.HTTPError)):
+                logger.warning(f"Overview query for '{field}' failed: {result}")
+                overview.errors[field] = str(result)
+            elif isinstance(result, BaseException):
+                raise result
+            else:
+                setattr(overview, field, result)
+        return overview
+
+    async def _query(self, url: str, params: dict[str, Any]) -> str:
+        """Query an endpoint, through the cache if the client has one."""
+        if self.cache is not None and (cached := self.cache.get(url, params)) is not None:
+            logger.trace(f"Serving response from '{url}' from cache")
+            return cached
+        text = await _get_request_text_response_decoded_async(client=self.client, url=url, params=params)
+        if self.cache is not None:
+            self.cache.put(url, params, text)
+        return text
+
+
+# ----- Helpers ----- #
+
+
+def _check_player_identifier(search: str | None, steam_id: int | None, profile_id: int | None) -> None:
+    """Raise if none of the ways to identify a player was provided."""
+    if not any((search, steam_id, profile_id)):
+        logger.error("Missing one of 'search', 'steam_id', 'profile_id'.")
+        msg = "Either 'search', 'steam_id' or 'profile_id' required, please provide one."
+        raise NightBotError(msg)
+
+
+async def _get_request_text_response_decoded_async(
+    client: httpx.AsyncClient, url: str, params: dict[str, Any] | None = None
+) -> str:
+    """
+    Helper coroutine to handle a GET request to an endpoint and return the response's text content.
+
+    Args:
+        client (httpx.AsyncClient): Client object to use, for connection pooling and performance.
+        url (str): API endpoint to send the request to.
+        params (dict): A dictionary of parameters for the GET request. Parameters set to None are
+            not sent, as done by requests for the synchronous client.
+
+    Raises:
+        NightBotError: if the status code returned is not 200.
+
+    Returns:
+        The request's text response as a decoded unicode string.
+    """
+    default_headers = {"content-type": "application/json;charset=UTF-8"}
+    logger.debug(f"Sending GET request at '{url}'")
+    logger.trace(f"Parameters are: {params!s}")
+
+    sent_params = {key: value for key, value in (params or {}).items() if value is not None}
+    response = await client.get(url, params=sent_params, headers=default_headers)
+    if response.status_code != _OK_STATUS_CODE:
+        logger.error(f"GET request at '{response.url}' returned a {response.status_code} status code")
+        msg = f"Expected status code 200 - got {response.status_code} instead."
+        raise NightBotError(msg)
+    return response.text
@@ -6,6 +6,10 @@ This module implements a high-level class with static methods to convert result
 pandas DataFrames.
 """
 
+from __future__ import annotations
+
+from collections.abc import Iterable, Iterator
+
 from loguru import logger
 
 from aoe2netwrapper.models import (  # LastMatchResponse, NumOnlineResponse,
@@ -22,6 +26,70 @@ except ImportError as error:
     msg = "The 'converters' submodule requires the 'pandas' library to function."
     raise NotImplementedError(msg) from error
 
+# Nullable dtypes applied to known columns when converting with 'compact=True'. Values are bounded
+# by the game (ratings, slots, civ IDs etc), identifiers which can grow unbounded stay 64-bit wide.
+_COMPACT_DTYPES: dict[str, str] = {
+    # Identifiers
+    "match_id": "Int64",
+    "lobby_id": "Int64",
+    "profile_id": "Int64",
+    "steam_id": "Int64",
+    "version": "Int32",
+    # Ratings & ranks
+    "rank": "Int32",
+    "rating": "Int16",
+    "previous_rating": "Int16",
+    "highest_rating": "Int16",
+    "average_rating": "Int16",
+    "rating_change": "Int16",
+    # Counters
+    "games": "Int32",
+    "wins": "Int32",
+    "losses": "Int32",
+    "num_wins": "Int32",
+    "num_losses": "Int32",
+    "drops": "Int32",
+    "streak": "Int16",
+    "lowest_streak": "Int16",
+    "highest_streak": "Int16",
+    "start": "Int32",
+    "count": "Int32",
+    "total": "Int32",
+    # Lobby settings & slots
+    "leaderboard_id": "Int8",
+    "game_type": "Int8",
+    "rating_type": "Int8",
+    "num_players": "Int8",
+    "num_slots": "Int8",
+    "ending_age": "Int8",
+    "starting_age": "Int8",
+    "map_size": "Int8",
+    "map_type": "Int16",
+    "pop": "Int16",
+    "resources": "Int8",
+    "speed": "Int8",
+    "treaty_length": "Int16",
+    "victory": "Int8",
+    "victory_time": "Int32",
+    "visibility": "Int8",
+    "slot": "Int8",
+    "slot_type": "Int8",
+    "color": "Int8",
+    "team": "Int8",
+    "civ": "Int8",
+    "won": "Int8",
+}
+
+# String columns with few distinct values, stored as categoricals when converting with 'compact=True'.
+_COMPACT_CATEGORICALS: tuple[str, ...] = (
+    "country",
+    "clan",
+    "expansion",
+    "rms",
+    "scenario",
+    "server",
+)
+
 
 class Convert:
     """
@@ -67,13 +135,15 @@ class Convert:
         return result
 
     @staticmethod
-    def leaderboard(leaderboard_response: LeaderBoardResponse) -> pd.DataFrame:
+    def leaderboard(leaderboard_response: LeaderBoardResponse, compact: bool = False) -> pd.DataFrame:
         """
         Convert the result given by a call to AoE2NetAPI().leaderboard to a pandas DataFrame.
 
         Args:
             leaderboard_response (LeaderBoardResponse): the response directly returned by your AoE2NetAPI
                 client.
+            compact (bool): if True, downcast columns to the smallest fitting nullable integer dtypes and
+                store low-cardinality string columns as categoricals. Defaults to False.
 
         Returns:
             A pandas DataFrame from the LeaderBoardResponse, each row being an entry in the leaderboard.
@@ -98,7 +168,7 @@ class Convert:
         logger.trace("Converting datetimes")
         dframe["last_match"] = pd.to_datetime(dframe["last_match"], unit="s")
         dframe["last_match_time"] = pd.to_datetime(dframe["last_match_time"], unit="s")
-        return dframe
+        return _compact_dataframe(dframe) if compact else dframe
 
     # @staticmethod
     # def lobbies(lobbies_response: list[MatchLobby]) -> pd.DataFrame:
@@ -160,7 +230,7 @@ class Convert:
     #     return dframe
 
     @staticmethod
-    def match_history(match_history_response: list[MatchLobby]) -> pd.DataFrame:
+    def match_history(match_history_response: list[MatchLobby], compact: bool = False) -> pd.DataFrame:
         """
         Convert the result given by a call to AoE2NetAPI().match_history to a pandas DataFrame. The resulting
         DataFrame will contain several rows for each lobby, namely as many as there are players in said
@@ -172,6 +242,8 @@ class Convert:
         Args:
             match_history_response (list[MatchLobby]): the response directly returned by your AoE2NetAPI
                 client.
+            compact (bool): if True, downcast columns to the smallest fitting nullable integer dtypes and
+                store low-cardinality string columns as categoricals. Defaults to False.
 
         Returns:
             A pandas DataFrame from the list of MatchLobby elements.
@@ -186,16 +258,145 @@ class Convert:
         unfolded_lobbies = [
             _unfold_match_lobby_to_dataframe(match_lobby) for match_lobby in match_history_response
         ]
-        return pd.concat(unfolded_lobbies).reset_index(drop=True)
+        dframe = pd.concat(unfolded_lobbies).reset_index(drop=True)
+        return _compact_dataframe(dframe) if compact else dframe
+
+    @staticmethod
+    def match_history_chunks(
+        match_lobbies: Iterable[MatchLobby], chunk_size: int = 10_000, compact: bool = False
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Lazily convert an iterable of MatchLobby objects, for instance a generator paginating through
+        AoE2NetAPI().match_history calls, to pandas DataFrames of 'chunk_size' rows each. Each chunk has
+        the same layout as the output of 'Convert.match_history', and the index keeps counting across
+        chunks so that concatenating all of them gives the same result as converting everything at once.
+
+        Only the lobbies needed to fill the current chunk are held in memory, which allows writing a
+        large crawl to disk chunk by chunk instead of concatenating everything at the end.
+
+        Args:
+            match_lobbies (Iterable[MatchLobby]): any iterable yielding MatchLobby objects.
+            chunk_size (int): number of rows (one per player in a lobby) in each yielded DataFrame. The
+                last chunk may be smaller. Defaults to 10 000.
+            compact (bool): if True, downcast columns to the smallest fitting nullable integer dtypes and
+                store low-cardinality string columns as categoricals. Defaults to False.
+
+        Raises:
+            ValueError: if 'chunk_size' is not a positive integer.
+
+        Yields:
+            pandas DataFrames of at most 'chunk_size' rows.
+        """
+        if chunk_size < 1:
+            logger.error(f"'chunk_size' has to be a positive integer, but {chunk_size} was provided.")
+            msg = "Invalid value for parameter 'chunk_size'."
+            raise ValueError(msg)
+
+        logger.debug(f"Converting Match History stream to DataFrames of {chunk_size} rows")
+        buffer: list[pd.DataFrame] = []
+        buffered_rows: int = 0
+        offset: int = 0
+
+        for match_lobby in match_lobbies:
+            unfolded = _unfold_match_lobby_to_dataframe(match_lobby)
+            buffer.append(unfolded)
+            buffered_rows += len(unfolded)
+
+            while buffered_rows >= chunk_size:
+                pending = pd.concat(buffer, ignore_index=True)
+                chunk, remainder = pending.iloc[:chunk_size], pending.iloc[chunk_size:]
+                yield _finalize_chunk(chunk, offset, compact)
+                offset += chunk_size
+                buffer = [remainder.reset_index(drop=True)] if len(remainder) else []
+                buffered_rows = len(remainder)
+
+        if buffered_rows:
+            yield _finalize_chunk(pd.concat(buffer, ignore_index=True), offset, compact)
+
+    @staticmethod
+    def merge_match_history(
+        existing: pd.DataFrame, match_history_response: list[MatchLobby], compact: bool = False
+    ) -> pd.DataFrame:
+        """
+        Incrementally add the matches from a fresh call to AoE2NetAPI().match_history to a previously
+        converted match history. Only the MatchLobby objects whose 'match_id' is not yet in the existing
+        frame are converted, so the expensive conversion work scales with the amount of new matches
+        rather than with the whole history.
+
+        The returned DataFrame is indexed and sorted by ('match_id', 'profile_id'), which are moved from
+        columns to index levels. The existing frame can either be such an indexed frame, as returned by a
+        previous call to this method, or the direct output of 'Convert.match_history', which is indexed
+        once. Use '.reset_index()' to get 'match_id' and 'profile_id' back as columns.
+
+        Args:
+            existing (pd.DataFrame): the match history DataFrame to add new matches to. Can be an empty
+                'pd.DataFrame()' to start a new history.
+            match_history_response (list[MatchLobby]): the response directly returned by your AoE2NetAPI
+                client.
+            compact (bool): if True, downcast the new rows to the smallest fitting nullable integer dtypes
+                and store low-cardinality string columns as categoricals. Should match how the existing
+                frame was converted, categoricals of both frames are then merged into categoricals with
+                the categories of both. Defaults to False.
+
+        Returns:
+            A pandas DataFrame with the rows of the existing frame and those of the unseen matches.
+        """
+        if not isinstance(existing, pd.DataFrame):
+            logger.error("Tried to use method with a parameter of type != pd.DataFrame")
+            msg = "Provided parameter should be an instance of 'pd.DataFrame'"
+            raise TypeError(msg)
+
+        if not isinstance(match_history_response, list):
+            logger.error("Tried to use method with a parameter of type != list[MatchLobby]")
+            msg = "Provided parameter should be an instance of 'list[MatchLobby]'"
+            raise TypeError(msg)
+
+        empty = existing.empty and "match_id" not in [*existing.columns, *existing.index.names]
+        if empty:  # nothing to index, as with a bare 'pd.DataFrame()'
+            known_match_ids = pd.Index([], dtype="int64")
+        else:
+            existing = _index_match_history(existing)
+            # Levels can hold match_ids of rows filtered out of the frame, which are not merged yet. The
+            # remaining passes over the history (this one, the sorted check and pd.concat copying the
+            # rows) are vectorized over the index codes, the per-match conversion only runs on new ones
+            known_match_ids = existing.index.remove_unused_levels().levels[0]
+
+        logger.debug("Selecting unseen matches from Match History response")
+        unseen: dict[int, MatchLobby] = {}
+        for match_lobby in match_history_response:
+            if match_lobby.match_id is None:
+                logger.warning("Skipping a MatchLobby without 'match_id', which cannot be indexed")
+                continue
+            unseen.setdefault(match_lobby.match_id, match_lobby)
+        if unseen:
+            is_known = known_match_ids.get_indexer(list(unseen)) != -1
+            for match_id in pd.Index(list(unseen))[is_known]:
+                del unseen[match_id]
+
+        if not unseen:
+            logger.debug("No new match to merge")
+            return existing
+
+        logger.debug(f"Converting and merging {len(unseen)} new matches")
+        new = pd.concat([_unfold_match_lobby_to_dataframe(match_lobby) for match_lobby in unseen.values()])
+        new = _index_match_history(_compact_dataframe(new) if compact else new)
+        if empty:
+            return new
+        existing, new = _union_categories(existing, new)
+        if existing.empty or new.index[0] > existing.index[-1]:  # only appending, order is preserved
+            return pd.concat([existing, new])
+        return pd.concat([existing, new]).sort_index()
 
     @staticmethod
-    def rating_history(rating_history_response: list[RatingTimePoint]) -> pd.DataFrame:
+    def rating_history(rating_history_response: list[RatingTimePoint], compact: bool = False) -> pd.DataFrame:
         """
         Convert the result given by a call to AoE2NetAPI().leaderboard to a pandas DataFrame.
 
         Args:
             rating_history_response (list[RatingTimePoint]): the response directly returned by your AoE2NetAPI
                 client.
+            compact (bool): if True, downcast columns to the smallest fitting nullable integer dtypes.
+                Defaults to False.
 
         Returns:
             A pandas DataFrame from the list of RatingTimePoint elements, each row being the information from
@@ -213,7 +414,8 @@ class Convert:
 
         logger.trace("Converting timestamps to datetime objects")
         dframe["time"] = pd.to_datetime(dframe["timestamp"], unit="s")
-        return dframe.drop(columns=["timestamp"])
+        dframe = dframe.drop(columns=["timestamp"])
+        return _compact_dataframe(dframe) if compact else dframe
 
     # @staticmethod
     # def matches(matches_response: list[MatchLobby]) -> pd.DataFrame:
@@ -316,6 +518,83 @@ def _export_tuple_elements_to_column_values_format(dataframe: pd.DataFrame) -> p
     return dframe
 
 
+def _compact_dataframe(dataframe: pd.DataFrame) -> pd.DataFrame:
+    """
+    Take in a pandas DataFrame as produced by the Convert methods and downcast its known columns to
+    memory-efficient dtypes: bounded integer columns become the smallest fitting nullable integer dtype
+    (so missing values are kept as <NA>), and low-cardinality string columns become categoricals. Columns
+    not known to the mapping are left untouched.
+
+    Args:
+        dataframe (pd.DataFrame): your pandas DataFrame.
+
+    Returns:
+        The compacted pandas DataFrame.
+    """
+    logger.trace("Downcasting columns to compact dtypes")
+    dtypes = {column: dtype for column, dtype in _COMPACT_DTYPES.items() if column in dataframe.columns}
+    dtypes.update({column: "category" for column in _COMPACT_CATEGORICALS if column in dataframe.columns})
+    return dataframe.astype(dtypes)
+
+
+def _index_match_history(dataframe: pd.DataFrame) -> pd.DataFrame:
+    """
+    Index a match history DataFrame by ('match_id', 'profile_id') and sort it, unless it already is.
+
+    Args:
+        dataframe (pd.DataFrame): a match history DataFrame, as given by 'Convert.match_history'.
+
+    Returns:
+        The indexed and sorted pandas DataFrame.
+    """
+    if list(dataframe.index.names) == ["match_id", "profile_id"]:
+        return dataframe if dataframe.index.is_monotonic_increasing else dataframe.sort_index()
+    logger.trace("Indexing match history by ('match_id', 'profile_id')")
+    return dataframe.set_index(["match_id", "profile_id"]).sort_index()
+
+
+def _union_categories(first: pd.DataFrame, second: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Give the categorical columns of two DataFrames the same categories, so that concatenating them keeps
+    these columns categorical instead of falling back to object. The first frame's categories are only
+    extended, which does not recode its values.
+
+    Args:
+        first (pd.DataFrame): the DataFrame to be concatenated first, typically the larger one.
+        second (pd.DataFrame): the DataFrame to be concatenated after it.
+
+    Returns:
+        Both DataFrames, with shared categories for the columns that are categorical in both.
+    """
+    first, second = first.copy(deep=False), second.copy(deep=False)
+    for column in first.columns.intersection(second.columns):
+        first_dtype, second_dtype = first[column].dtype, second[column].dtype
+        both = isinstance(first_dtype, pd.CategoricalDtype) and isinstance(second_dtype, pd.CategoricalDtype)
+        if not both or first_dtype == second_dtype:
+            continue
+        added = second_dtype.categories.difference(first_dtype.categories, sort=False)
+        first[column] = first[column].cat.add_categories(added)
+        second[column] = second[column].cat.set_categories(first[column].cat.categories)
+    return first, second
+
+
+def _finalize_chunk(chunk: pd.DataFrame, offset: int, compact: bool) -> pd.DataFrame:
+    """
+    Prepare a chunk of unfolded MatchLobby rows before it is yielded: shift its index by 'offset' so
+    indices keep counting across chunks, and compact its dtypes if requested.
+
+    Args:
+        chunk (pd.DataFrame): the chunk's pandas DataFrame.
+        offset (int): the number of rows yielded in previous chunks.
+        compact (bool): whether to downcast the chunk's dtypes.
+
+    Returns:
+        The finalized pandas DataFrame.
+    """
+    chunk = chunk.set_axis(pd.RangeIndex(offset, offset + len(chunk)))
+    return _compact_dataframe(chunk) if compact else chunk
+
+
 def _unfold_match_lobby_to_dataframe(match_lobby: MatchLobby) -> pd.DataFrame:
     """
     Convert the content of a MatchLobby to a pandas DataFrame. The resulting DataFrame will have as many
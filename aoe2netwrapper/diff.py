@@ -0,0 +1,129 @@
+"""
+aoe2netwrapper.diff
+-------------------
+
+This module implements the comparison of two leaderboard snapshots, to find which players entered, left
+or moved on the ladder between them.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+
+from loguru import logger
+from pydantic import BaseModel, Field
+
+from aoe2netwrapper.models import LeaderBoardResponse
+from aoe2netwrapper.models.leaderboard import LeaderBoardSpot
+
+
+class SpotChange(BaseModel):
+    """An object to encapsulate the change of a player's leaderboard entry between two snapshots."""
+
+    profile_id: int = Field(..., description="The ID attributed to the player by AoE II")
+    name: str | None = Field(None, description="The player's in-game name in the newer snapshot")
+    old_rank: int | None = Field(None, description="The player's rank in the older snapshot")
+    new_rank: int | None = Field(None, description="The player's rank in the newer snapshot")
+    old_rating: int | None = Field(None, description="The player's rating in the older snapshot")
+    new_rating: int | None = Field(None, description="The player's rating in the newer snapshot")
+    games_played: int | None = Field(None, description="Number of games played between the snapshots")
+
+    @property
+    def rank_delta(self) -> int | None:
+        """Number of places gained on the ladder (positive when climbing)."""
+        if self.old_rank is None or self.new_rank is None:
+            return None
+        return self.old_rank - self.new_rank
+
+    @property
+    def rating_delta(self) -> int | None:
+        """Rating difference between the two snapshots."""
+        if self.old_rating is None or self.new_rating is None:
+            return None
+        return self.new_rating - self.old_rating
+
+
+class LeaderBoardDiff(BaseModel):
+    """An object to encapsulate the differences between two leaderboard snapshots."""
+
+    added: list[LeaderBoardSpot] = Field(default_factory=list, description="Entries new to the ladder")
+    removed: list[LeaderBoardSpot] = Field(default_factory=list, description="Entries gone from the ladder")
+    changed: list[SpotChange] = Field(default_factory=list, description="Entries in both, with changes")
+
+    @property
+    def climbers(self) -> list[SpotChange]:
+        """Changed entries whose rank improved, biggest climb first."""
+        return sorted((c for c in self.changed if (c.rank_delta or 0) > 0), key=lambda c: -c.rank_delta)
+
+    @property
+    def decays(self) -> list[SpotChange]:
+        """Changed entries whose rating dropped without any game being played."""
+        return [c for c in self.changed if (c.rating_delta or 0) < 0 and not c.games_played]
+
+
+def diff_leaderboards(
+    old: LeaderBoardResponse | Iterable[LeaderBoardSpot], new: LeaderBoardResponse | Iterable[LeaderBoardSpot]
+) -> LeaderBoardDiff:
+    """
+    Compare two leaderboard snapshots, given either as the LeaderBoardResponse objects returned by the
+    AoE2NetAPI client or as any iterable of their LeaderBoardSpot entries (for instance the pages of a
+    full ladder crawl chained together).
+
+    The older snapshot is indexed in a dictionary on 'profile_id', then the newer snapshot is walked
+    once, so the comparison is linear in the size of the snapshots and only holds one index in memory.
+    Entries without a 'profile_id' cannot be matched and are ignored.
+
+    Args:
+        old (LeaderBoardResponse | Iterable[LeaderBoardSpot]): the older snapshot.
+        new (LeaderBoardResponse | Iterable[LeaderBoardSpot]): the newer snapshot.
+
+    Returns:
+        A LeaderBoardDiff object with the added and removed entries, as well as a SpotChange for each
+        player whose rank, rating or number of games changed, in the order of the newer snapshot.
+    """
+    logger.debug("Indexing older leaderboard snapshot on 'profile_id'")
+    old_spots: dict[int, LeaderBoardSpot] = {
+        spot.profile_id: spot for spot in _leaderboard_spots(old) if spot.profile_id is not None
+    }
+
+    logger.debug("Comparing newer leaderboard snapshot to the older one")
+    diff = LeaderBoardDiff()
+    for spot in _leaderboard_spots(new):
+        if spot.profile_id is None:
+            continue
+        previous = old_spots.pop(spot.profile_id, None)
+        if previous is None:
+            diff.added.append(spot)
+        elif (previous.rank, previous.rating, previous.games) != (spot.rank, spot.rating, spot.games):
+            diff.changed.append(
+                SpotChange(
+                    profile_id=spot.profile_id,
+                    name=spot.name,
+                    old_rank=previous.rank,
+                    new_rank=spot.rank,
+                    old_rating=previous.rating,
+                    new_rating=spot.rating,
+                    games_played=_difference(previous.games, spot.games),
+                )
+            )
+    diff.removed.extend(old_spots.values())  # whatever was not popped is gone from the ladder
+    return diff
+
+
+# ----- Helpers ----- #
+
+
+def _leaderboard_spots(
+    snapshot: LeaderBoardResponse | Iterable[LeaderBoardSpot],
+) -> Iterable[LeaderBoardSpot]:
+    """Get the LeaderBoardSpot entries from a snapshot, whichever form it is given in."""
+    if isinstance(snapshot, LeaderBoardResponse):
+        return snapshot.leaderboard or []
+    return snapshot
+
+
+def _difference(old: int | None, new: int | None) -> int | None:
+    """The difference between two optional integers, None if either is missing."""
+    if old is None or new is None:
+        return None
+    return new - old
@@ -0,0 +1,292 @@
+"""
+aoe2netwrapper.headtohead
+-------------------------
+
+This module implements head-to-head records between the top players of a leaderboard, built from their
+match histories fetched concurrently and indexed by match to count each game once.
+"""
+
+from __future__ import annotations
+
+import threading
+
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from itertools import combinations
+
+import requests
+
+from loguru import logger
+
+from aoe2netwrapper.api import (
+    _MAX_LEADERBOARD_COUNT,
+    _MAX_MATCH_HISTORY_COUNT,
+    AoE2NetAPI,
+    _iter_leaderboard_pages,
+)
+from aoe2netwrapper.exceptions import Aoe2NetError
+from aoe2netwrapper.models import MatchLobby
+from aoe2netwrapper.sync import MatchHighWaterMark, MatchHistorySync
+
+try:
+    import numpy as np
+    import pandas as pd
+except ImportError as error:
+    logger.error("User tried to use the 'headtohead' submodule without the 'pandas' library.")
+    msg = "The 'headtohead' submodule requires the 'pandas' library to function."
+    raise NotImplementedError(msg) from error
+
+
+class HeadToHeadMatrix:
+    """
+    The 'HeadToHeadMatrix' class is a sparse N×N matrix of the games won by each of N players against
+    each of the others, stored as coordinates: entry ('winners[k]', 'losers[k]') holds 'wins[k]', the
+    number of games the player at index 'winners[k]' won against the one at index 'losers[k]'. Only
+    pairs of players who met are stored.
+    """
+
+    def __init__(self, profile_ids: np.ndarray, winners: np.ndarray, losers: np.ndarray, wins: np.ndarray):
+        """
+        Args:
+            profile_ids (np.ndarray): the profile IDs of the N players, giving the order of rows and
+                columns.
+            winners (np.ndarray): the row indices of the stored entries.
+            losers (np.ndarray): the column indices of the stored entries.
+            wins (np.ndarray): the number of games won by the row player against the column player.
+        """
+        self.profile_ids = profile_ids
+        self.winners = winners
+        self.losers = losers
+        self.wins = wins
+        self._positions = {int(profile_id): index for index, profile_id in enumerate(profile_ids)}
+        self._entries = {
+            (int(winner), int(loser)): int(count)
+            for winner, loser, count in zip(winners, losers, wins, strict=True)
+        }
+
+    def __repr__(self) -> str:
+        return f"Head-to-head matrix of {len(self.profile_ids)} players ({len(self.wins)} entries)"
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        """The dimensions of the matrix, N×N for N players."""
+        return len(self.profile_ids), len(self.profile_ids)
+
+    def record(self, profile_id: int, opponent_id: int) -> tuple[int, int]:
+        """
+        Args:
+            profile_id (int): The player's profile ID.
+            opponent_id (int): The opponent's profile ID.
+
+        Raises:
+            KeyError: if one of the players is not in the matrix.
+
+        Returns:
+            The numbers of games the player won and lost against the opponent.
+        """
+        if profile_id not in self._positions or opponent_id not in self._positions:
+            logger.error(f"Players {profile_id} and {opponent_id} are not both in the matrix")
+            msg = f"Both {profile_id} and {opponent_id} should be among the matrix's players."
+            raise KeyError(msg)
+        player, opponent = self._positions[profile_id], self._positions[opponent_id]
+        return self._entries.get((player, opponent), 0), self._entries.get((opponent, player), 0)
+
+    def to_dense(self) -> np.ndarray:
+        """
+        Returns:
+            The N×N matrix as a dense array of wins, the losses of each player being the transpose.
+        """
+        dense = np.zeros(self.shape, dtype=np.int64)
+        dense[self.winners, self.losers] = self.wins
+        return dense
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Returns:
+            A pandas DataFrame with one row per pair of players who met, ordered by profile ID, with the
+            'profile_id' and 'opponent_id' columns and the 'wins' and 'losses' of the former against the
+            latter.
+        """
+        records: dict[tuple[int, int], list[int]] = {}
+        for (winner, loser), count in self._entries.items():
+            winner_id, loser_id = int(self.profile_ids[winner]), int(self.profile_ids[loser])
+            record = records.setdefault((min(winner_id, loser_id), max(winner_id, loser_id)), [0, 0])
+            record[0 if winner_id < loser_id else 1] += count
+        dframe = pd.DataFrame(
+            [(*pair, wins, losses) for pair, (wins, losses) in records.items()],
+            columns=["profile_id", "opponent_id", "wins", "losses"],
+            dtype="int64",
+        )
+        return dframe.sort_values(["profile_id", "opponent_id"], ignore_index=True)
+
+
+class HeadToHead:
+    """
+    The 'HeadToHead' class builds the head-to-head records between the top players of a leaderboard.
+    The match histories of the players are fetched concurrently and kept in memory: on later calls,
+    only the matches played since are fetched, through a MatchHistorySync. Matches are indexed by
+    'match_id', so that a game appearing in the histories of both of its players is counted once.
+    """
+
+    def __init__(
+        self,
+        client: AoE2NetAPI | None = None,
+        game: str = "aoe2de",
+        leaderboard_id: int = 3,
+        history_size: int = _MAX_MATCH_HISTORY_COUNT,
+        workers: int = 10,
+    ):
+        """
+        Args:
+            client (AoE2NetAPI): Optional. The client used to query the leaderboard and match history
+                API endpoints. A new one is created if not provided.
+            game (str): The game of the leaderboard. Defaults to 'aoe2de'.
+            leaderboard_id (int): The leaderboard whose top players are considered, and whose matches
+                are counted (Unranked=0, 1v1 Deathmatch=1, Team Deathmatch=2, 1v1 Random Map=3, Team
+                Random Map=4). Defaults to 3.
+            history_size (int): Number of most recent matches fetched for a player the first time
+                (must be 1000 or less). Defaults to 1000.
+            workers (int): Number of match histories fetched concurrently. The client's session keeps
+                10 connections to the host by default. Defaults to 10.
+        """
+        self.client = client or AoE2NetAPI()
+        self.game = game
+        self.leaderboard_id = leaderboard_id
+        self.history_size = min(history_size, _MAX_MATCH_HISTORY_COUNT)
+        self.workers = workers
+        self.sync = MatchHistorySync(client=self.client, game=game)
+        self.matches: dict[int, MatchLobby] = {}
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return f"Head-to-head of leaderboard {self.leaderboard_id} ({len(self.matches)} matches indexed)"
+
+    def top_players(self, top: int) -> list[int]:
+        """
+        Args:
+            top (int): Number of players to get from the top of the leaderboard.
+
+        Returns:
+            The profile IDs of the top players, by rank.
+        """
+        pages = _iter_leaderboard_pages(
+            self.client,
+            game=self.game,
+            leaderboard_id=self.leaderboard_id,
+            page_size=min(top, _MAX_LEADERBOARD_COUNT),
+            max_entries=top,
+        )
+        spots = [spot for page in pages for spot in page.leaderboard or []]
+        return [spot.profile_id for spot in spots if spot.profile_id is not None]
+
+    def fetch(self, profile_ids: Iterable[int]) -> dict[int, int]:
+        """
+        Fetch the matches of players concurrently and add them to the index: their 'history_size' most
+        recent matches for players fetched for the first time, and the matches they played since for the
+        others. Players whose history could not be fetched are logged and skipped.
+
+        Args:
+            profile_ids (Iterable[int]): The profile IDs of the players.
+
+        Returns:
+            A dictionary with the number of matches fetched for each player whose history was fetched.
+        """
+        profile_ids = list(dict.fromkeys(profile_ids))
+        logger.debug(f"Fetching the match histories of {len(profile_ids)} players")
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {
+                profile_id: executor.submit(self._fetch_player, profile_id) for profile_id in profile_ids
+            }
+
+        fetched: dict[int, int] = {}
+        for profile_id, future in futures.items():
+            try:
+                matches = future.result()
+            except (Aoe2NetError, requests.RequestException) as error:
+                logger.warning(f"Could not fetch the match history of player {profile_id}: {error}")
+                continue
+            with self._lock:
+                for match in matches:
+                    if match.match_id is not None:
+                        self.matches[match.match_id] = match  # the latest copy, which may have an outcome
+            fetched[profile_id] = len(matches)
+        return fetched
+
+    def matrix(self, top: int | None = None, profile_ids: Iterable[int] | None = None) -> HeadToHeadMatrix:
+        """
+        Build the head-to-head matrix between the top players of the leaderboard, or between given
+        players, after fetching their matches. Games with an unknown outcome, from another leaderboard,
+        or between teammates are not counted.
+
+        Args:
+            top (int): Optional. Number of players to get from the top of the leaderboard.
+            profile_ids (Iterable[int]): Optional. The profile IDs of the players, used instead of the top
+                players of the leaderboard if provided.
+
+        Raises:
+            ValueError: if neither 'top' nor 'profile_ids' is provided.
+
+        Returns:
+            A HeadToHeadMatrix between the players, in the order of their ranks or of 'profile_ids'.
+        """
+        if profile_ids is None and top is None:
+            logger.error("Missing one of 'top', 'profile_ids'.")
+            msg = "Either 'top' or 'profile_ids' required, please provide one."
+            raise ValueError(msg)
+        players = list(dict.fromkeys(profile_ids if profile_ids is not None else self.top_players(top)))
+        self.fetch(players)
+        return self.count(players)
+
+    def count(self, profile_ids: Iterable[int]) -> HeadToHeadMatrix:
+        """
+        Count the games between players among the matches already indexed, without fetching anything.
+
+        Args:
+            profile_ids (Iterable[int]): The profile IDs of the players, giving the order of the
+                matrix's rows and columns.
+
+        Returns:
+            A HeadToHeadMatrix between the players.
+        """
+        players = np.array(list(dict.fromkeys(profile_ids)), dtype=np.int64)
+        positions = {int(profile_id): index for index, profile_id in enumerate(players)}
+        counts: dict[tuple[int, int], int] = {}
+        with self._lock:
+            matches = list(self.matches.values())
+
+        for match in matches:
+            if match.leaderboard_id is not None and match.leaderboard_id != self.leaderboard_id:
+                continue
+            members = [
+                player
+                for player in match.players or []
+                if player.profile_id in positions and player.won is not None
+            ]
+            for first, second in combinations(members, 2):
+                if (first.team is not None and first.team == second.team) or first.won == second.won:
+                    continue
+                winner, loser = (first, second) if first.won else (second, first)
+                key = (positions[winner.profile_id], positions[loser.profile_id])
+                counts[key] = counts.get(key, 0) + 1
+
+        entries = np.array(list(counts), dtype=np.int64).reshape(-1, 2)
+        wins = np.array(list(counts.values()), dtype=np.int64)
+        return HeadToHeadMatrix(players, entries[:, 0], entries[:, 1], wins)
+
+    def _fetch_player(self, profile_id: int) -> list[MatchLobby]:
+        """Fetch the new matches of a player, or their most recent ones the first time."""
+        if profile_id in self.sync.marks:
+            return self.sync.fetch_new(profile_id)
+        matches = self.client.match_history(game=self.game, count=self.history_size, profile_id=profile_id)
+        newest = matches[0] if matches else None
+        self.sync.load(
+            [
+                MatchHighWaterMark(
+                    profile_id=profile_id,
+                    match_id=newest.match_id if newest else None,
+                    started=newest.started if newest else None,
+                    page_size=self.sync.min_page_size,
+                )
+            ]
+        )
+        return matches
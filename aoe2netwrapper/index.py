@@ -0,0 +1,541 @@
+"""
+aoe2netwrapper.index
+--------------------
+
+This module implements in-memory indexes built from leaderboard pages, to answer player lookups and
+ladder queries locally instead of querying the API for each of them.
+"""
+
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter
+from collections.abc import Iterable, Iterator
+from typing import TYPE_CHECKING
+
+from loguru import logger
+
+from aoe2netwrapper.api import _MAX_LEADERBOARD_COUNT, AoE2NetAPI, _iter_leaderboard_pages
+from aoe2netwrapper.exceptions import Aoe2NetError
+from aoe2netwrapper.models import LeaderBoardResponse
+from aoe2netwrapper.models.leaderboard import LeaderBoardSpot
+
+if TYPE_CHECKING:
+    from aoe2netwrapper.snapshot import LeaderBoardSnapshot
+
+_SEARCHABLE_FIELDS: tuple[str, ...] = ("name", "clan")
+_NGRAM_SIZE: int = 3
+# A built ladder is patched in place when an update changes at most this fraction of its ratings, and
+# sorted again on the next query otherwise
+_PATCH_FRACTION: float = 0.05
+
+
+class PlayerIndex:
+    """
+    The 'PlayerIndex' class holds the LeaderBoardSpot entries of a leaderboard in memory, with O(1) lookups
+    by 'profile_id' and 'steam_id', and case-insensitive prefix search on 'name' and 'clan' through
+    sorted arrays and binary search.
+
+    It is filled from leaderboard pages, either fed with 'update' or fetched with 'refresh'. Lookups that
+    miss the index fall back to querying the leaderboard API endpoint, and the results are added to the
+    index for next time.
+    """
+
+    def __init__(self, client: AoE2NetAPI | None = None, game: str = "aoe2de", leaderboard_id: int = 3):
+        """
+        Args:
+            client (AoE2NetAPI): Optional. The client used to refresh the index and for lookups falling
+                back to the API. A new one is created if not provided.
+            game (str): The game of the indexed leaderboard. Defaults to 'aoe2de'.
+            leaderboard_id (int): The indexed leaderboard (Unranked=0, 1v1 Deathmatch=1, Team
+                Deathmatch=2, 1v1 Random Map=3, Team Random Map=4). Defaults to 3.
+        """
+        self.client = client or AoE2NetAPI()
+        self.game = game
+        self.leaderboard_id = leaderboard_id
+        self.hits: int = 0
+        self.misses: int = 0
+        self._by_profile_id: dict[int, LeaderBoardSpot] = {}
+        self._by_steam_id: dict[int, LeaderBoardSpot] = {}
+        self._sorted_keys: dict[str, tuple[list[str], list[int]]] = {}  # built lazily, reset on updates
+        self._fuzzy: FuzzyNameIndex | None = None  # built lazily, reset on updates
+
+    def __repr__(self) -> str:
+        return f"Player index of leaderboard {self.leaderboard_id} ({len(self)} players)"
+
+    def __len__(self) -> int:
+        return len(self._by_profile_id)
+
+    def __iter__(self) -> Iterator[LeaderBoardSpot]:
+        return iter(self._by_profile_id.values())
+
+    def update(self, spots: LeaderBoardResponse | Iterable[LeaderBoardSpot]) -> int:
+        """
+        Add entries to the index, replacing those of already indexed players. Entries without a
+        'profile_id' cannot be indexed and are skipped.
+
+        Args:
+            spots (LeaderBoardResponse | Iterable[LeaderBoardSpot]): a leaderboard page, or any iterable
+                of LeaderBoardSpot entries.
+
+        Returns:
+            The number of indexed entries.
+        """
+        if isinstance(spots, LeaderBoardResponse):
+            spots = spots.leaderboard or []
+
+        indexed = 0
+        for spot in spots:
+            if spot.profile_id is None:
+                continue
+            previous = self._by_profile_id.get(spot.profile_id)
+            if previous is not None and previous.steam_id is not None:
+                self._by_steam_id.pop(previous.steam_id, None)
+            self._by_profile_id[spot.profile_id] = spot
+            if spot.steam_id is not None:
+                self._by_steam_id[spot.steam_id] = spot
+            indexed += 1
+
+        if indexed:
+            self._sorted_keys.clear()
+            self._fuzzy = None
+        logger.trace(f"Indexed {indexed} leaderboard entries")
+        return indexed
+
+    def refresh(self, page_size: int = _MAX_LEADERBOARD_COUNT, max_entries: int | None = None) -> int:
+        """
+        Page through the leaderboard API endpoint and index the received entries.
+
+        Args:
+            page_size (int): Number of entries to request per call (must be 10000 or less). Defaults to
+                10 000.
+            max_entries (int): Optional. Stop after indexing this many entries from the top of the
+                leaderboard.
+
+        Returns:
+            The number of indexed entries.
+        """
+        logger.debug(f"Refreshing player index from leaderboard {self.leaderboard_id} of '{self.game}'")
+        pages = _iter_leaderboard_pages(self.client, self.game, self.leaderboard_id, page_size, max_entries)
+        return sum(self.update(page) for page in pages)
+
+    def get(
+        self, profile_id: int | None = None, steam_id: int | None = None, fallback: bool = True
+    ) -> LeaderBoardSpot | None:
+        """
+        Look up a player by 'profile_id' or 'steam_id'. Either 'profile_id' or 'steam_id' required.
+
+        Args:
+            profile_id (int): The player's profile ID (ex: 459658).
+            steam_id (int): The player's steamID64 (ex: 76561199003184910).
+            fallback (bool): Whether to query the API when the player is not indexed. Defaults to True.
+
+        Raises:
+            Aoe2NetError: if the not one of 'profile_id' or 'steam_id' are provided.
+
+        Returns:
+            The player's LeaderBoardSpot, or None if they could not be found.
+        """
+        if not profile_id and not steam_id:
+            logger.error("Missing one of 'profile_id', 'steam_id'.")
+            msg = "Either 'profile_id' or 'steam_id' required, please provide one."
+            raise Aoe2NetError(msg)
+
+        spot = self._by_profile_id.get(profile_id) if profile_id else self._by_steam_id.get(steam_id)
+        if spot is not None or not fallback:
+            self._count(hit=spot is not None)
+            return spot
+
+        self._count(hit=False)
+        logger.debug("Player not in index, querying the API")
+        response = self.client.leaderboard(
+            game=self.game, leaderboard_id=self.leaderboard_id, profile_id=profile_id, steam_id=steam_id
+        )
+        self.update(response)
+        return response.leaderboard[0] if response.leaderboard else None
+
+    def search(
+        self, prefix: str, field: str = "name", limit: int = 10, fallback: bool = True
+    ) -> list[LeaderBoardSpot]:
+        """
+        Find players whose 'name' (or 'clan') starts with the given prefix, case-insensitively.
+
+        Args:
+            prefix (str): The beginning of the name or clan to look for.
+            field (str): The field to search, either 'name' or 'clan'. Defaults to 'name'.
+            limit (int): Maximum number of entries to return. Defaults to 10.
+            fallback (bool): Whether to query the API (with the 'search' parameter) when no indexed
+                player matches. Defaults to True.
+
+        Raises:
+            Aoe2NetError: if 'field' is not one of 'name' or 'clan'.
+
+        Returns:
+            A list of matching LeaderBoardSpot entries, best ranked first.
+        """
+        if field not in _SEARCHABLE_FIELDS:
+            logger.error(f"Can only search on one of {_SEARCHABLE_FIELDS}, but '{field}' was provided.")
+            msg = "Invalid value for parameter 'field'."
+            raise Aoe2NetError(msg)
+
+        keys, profile_ids = self._sorted(field)
+        folded = prefix.casefold()
+        matches: list[LeaderBoardSpot] = []
+        for position in range(bisect_left(keys, folded), len(keys)):
+            if not keys[position].startswith(folded):
+                break
+            matches.append(self._by_profile_id[profile_ids[position]])
+        matches.sort(key=_rank_key)
+        self._count(hit=bool(matches))
+
+        if matches or not fallback or field != "name":
+            return matches[:limit]
+
+        logger.debug("No indexed player matches, querying the API")
+        response = self.client.leaderboard(
+            game=self.game, leaderboard_id=self.leaderboard_id, count=limit, search=prefix
+        )
+        self.update(response)
+        return sorted(response.leaderboard or [], key=_rank_key)[:limit]
+
+    def fuzzy_search(
+        self, query: str, limit: int = 5, min_similarity: float = 0.3
+    ) -> list[tuple[LeaderBoardSpot, float]]:
+        """
+        Find indexed players whose name is similar to the query, to handle misspelled names. The
+        underlying FuzzyNameIndex is built on the first call after the index was updated. This never
+        queries the API.
+
+        Args:
+            query (str): The (possibly misspelled) player name to look for.
+            limit (int): Maximum number of entries to return. Defaults to 5.
+            min_similarity (float): Minimum similarity score, between 0 and 1, for an entry to be
+                returned. Defaults to 0.3.
+
+        Returns:
+            A list of (LeaderBoardSpot, similarity) tuples, most similar first.
+        """
+        if self._fuzzy is None:
+            self._fuzzy = FuzzyNameIndex(self)
+        results = self._fuzzy.search(query, limit=limit, min_similarity=min_similarity)
+        self._count(hit=bool(results))
+        return results
+
+    def _sorted(self, field: str) -> tuple[list[str], list[int]]:
+        """The casefolded values of a field and their profile IDs, sorted by value, built on demand."""
+        if field not in self._sorted_keys:
+            logger.trace(f"Building sorted '{field}' keys for {len(self)} players")
+            pairs = sorted(
+                (getattr(spot, field).casefold(), profile_id)
+                for profile_id, spot in self._by_profile_id.items()
+                if getattr(spot, field)
+            )
+            self._sorted_keys[field] = ([key for key, _ in pairs], [profile_id for _, profile_id in pairs])
+        return self._sorted_keys[field]
+
+    def _count(self, hit: bool) -> None:
+        """Keep track of the lookups answered by the index."""
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+
+class FuzzyNameIndex:
+    """
+    The 'FuzzyNameIndex' class matches misspelled player names through an inverted index of character
+    trigrams. Each indexed name is split into the set of its (casefolded, padded) trigrams, and each
+    trigram maps to a compact array of the positions of the names containing it. A query only visits the
+    posting arrays of its own trigrams, and candidates are ranked by their Dice similarity to the query,
+    with the player's rating as tie-breaker.
+
+    Trigrams shared by more than 'max_posting' names carry little information: they are not used to
+    find candidates when a query has rarer trigrams, which bounds the work of each query on a full
+    ladder. The candidates found are still scored on all of their trigrams.
+    """
+
+    def __init__(self, spots: Iterable[LeaderBoardSpot], max_posting: int = 2_500):
+        """
+        Args:
+            spots (Iterable[LeaderBoardSpot]): the entries to index, for instance a PlayerIndex or the
+                'leaderboard' attribute of a LeaderBoardResponse. Entries without a name are skipped.
+            max_posting (int): Number of names above which a trigram is considered too common to be
+                used for candidates lookup, unless the query has no rarer trigram. Defaults to 2 500.
+        """
+        self.max_posting = max_posting
+        self._spots: list[LeaderBoardSpot] = []
+        self._ngram_counts = array("H")
+        self._postings: dict[str, array] = {}
+
+        for spot in spots:
+            if not spot.name:
+                continue
+            ngrams = _ngrams(spot.name)
+            position = len(self._spots)
+            self._spots.append(spot)
+            self._ngram_counts.append(min(len(ngrams), 0xFFFF))
+            for ngram in ngrams:
+                self._postings.setdefault(ngram, array("I")).append(position)
+        logger.trace(f"Indexed {len(self._spots)} names in {len(self._postings)} trigram postings")
+
+    def __len__(self) -> int:
+        return len(self._spots)
+
+    def search(
+        self, query: str, limit: int = 5, min_similarity: float = 0.3
+    ) -> list[tuple[LeaderBoardSpot, float]]:
+        """
+        Find the indexed names most similar to the query.
+
+        Args:
+            query (str): The (possibly misspelled) player name to look for.
+            limit (int): Maximum number of entries to return. Defaults to 5.
+            min_similarity (float): Minimum similarity score, between 0 and 1, for an entry to be
+                returned. Defaults to 0.3.
+
+        Returns:
+            A list of (LeaderBoardSpot, similarity) tuples, most similar first and highest rated first
+            among equally similar names.
+        """
+        ngrams = _ngrams(query)
+        postings = [self._postings[ngram] for ngram in ngrams if ngram in self._postings]
+        rare_postings = [posting for posting in postings if len(posting) <= self.max_posting]
+        pruned = bool(rare_postings) and len(rare_postings) < len(postings)
+        if rare_postings:
+            postings = rare_postings
+
+        shared: Counter[int] = Counter()
+        for posting in postings:
+            shared.update(posting)
+
+        scored = []
+        for position, shared_count in shared.items():
+            # Rare trigrams only select candidates, which are scored on all their trigrams
+            count = len(ngrams & _ngrams(self._spots[position].name)) if pruned else shared_count
+            similarity = 2 * count / (len(ngrams) + self._ngram_counts[position])
+            if similarity >= min_similarity:
+                scored.append((similarity, self._spots[position].rating or 0, position))
+        best = sorted(scored, reverse=True)[:limit]
+        return [(self._spots[position], round(similarity, 4)) for similarity, _, position in best]
+
+
+class LadderIndex:
+    """
+    The 'LadderIndex' class holds the ratings of the players of one or more leaderboards in memory, as
+    an array of ratings sorted in ascending order per 'leaderboard_id'. Binary search on these arrays
+    answers rank-for-rating, rating-for-rank and percentile queries without paging through the
+    leaderboard API endpoint.
+
+    It is filled from leaderboard pages or snapshots, either fed with 'update' or fetched with 'refresh'.
+    Each update replaces the ratings of the players it holds: small updates are patched into the sorted
+    arrays, larger ones mark them to be sorted again on the next query. Queries only account for indexed
+    players, so a ladder refreshed with 'max_entries' only knows about its top.
+    """
+
+    def __init__(self, client: AoE2NetAPI | None = None, game: str = "aoe2de"):
+        """
+        Args:
+            client (AoE2NetAPI): Optional. The client used to refresh the index. A new one is created if
+                not provided.
+            game (str): The game of the indexed leaderboards. Defaults to 'aoe2de'.
+        """
+        self.client = client or AoE2NetAPI()
+        self.game = game
+        self._ratings: dict[int, dict[int, int]] = {}  # leaderboard_id -> profile_id -> rating
+        self._ladders: dict[int, array] = {}  # built lazily, patched or reset on updates
+
+    def __repr__(self) -> str:
+        return f"Ladder index of leaderboards {sorted(self._ratings)} ({len(self)} players)"
+
+    def __len__(self) -> int:
+        return sum(len(ratings) for ratings in self._ratings.values())
+
+    @property
+    def leaderboards(self) -> list[int]:
+        """The IDs of the indexed leaderboards."""
+        return sorted(self._ratings)
+
+    def size(self, leaderboard_id: int = 3) -> int:
+        """
+        Args:
+            leaderboard_id (int): The leaderboard to look at. Defaults to 3.
+
+        Returns:
+            The number of players indexed for this leaderboard.
+        """
+        return len(self._ratings.get(leaderboard_id, {}))
+
+    def update(
+        self,
+        spots: LeaderBoardResponse | LeaderBoardSnapshot | Iterable[LeaderBoardSpot],
+        leaderboard_id: int | None = None,
+    ) -> int:
+        """
+        Add the ratings of entries to the index, replacing those of already indexed players. Entries
+        without a 'profile_id' or a 'rating' are skipped.
+
+        Args:
+            spots (LeaderBoardResponse | LeaderBoardSnapshot | Iterable[LeaderBoardSpot]): a
+                leaderboard page, a leaderboard snapshot, or any iterable of LeaderBoardSpot entries.
+            leaderboard_id (int): Optional. The leaderboard of the entries. Defaults to the
+                'leaderboard_id' of the page or snapshot, and is required for other iterables.
+
+        Raises:
+            Aoe2NetError: if the leaderboard of the entries is not known.
+
+        Returns:
+            The number of indexed entries.
+        """
+        if leaderboard_id is None:
+            leaderboard_id = getattr(spots, "leaderboard_id", None)
+        if leaderboard_id is None:
+            logger.error("Could not determine the leaderboard of the provided entries.")
+            msg = "A 'leaderboard_id' is required for entries that are not a leaderboard page or snapshot."
+            raise Aoe2NetError(msg)
+
+        if isinstance(spots, LeaderBoardResponse):
+            pairs = [(spot.profile_id, spot.rating) for spot in spots.leaderboard or []]
+        elif hasattr(spots, "column"):  # a LeaderBoardSnapshot, read column-wise to skip building spots
+            ratings = spots.column("rating")
+            missing = spots.missing_value("rating")
+            pairs = [
+                (profile_id, None if rating == missing else rating)
+                for profile_id, rating in zip(spots.column("profile_id").tolist(), ratings.tolist())
+            ]
+        else:
+            pairs = [(spot.profile_id, spot.rating) for spot in spots]
+
+        indexed = self._apply(leaderboard_id, [(pid, rating) for pid, rating in pairs if rating is not None])
+        logger.trace(f"Indexed {indexed} ratings of leaderboard {leaderboard_id}")
+        return indexed
+
+    def refresh(
+        self, leaderboard_id: int = 3, page_size: int = _MAX_LEADERBOARD_COUNT, max_entries: int | None = None
+    ) -> int:
+        """
+        Page through the leaderboard API endpoint and index the ratings of the received entries.
+
+        Args:
+            leaderboard_id (int): The leaderboard to refresh (Unranked=0, 1v1 Deathmatch=1, Team
+                Deathmatch=2, 1v1 Random Map=3, Team Random Map=4). Defaults to 3.
+            page_size (int): Number of entries to request per call (must be 10000 or less). Defaults to
+                10 000.
+            max_entries (int): Optional. Stop after indexing this many entries from the top of the
+                leaderboard.
+
+        Returns:
+            The number of indexed entries.
+        """
+        logger.debug(f"Refreshing ladder index from leaderboard {leaderboard_id} of '{self.game}'")
+        pages = _iter_leaderboard_pages(self.client, self.game, leaderboard_id, page_size, max_entries)
+        return sum(self.update(page, leaderboard_id=leaderboard_id) for page in pages)
+
+    def rank_for_rating(self, rating: int, leaderboard_id: int = 3) -> int:
+        """
+        Args:
+            rating (int): The rating to place on the ladder (ex: 1850).
+            leaderboard_id (int): The leaderboard to look at. Defaults to 3.
+
+        Raises:
+            Aoe2NetError: if no player is indexed for this leaderboard.
+
+        Returns:
+            The rank a player with this rating would have, players with equal ratings sharing a rank.
+        """
+        ladder = self._ladder(leaderboard_id)
+        return len(ladder) - bisect_right(ladder, rating) + 1
+
+    def rating_for_rank(self, rank: int, leaderboard_id: int = 3) -> int:
+        """
+        Args:
+            rank (int): The rank to look at, 1 being the top of the ladder.
+            leaderboard_id (int): The leaderboard to look at. Defaults to 3.
+
+        Raises:
+            Aoe2NetError: if no player is indexed for this leaderboard, or if the rank is out of the
+                indexed ladder.
+
+        Returns:
+            The rating of the player at this rank.
+        """
+        ladder = self._ladder(leaderboard_id)
+        if not 1 <= rank <= len(ladder):
+            logger.error(f"Rank {rank} is out of the {len(ladder)} players of leaderboard {leaderboard_id}")
+            msg = f"Invalid rank {rank}, expected a value between 1 and {len(ladder)}."
+            raise Aoe2NetError(msg)
+        return ladder[len(ladder) - rank]
+
+    def percentile(self, rating: int, leaderboard_id: int = 3) -> float:
+        """
+        Args:
+            rating (int): The rating to place on the ladder (ex: 1850).
+            leaderboard_id (int): The leaderboard to look at. Defaults to 3.
+
+        Raises:
+            Aoe2NetError: if no player is indexed for this leaderboard.
+
+        Returns:
+            The percentage, between 0 and 100, of indexed players rated strictly lower.
+        """
+        ladder = self._ladder(leaderboard_id)
+        return 100 * bisect_left(ladder, rating) / len(ladder)
+
+    def _apply(self, leaderboard_id: int, pairs: list[tuple[int | None, int]]) -> int:
+        """Record new ratings, patching the built ladder in place when only a few of them changed."""
+        ratings = self._ratings.setdefault(leaderboard_id, {})
+        changes: list[tuple[int | None, int]] = []
+        indexed = 0
+        for profile_id, rating in pairs:
+            if profile_id is None:
+                continue
+            previous = ratings.get(profile_id)
+            ratings[profile_id] = rating
+            indexed += 1
+            if previous != rating:
+                changes.append((previous, rating))
+
+        ladder = self._ladders.get(leaderboard_id)
+        if ladder is not None and len(changes) > _PATCH_FRACTION * len(ladder):
+            del self._ladders[leaderboard_id]
+        elif ladder is not None:
+            for previous, rating in changes:
+                if previous is not None:
+                    del ladder[bisect_left(ladder, previous)]
+                insort(ladder, rating)
+        return indexed
+
+    def _ladder(self, leaderboard_id: int) -> array:
+        """The ratings of a leaderboard's indexed players in ascending order, built on demand."""
+        if not self._ratings.get(leaderboard_id):
+            logger.error(f"No player indexed for leaderboard {leaderboard_id}")
+            msg = f"The ladder of leaderboard {leaderboard_id} is empty, please update or refresh it first."
+            raise Aoe2NetError(msg)
+        if leaderboard_id not in self._ladders:
+            logger.trace(f"Sorting {self.size(leaderboard_id)} ratings of leaderboard {leaderboard_id}")
+            self._ladders[leaderboard_id] = array("l", sorted(self._ratings[leaderboard_id].values()))
+        return self._ladders[leaderboard_id]
+
+
+# ----- Helpers ----- #
+
+
+def _ngrams(text: str, size: int = _NGRAM_SIZE) -> set[str]:
+    """
+    The set of character n-grams of a casefolded text, padded so that its start and end give their own
+    n-grams and short texts still have some.
+
+    Args:
+        text (str): the text to split.
+        size (int): the length of the n-grams. Defaults to 3.
+
+    Returns:
+        The set of the text's n-grams.
+    """
+    padded = " " * (size - 1) + text.casefold() + " "
+    return {padded[i : i + size] for i in range(len(padded) - size + 1)}
+
+
+def _rank_key(spot: LeaderBoardSpot) -> tuple[bool, int]:
+    """Sorting key to order LeaderBoardSpot entries by rank, unranked entries last."""
+    return (spot.rank is None, spot.rank or 0)
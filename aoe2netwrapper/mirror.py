@@ -0,0 +1,249 @@
+"""
+aoe2netwrapper.mirror
+---------------------
+
+This module implements a local SQLite mirror of leaderboard snapshots, kept up to date by incrementally
+syncing from the leaderboard API endpoint, so that rank and player lookups can be answered locally.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+
+from collections.abc import Iterable
+from pathlib import Path
+
+from loguru import logger
+
+from aoe2netwrapper.api import _MAX_LEADERBOARD_COUNT, AoE2NetAPI, _iter_leaderboard_pages
+from aoe2netwrapper.exceptions import Aoe2NetError
+from aoe2netwrapper.models.leaderboard import LeaderBoardSpot
+
+# Columns mirrored from LeaderBoardSpot, in table order, after 'leaderboard_id'
+_SPOT_COLUMNS: tuple[str, ...] = tuple(LeaderBoardSpot.model_fields)
+_VALUE_COLUMNS: tuple[str, ...] = tuple(column for column in _SPOT_COLUMNS if column != "profile_id")
+
+_SCHEMA: str = f"""
+CREATE TABLE IF NOT EXISTS leaderboard_spots (
+    leaderboard_id INTEGER NOT NULL,
+    profile_id INTEGER NOT NULL,
+    {", ".join(f"{column} TEXT COLLATE NOCASE" if column == "name" else column for column in _VALUE_COLUMNS)},
+    PRIMARY KEY (leaderboard_id, profile_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS spots_profile_id ON leaderboard_spots (profile_id);
+CREATE INDEX IF NOT EXISTS spots_steam_id ON leaderboard_spots (steam_id);
+CREATE INDEX IF NOT EXISTS spots_rank ON leaderboard_spots (leaderboard_id, rank);
+CREATE INDEX IF NOT EXISTS spots_name ON leaderboard_spots (leaderboard_id, name);
+"""
+
+# Only rows whose values differ from the stored ones are written, unchanged rows cost a lookup
+_UPSERT: str = f"""
+INSERT INTO leaderboard_spots (leaderboard_id, {", ".join(_SPOT_COLUMNS)})
+VALUES (:leaderboard_id, {", ".join(f":{column}" for column in _SPOT_COLUMNS)})
+ON CONFLICT (leaderboard_id, profile_id) DO UPDATE SET
+    {", ".join(f"{column} = excluded.{column}" for column in _VALUE_COLUMNS)}
+WHERE {" OR ".join(f"leaderboard_spots.{column} IS NOT excluded.{column}" for column in _VALUE_COLUMNS)}
+"""
+
+_SELECT: str = f"SELECT {', '.join(_SPOT_COLUMNS)} FROM leaderboard_spots"
+
+
+class LeaderBoardMirror:
+    """
+    The 'LeaderBoardMirror' class keeps the LeaderBoardSpot entries of one or several leaderboards in a
+    SQLite database, indexed on 'profile_id', 'steam_id', 'rank' and 'name' for fast local lookups. File
+    databases are opened in WAL mode so that readers are not blocked while a sync writes.
+
+    The 'sync' method pages through the leaderboard API endpoint and only writes the entries that changed
+    since the last sync.
+    """
+
+    def __init__(self, database: str | Path = ":memory:", client: AoE2NetAPI | None = None):
+        """
+        Args:
+            database (str | Path): path to the SQLite database file, created if needed. Defaults to an
+                in-memory database.
+            client (AoE2NetAPI): Optional. The client used to query the leaderboard API endpoint when
+                syncing. A new one is created if not provided.
+        """
+        self.database = str(database)
+        self.client = client or AoE2NetAPI()
+        self.connection = sqlite3.connect(self.database)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.execute("PRAGMA synchronous = NORMAL")
+        self.connection.executescript(_SCHEMA)
+
+    def __repr__(self) -> str:
+        return f"Leaderboard mirror at <{self.database}>"
+
+    def close(self) -> None:
+        """Close the connection to the database."""
+        self.connection.close()
+
+    def upsert(self, leaderboard_id: int, spots: Iterable[LeaderBoardSpot]) -> int:
+        """
+        Insert or update LeaderBoardSpot entries for the given leaderboard, in a single transaction.
+        Entries without a 'profile_id' cannot be keyed and are skipped.
+
+        Args:
+            leaderboard_id (int): the leaderboard the entries belong to.
+            spots (Iterable[LeaderBoardSpot]): the entries to store.
+
+        Returns:
+            The number of rows that were inserted or changed.
+        """
+        rows = [{"leaderboard_id": leaderboard_id, **_spot_to_row(spot)} for spot in spots if spot.profile_id]
+        logger.trace(f"Upserting {len(rows)} entries for leaderboard {leaderboard_id}")
+        changes_before = self.connection.total_changes
+        with self.connection:
+            self.connection.executemany(_UPSERT, rows)
+        return self.connection.total_changes - changes_before
+
+    def sync(
+        self,
+        game: str = "aoe2de",
+        leaderboard_id: int = 3,
+        page_size: int = _MAX_LEADERBOARD_COUNT,
+        max_entries: int | None = None,
+    ) -> int:
+        """
+        Page through the leaderboard API endpoint and upsert the received entries. When the whole
+        leaderboard was synced (no 'max_entries' limit), entries of players no longer on the leaderboard
+        are removed from the mirror.
+
+        Args:
+            game (str): The game for which to sync the leaderboard. Defaults to 'aoe2de'.
+            leaderboard_id (int): Leaderboard to sync (Unranked=0, 1v1 Deathmatch=1, Team Deathmatch=2,
+                1v1 Random Map=3, Team Random Map=4). Defaults to 3.
+            page_size (int): Number of entries to request per call (must be 10000 or less). Defaults to
+                10 000.
+            max_entries (int): Optional. Stop after syncing this many entries from the top of the
+                leaderboard.
+
+        Returns:
+            The number of rows that were inserted, changed or removed.
+        """
+        logger.debug(f"Syncing leaderboard {leaderboard_id} of '{game}' to mirror")
+        changes, seen = 0, set()
+        for page in _iter_leaderboard_pages(self.client, game, leaderboard_id, page_size, max_entries):
+            spots = page.leaderboard or []
+            changes += self.upsert(leaderboard_id, spots)
+            seen.update(spot.profile_id for spot in spots)
+
+        if max_entries is None:
+            changes += self._prune(leaderboard_id, seen)
+        logger.debug(f"Synced leaderboard {leaderboard_id} with {changes} changes")
+        return changes
+
+    def get(
+        self, leaderboard_id: int = 3, profile_id: int | None = None, steam_id: int | None = None
+    ) -> LeaderBoardSpot | None:
+        """
+        Look up a player's entry in the given leaderboard. Either 'profile_id' or 'steam_id' required.
+
+        Args:
+            leaderboard_id (int): Leaderboard to look into. Defaults to 3.
+            profile_id (int): The player's profile ID (ex: 459658).
+            steam_id (int): The player's steamID64 (ex: 76561199003184910).
+
+        Raises:
+            Aoe2NetError: if the not one of 'profile_id' or 'steam_id' are provided.
+
+        Returns:
+            The player's LeaderBoardSpot, or None if they are not in the mirror.
+        """
+        if profile_id:
+            query, value = "profile_id = ?", profile_id
+        elif steam_id:
+            query, value = "steam_id = ?", steam_id
+        else:
+            logger.error("Missing one of 'profile_id', 'steam_id'.")
+            msg = "Either 'profile_id' or 'steam_id' required, please provide one."
+            raise Aoe2NetError(msg)
+
+        row = self.connection.execute(
+            f"{_SELECT} WHERE leaderboard_id = ? AND {query}", (leaderboard_id, value)
+        ).fetchone()
+        return LeaderBoardSpot(**row) if row is not None else None
+
+    def at_rank(self, rank: int, leaderboard_id: int = 3) -> LeaderBoardSpot | None:
+        """
+        Look up the entry at a given rank in the given leaderboard.
+
+        Args:
+            rank (int): The rank to look up.
+            leaderboard_id (int): Leaderboard to look into. Defaults to 3.
+
+        Returns:
+            The LeaderBoardSpot at this rank, or None if there is none in the mirror.
+        """
+        row = self.connection.execute(
+            f"{_SELECT} WHERE leaderboard_id = ? AND rank = ?", (leaderboard_id, rank)
+        ).fetchone()
+        return LeaderBoardSpot(**row) if row is not None else None
+
+    def search(self, name: str, leaderboard_id: int = 3, limit: int = 10) -> list[LeaderBoardSpot]:
+        """
+        Find players whose name starts with the given string (case-insensitive for ASCII characters),
+        best ranked first.
+
+        Args:
+            name (str): The beginning of the player name to look for.
+            leaderboard_id (int): Leaderboard to look into. Defaults to 3.
+            limit (int): Maximum number of entries to return. Defaults to 10.
+
+        Returns:
+            A list of matching LeaderBoardSpot entries.
+        """
+        # A range scan on the NOCASE name index, rather than LIKE which may not use it
+        rows = self.connection.execute(
+            f"{_SELECT} WHERE leaderboard_id = ? AND name >= ? AND name < ? ORDER BY rank LIMIT ?",
+            (leaderboard_id, name, name + chr(0x10FFFF), limit),
+        ).fetchall()
+        return [LeaderBoardSpot(**row) for row in rows]
+
+    def count(self, leaderboard_id: int = 3) -> int:
+        """
+        Args:
+            leaderboard_id (int): Leaderboard to count entries for. Defaults to 3.
+
+        Returns:
+            The number of entries of this leaderboard in the mirror.
+        """
+        return self.connection.execute(
+            "SELECT COUNT(*) FROM leaderboard_spots WHERE leaderboard_id = ?", (leaderboard_id,)
+        ).fetchone()[0]
+
+    def _prune(self, leaderboard_id: int, keep: set[int]) -> int:
+        """Remove the entries of a leaderboard whose 'profile_id' is not in 'keep'."""
+        with self.connection:
+            self.connection.execute("CREATE TEMP TABLE IF NOT EXISTS synced (profile_id INTEGER PRIMARY KEY)")
+            self.connection.execute("DELETE FROM synced")
+            self.connection.executemany("INSERT INTO synced VALUES (?)", ((pid,) for pid in keep))
+            cursor = self.connection.execute(
+                "DELETE FROM leaderboard_spots WHERE leaderboard_id = ? "
+                "AND profile_id NOT IN (SELECT profile_id FROM synced)",
+                (leaderboard_id,),
+            )
+        return cursor.rowcount
+
+
+# ----- Helpers ----- #
+
+
+def _spot_to_row(spot: LeaderBoardSpot) -> dict:
+    """
+    Dump a LeaderBoardSpot to a dictionary of values SQLite can store. The 'icon' attribute has no fixed
+    type and is stored as text.
+
+    Args:
+        spot (LeaderBoardSpot): the entry to dump.
+
+    Returns:
+        The dictionary of the entry's values.
+    """
+    row = spot.model_dump()
+    if row["icon"] is not None:
+        row["icon"] = str(row["icon"])
+    return row
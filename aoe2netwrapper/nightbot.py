@@ -7,15 +7,128 @@ This module implements a high-level client to query the API at https://aoe2.net/
 
 from __future__ import annotations
 
-from typing import Any
+import threading
+import time
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any
 
 import requests
 
 from loguru import logger
+from pydantic import BaseModel, Field
 
 from aoe2netwrapper.exceptions import NightBotError
 
+if TYPE_CHECKING:
+    from aoe2netwrapper.resolver import ProfileResolver
+
 _OK_STATUS_CODE: int = 200
+_NOT_FOUND_TEXT: str = "Player not found"
+
+
+class NightbotCache:
+    """
+    The 'NightbotCache' class is a thread-safe cache for the text responses of the Nightbot API
+    endpoints, given to an AoE2NightbotAPI to avoid querying the network for the same player over and
+    over. Each endpoint has its own time-to-live: rank details barely change during a stream, while
+    the current match, civilisations and map change from one game to the next. Responses for unknown
+    players are cached too (negative caching), with their own time-to-live.
+
+    The 'hits' and 'misses' attributes count lookups served from the cache and lookups which were not.
+    Least recently used entries are evicted once 'max_size' entries are cached.
+    """
+
+    DEFAULT_TTLS: dict[str, float] = {  # noqa: RUF012
+        "rank": 300.0,
+        "opponent": 60.0,
+        "match": 20.0,
+        "civs": 20.0,
+        "map": 20.0,
+    }
+
+    def __init__(
+        self, ttls: dict[str, float] | None = None, negative_ttl: float = 60.0, max_size: int = 10_000
+    ):
+        """
+        Args:
+            ttls (dict[str, float]): Optional. Time-to-live in seconds of the responses of each endpoint,
+                by endpoint name ('rank', 'opponent', 'match', 'civs', 'map'), overriding the defaults
+                of 300 seconds for 'rank', 60 seconds for 'opponent' and 20 seconds for the others.
+            negative_ttl (float): Time-to-live in seconds of 'Player not found' responses. Defaults to
+                60.
+            max_size (int): Maximum number of cached responses. Defaults to 10 000.
+        """
+        self.ttls = {**self.DEFAULT_TTLS, **(ttls or {})}
+        self.negative_ttl = negative_ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple, tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return f"Nightbot cache with {len(self)} responses ({self.hits} hits, {self.misses} misses)"
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, url: str, params: dict[str, Any] | None = None) -> str | None:
+        """
+        Args:
+            url (str): the endpoint queried.
+            params (dict): the parameters of the query.
+
+        Returns:
+            The cached text response to the query, None if there is none or it expired.
+        """
+        key = _cache_key(url, params)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, url: str, params: dict[str, Any] | None, text: str) -> None:
+        """
+        Cache the text response to a query, for the time-to-live of its endpoint (or the negative one
+        if the player was not found). Responses of endpoints without a time-to-live are not cached.
+
+        Args:
+            url (str): the endpoint queried.
+            params (dict): the parameters of the query.
+            text (str): the text response to cache.
+        """
+        ttl = self.negative_ttl if text.strip() == _NOT_FOUND_TEXT else self.ttls.get(_endpoint_name(url))
+        if not ttl:
+            return
+        key = _cache_key(url, params)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, text)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Remove all cached responses. Hit and miss counts are kept."""
+        with self._lock:
+            self._entries.clear()
+
+
+class NightbotOverview(BaseModel):
+    """An object to encapsulate the combined responses of the Nightbot endpoints about a player."""
+
+    rank: str | None = Field(None, description="Rank details about the player")
+    opponent: str | None = Field(None, description="Rank details about the player's last opponent")
+    match: str | None = Field(None, description="Details about the player's current or last match")
+    civs: str | None = Field(None, description="Civilisations of the player's current or last match")
+    map: str | None = Field(None, description="Map of the player's current or last match")
+    errors: dict[str, str] = Field(default_factory=dict, description="Error message of failed queries")
 
 
 class AoE2NightbotAPI:
@@ -31,10 +144,27 @@ class AoE2NightbotAPI:
     CURRENT_CIVS_ENDPOINT = NIGHTBOT_BASE_URL + "/civs"
     CURRENT_MAP_ENDPOINT = NIGHTBOT_BASE_URL + "/map"
 
-    def __init__(self, timeout: float | tuple[float, float] = 5):
-        """Creating a Session for connection pooling since we're always querying the same host."""
+    def __init__(
+        self,
+        timeout: float | tuple[float, float] = 5,
+        cache: NightbotCache | None = None,
+        resolver: ProfileResolver | None = None,
+    ):
+        """
+        Creating a Session for connection pooling since we're always querying the same host.
+
+        Args:
+            timeout (float | tuple[float, float]): Timeout of the requests, in seconds. Defaults to 5.
+            cache (NightbotCache): Optional. A cache for the text responses of the endpoints. Responses
+                are not cached if not provided.
+            resolver (ProfileResolver): Optional. A cache of player names resolved to profile IDs, to
+                send queries by 'search' as queries by 'profile_id'. Queries are sent as given if not
+                provided.
+        """
         self.session = requests.Session()
         self.timeout = timeout
+        self.cache = cache
+        self.resolver = resolver
 
     def __repr__(self) -> str:
         return f"Client for <{self.NIGHTBOT_BASE_URL}>"
@@ -94,12 +224,7 @@ class AoE2NightbotAPI:
             "profile_id": profile_id,
         }
 
-        return _get_request_text_response_decoded(
-            session=self.session,
-            url=self.RANK_DETAILS_ENDPOINT,
-            params=query_params,
-            timeout=self.timeout,
-        )
+        return self._query(url=self.RANK_DETAILS_ENDPOINT, params=query_params)
 
     def opponent(
         self,
@@ -157,12 +282,7 @@ class AoE2NightbotAPI:
             "profile_id": profile_id,
         }
 
-        return _get_request_text_response_decoded(
-            session=self.session,
-            url=self.RECENT_OPPONENT_ENDPOINT,
-            params=query_params,
-            timeout=self.timeout,
-        )
+        return self._query(url=self.RECENT_OPPONENT_ENDPOINT, params=query_params)
 
     def match(
         self,
@@ -224,12 +344,7 @@ class AoE2NightbotAPI:
             "profile_id": profile_id,
         }
 
-        return _get_request_text_response_decoded(
-            session=self.session,
-            url=self.CURRENT_MATCH_ENDPOINT,
-            params=query_params,
-            timeout=self.timeout,
-        )
+        return self._query(url=self.CURRENT_MATCH_ENDPOINT, params=query_params)
 
     def civs(
         self,
@@ -283,12 +398,7 @@ class AoE2NightbotAPI:
             "profile_id": profile_id,
         }
 
-        return _get_request_text_response_decoded(
-            session=self.session,
-            url=self.CURRENT_CIVS_ENDPOINT,
-            params=query_params,
-            timeout=self.timeout,
-        )
+        return self._query(url=self.CURRENT_CIVS_ENDPOINT, params=query_params)
 
     def map(
         self,
@@ -342,12 +452,99 @@ class AoE2NightbotAPI:
             "profile_id": profile_id,
         }
 
-        return _get_request_text_response_decoded(
+        return self._query(url=self.CURRENT_MAP_ENDPOINT, params=query_params)
+
+    def overview(
+        self,
+        game: str = "aoe2de",
+        leaderboard_id: int = 3,
+        language: str = "en",
+        flag: str = "true",
+        search: str | None = None,
+        steam_id: int | None = None,
+        profile_id: int | None = None,
+    ) -> NightbotOverview:
+        """
+        Request rank details, last opponent, current match, civilisations and map of a player at once.
+        The five queries are sent concurrently over the client's pooled session, so the overview takes
+        about as long as the slowest of them. A failing query does not fail the others: its field is
+        left empty and its error message is reported in the 'errors' field. Either 'search',
+        'steam_id' or 'profile_id' required.
+
+        Args:
+            game (str): The game for which to extract the list of strings. Defaults to 'aoe2de'.
+                Possibilities are 'aoe2hd' (Age of Empires 2: HD Edition) and 'aoe2de' (Age of
+                Empires 2: Definitive Edition).
+            leaderboard_id (int): Leaderboard to extract the data for (Unranked=0,
+                1v1 Deathmatch=1, Team Deathmatch=2, 1v1 Random Map=3, Team Random Map=4).
+                Defaults to 3.
+            language (str): language for the returned response ('en', 'de', 'el', 'es', 'es-MX',
+                'fr', 'hi', 'it', 'ja', 'ko', 'ms', 'nl', 'pt', 'ru', 'tr', 'vi', 'zh', 'zh-TW').
+                Defaults to 'en'.
+            flag (str): boolean to show the player flag. Defaults to 'true'. Needs to be a string
+                for now since requests transforms True boolean to 'True' and the API rejects that.
+            search (str): To perform the search for a specific player, from their name. Will
+                return the highest rated player that matches the search.
+            steam_id (int): To perform the search for a specific player, from their steamID64
+                (ex: 76561199003184910).
+            profile_id (int): To perform the search for a specific player, from their profile ID
+                (ex: 459658).
+
+        Raises:
+            NightBotError: if the not one of 'search', 'steam_id' or 'profile_id' are provided.
+
+        Returns:
+            A NightbotOverview validated object with the text content of each response.
+        """
+        if not any((search, steam_id, profile_id)):
+            logger.error("Missing one of 'search', 'steam_id', 'profile_id'.")
+            msg = "Either 'search', 'steam_id' or 'profile_id' required, please provide one."
+            raise NightBotError(msg)
+
+        logger.debug("Preparing parameters for overview queries")
+        common = {"game": game, "leaderboard_id": leaderboard_id, "language": language}
+        player = {"search": search, "steam_id": steam_id, "profile_id": profile_id}
+        if self.resolver is not None:  # once here rather than in each of the concurrent queries
+            resolved = self.resolver.rewrite({**common, **player})
+            player = {key: resolved[key] for key in player}
+        queries = {
+            "rank": (self.RANK_DETAILS_ENDPOINT, {**common, "flag": flag, **player}),
+            "opponent": (self.RECENT_OPPONENT_ENDPOINT, {**common, "flag": flag, **player}),
+            "match": (self.CURRENT_MATCH_ENDPOINT, {**common, "color": "true", "flag": flag, **player}),
+            "civs": (self.CURRENT_CIVS_ENDPOINT, {**common, **player}),
+            "map": (self.CURRENT_MAP_ENDPOINT, {**common, **player}),
+        }
+
+        with ThreadPoolExecutor(max_workers=len(queries)) as executor:
+            futures = {
+                field: executor.submit(self._query, url=url, params=params)
+                for field, (url, params) in queries.items()
+            }
+        overview = NightbotOverview()
+        for field, future in futures.items():
+            try:
+                setattr(overview, field, future.result())
+            except (NightBotError, requests.RequestException) as error:
+                logger.warning(f"Overview query for '{field}' failed: {error}")
+                overview.errors[field] = str(error)
+        return overview
+
+    def _query(self, url: str, params: dict[str, Any]) -> str:
+        """Query an endpoint, through the resolver and the cache if the client has them."""
+        if self.resolver is not None:
+            params = self.resolver.rewrite(params)
+        if self.cache is not None and (cached := self.cache.get(url, params)) is not None:
+            logger.trace(f"Serving response from '{url}' from cache")
+            return cached
+        text = _get_request_text_response_decoded(
             session=self.session,
-            url=self.CURRENT_MAP_ENDPOINT,
-            params=query_params,
+            url=url,
+            params=params,
             timeout=self.timeout,
         )
+        if self.cache is not None:
+            self.cache.put(url, params, text)
+        return text
 
 
 # ----- Helpers ----- #
@@ -384,3 +581,13 @@ def _get_request_text_response_decoded(
         msg = f"Expected status code 200 - got {response.status_code} instead."
         raise NightBotError(msg)
     return response.text
+
+
+def _endpoint_name(url: str) -> str:
+    """The name of a Nightbot endpoint from its URL, e.g. 'rank' for 'https://aoe2.net/api/nightbot/rank'."""
+    return url.rstrip("/").rsplit("/", 1)[-1]
+
+
+def _cache_key(url: str, params: dict[str, Any] | None) -> tuple:
+    """A hashable key for a query, ignoring unset parameters."""
+    return (url, *sorted((key, str(value)) for key, value in (params or {}).items() if value is not None))
@@ -0,0 +1,266 @@
+"""
+aoe2netwrapper.relay
+--------------------
+
+This module implements a caching relay for the Nightbot API, to be shared by the chat bots of many
+channels so that upstream traffic grows with the number of distinct players queried, not with chat
+volume.
+"""
+
+from __future__ import annotations
+
+import copy
+import inspect
+import json
+import threading
+import time
+
+from collections import OrderedDict
+from collections.abc import Callable
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+from urllib.parse import parse_qs, urlsplit
+
+import requests
+
+from loguru import logger
+
+from aoe2netwrapper.exceptions import NightBotError
+from aoe2netwrapper.nightbot import AoE2NightbotAPI, NightbotCache
+
+_ROUTES: tuple[str, ...] = ("rank", "opponent", "match", "civs", "map")
+_PLAYER_PARAMETERS: tuple[str, ...] = ("search", "steam_id", "profile_id")
+
+
+class NightbotRelay:
+    """
+    The 'NightbotRelay' class is a local HTTP server exposing the same '/nightbot/*' routes as aoe2.net
+    ('rank', 'opponent', 'match', 'civs' and 'map', with the same parameters), answered through a shared
+    AoE2NightbotAPI client. On top of the client's NightbotCache, identical queries arriving while one is
+    already in flight wait for its result instead of being sent upstream again (single-flight).
+
+    Each channel is rate limited with a token bucket. Channels are identified by the 'Nightbot-Channel'
+    header that Nightbot sends with its requests, else by a 'channel' query parameter, else by the
+    client's address. Only the buckets of the most recently seen channels are kept: a channel whose
+    bucket was dropped starts again with a full one. Counters are served as JSON at '/metrics'.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        client: AoE2NightbotAPI | None = None,
+        rate_limit: float = 1.0,
+        burst: int = 10,
+        max_channels: int = 10_000,
+    ):
+        """
+        Args:
+            host (str): The address to listen on. Defaults to '127.0.0.1'.
+            port (int): The port to listen on. Defaults to 0, which picks a free port.
+            client (AoE2NightbotAPI): Optional. The client used to query upstream. If not provided, one
+                is created with a default NightbotCache. A provided client without a cache is copied, and
+                the copy is given one.
+            rate_limit (float): Sustained number of requests per second allowed for each channel.
+                Defaults to 1.
+            burst (int): Number of requests a channel can send at once before being rate limited.
+                Defaults to 10.
+            max_channels (int): Maximum number of channels whose token bucket is kept, the least
+                recently seen ones being dropped first. Defaults to 10 000.
+        """
+        self.client = client or AoE2NightbotAPI()
+        if self.client.cache is None:
+            self.client = copy.copy(self.client)  # shares the session, leaves the caller's client as is
+            self.client.cache = NightbotCache()
+        self.rate_limit = rate_limit
+        self.burst = burst
+        self.max_channels = max_channels
+        self.metrics: dict[str, int] = {"requests": 0, "rate_limited": 0, "coalesced": 0, "errors": 0}
+
+        self._lock = threading.Lock()
+        # Channel -> (tokens, last refill time), least recently seen channels first
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._in_flight: dict[tuple, _Flight] = {}
+
+        self._server = ThreadingHTTPServer((host, port), _RelayRequestHandler)
+        self._server.daemon_threads = True
+        self._server.relay = self  # type: ignore[attr-defined]
+        self._thread: threading.Thread | None = None
+
+    def __repr__(self) -> str:
+        return f"Nightbot relay at <{self.url}>"
+
+    def __enter__(self) -> NightbotRelay:
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    @property
+    def url(self) -> str:
+        """The base URL of the relay's routes, equivalent to 'https://aoe2.net/api/nightbot'."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/nightbot"
+
+    def start(self) -> NightbotRelay:
+        """Start serving requests in a background thread."""
+        logger.debug(f"Starting Nightbot relay at <{self.url}>")
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop serving requests and close the listening socket."""
+        logger.debug(f"Stopping Nightbot relay at <{self.url}>")
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def snapshot_metrics(self) -> dict[str, int]:
+        """
+        Returns:
+            The relay's counters: requests received, rate limited, coalesced with an in-flight query,
+            and failed, along with the cache hits, misses and size, and the number of channels tracked.
+        """
+        cache = self.client.cache
+        with self._lock:
+            return {
+                **self.metrics,
+                "cache_hits": cache.hits,
+                "cache_misses": cache.misses,
+                "cached_responses": len(cache),
+                "channels": len(self._buckets),
+            }
+
+    def query(self, route: str, params: dict[str, str]) -> str:
+        """
+        Answer a query to one of the Nightbot routes, through the cache and coalescing identical queries
+        in flight.
+
+        Args:
+            route (str): One of 'rank', 'opponent', 'match', 'civs' or 'map'.
+            params (dict[str, str]): The query's parameters. Those the route does not take are ignored.
+
+        Raises:
+            NightBotError: if the query is invalid or the upstream query failed.
+
+        Returns:
+            The text response to the query.
+        """
+        method = getattr(self.client, route)
+        accepted = inspect.signature(method).parameters
+        kwargs = {key: value for key, value in params.items() if key in accepted}
+        key = (route, *sorted(kwargs.items()))
+        return self._single_flight(key, lambda: method(**kwargs))
+
+    # ----- Internals ----- #
+
+    def _admit(self, channel: str) -> bool:
+        """Count a request from a channel, and whether its token bucket allows it."""
+        now = time.monotonic()
+        with self._lock:
+            self.metrics["requests"] += 1
+            tokens, last_refill = self._buckets.get(channel, (float(self.burst), now))
+            tokens = min(float(self.burst), tokens + (now - last_refill) * self.rate_limit)
+            admitted = tokens >= 1
+            self._buckets[channel] = (tokens - 1 if admitted else tokens, now)
+            self._buckets.move_to_end(channel)
+            while len(self._buckets) > self.max_channels:
+                self._buckets.popitem(last=False)
+            if not admitted:
+                self.metrics["rate_limited"] += 1
+            return admitted
+
+    def _single_flight(self, key: tuple, function: Callable[[], str]) -> str:
+        """Run a function for a key, or wait for the result of the call already running for that key."""
+        with self._lock:
+            flight = self._in_flight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._in_flight[key] = _Flight()
+            else:
+                self.metrics["coalesced"] += 1
+
+        if not leader:
+            flight.done.wait()
+        else:
+            try:
+                flight.result = function()
+            except Exception as error:  # noqa: BLE001 - shared with the waiting requests, raised below
+                flight.error = error
+            finally:
+                with self._lock:
+                    del self._in_flight[key]
+                flight.done.set()
+
+        if isinstance(flight.error, (NightBotError, requests.RequestException)):
+            raise NightBotError(str(flight.error)) from flight.error
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+
+class _Flight:
+    """The state of a query in flight, shared by all requests waiting for its result."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: str = ""
+        self.error: Exception | None = None
+
+
+class _RelayRequestHandler(BaseHTTPRequestHandler):
+    """Dispatch GET requests to the NightbotRelay the handling server belongs to."""
+
+    protocol_version = "HTTP/1.1"  # keep connections alive
+    disable_nagle_algorithm = True  # headers and body are separate writes, do not delay the latter
+
+    def do_GET(self) -> None:  # noqa: N802
+        relay: NightbotRelay = self.server.relay  # type: ignore[attr-defined]
+        parts = urlsplit(self.path)
+        params = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+        path = parts.path.rstrip("/")
+
+        if path == "/metrics":
+            self._reply(200, json.dumps(relay.snapshot_metrics()), content_type="application/json")
+            return
+        route = path.removeprefix("/api").removeprefix("/nightbot/")
+        if route not in _ROUTES:
+            self._reply(404, "Not found")
+            return
+        if not relay._admit(self._channel(params)):  # noqa: SLF001
+            self._reply(429, "Too many requests, please slow down")
+            return
+        if not any(params.get(parameter) for parameter in _PLAYER_PARAMETERS):
+            self._reply(400, "Either 'search', 'steam_id' or 'profile_id' required, please provide one.")
+            return
+
+        try:
+            self._reply(200, relay.query(route, params))
+        except Exception as error:  # noqa: BLE001 - any failure gets an answer, not a dropped connection
+            logger.warning(f"Relayed query to '{route}' failed: {error!r}")
+            with relay._lock:  # noqa: SLF001
+                relay.metrics["errors"] += 1
+            self._reply(502, "Upstream query failed")
+
+    def _channel(self, params: dict[str, str]) -> str:
+        """The channel a request is from, see the NightbotRelay documentation."""
+        header = self.headers.get("Nightbot-Channel")
+        if header:
+            fields = {key: values[-1] for key, values in parse_qs(header).items()}
+            return fields.get("providerId") or fields.get("name") or header
+        return params.pop("channel", None) or self.client_address[0]
+
+    def _reply(self, status: int, text: str, content_type: str = "text/plain") -> None:
+        body = text.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        if status == 429:  # noqa: PLR2004
+            self.send_header("Retry-After", "1")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+        """Silence the default per-request logging to stderr."""
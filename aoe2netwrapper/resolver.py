@@ -0,0 +1,145 @@
+"""
+aoe2netwrapper.resolver
+-----------------------
+
+This module implements a cache resolving player names to profile IDs, so that queries by name are
+sent to the API by profile ID, without a name search on the server for each of them.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+
+from collections import OrderedDict
+from typing import Any
+
+from loguru import logger
+
+from aoe2netwrapper.api import AoE2NetAPI
+
+
+class ProfileResolver:
+    """
+    The 'ProfileResolver' class is a thread-safe cache mapping 'search' strings to the 'profile_id' of
+    the player they designate, given to an AoE2NightbotAPI or an AoE2NetAPI so that their queries by
+    'search' are rewritten as queries by 'profile_id'. A name is resolved once with a leaderboard search,
+    and the mapping is kept for a time-to-live. Names matching no player are cached too (negative
+    caching), with their own time-to-live, and queries for them are sent with 'search' unchanged.
+
+    Resolution is case-insensitive. Among the players matching a search, the highest ranked one is picked,
+    as the Nightbot endpoints do for name searches. The 'hits' and 'misses' attributes count resolutions
+    served from the cache and those which were not. Least recently used entries are evicted once
+    'max_size' entries are cached.
+    """
+
+    def __init__(
+        self,
+        client: AoE2NetAPI | None = None,
+        ttl: float = 3600.0,
+        negative_ttl: float = 300.0,
+        max_size: int = 10_000,
+    ):
+        """
+        Args:
+            client (AoE2NetAPI): Optional. The client used to search the leaderboards. A new one is
+                created if not provided.
+            ttl (float): Time-to-live in seconds of resolved names. Defaults to 3600.
+            negative_ttl (float): Time-to-live in seconds of names matching no player. Defaults to 300.
+            max_size (int): Maximum number of cached names. Defaults to 10 000.
+        """
+        self.client = client or AoE2NetAPI()
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple, tuple[float, int | None]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._searching = threading.local()  # set while a thread searches, so its search is not rewritten
+
+    def __repr__(self) -> str:
+        return f"Profile resolver with {len(self)} names ({self.hits} hits, {self.misses} misses)"
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def resolve(self, search: str, game: str = "aoe2de", leaderboard_id: int | None = 3) -> int | None:
+        """
+        Resolve a name to the profile ID of the player it designates, from the cache or with a
+        leaderboard search.
+
+        Args:
+            search (str): the name to resolve.
+            game (str): The game of the leaderboard to search. Defaults to 'aoe2de'.
+            leaderboard_id (int): Leaderboard to search (Unranked=0, 1v1 Deathmatch=1, Team
+                Deathmatch=2, 1v1 Random Map=3, Team Random Map=4). Defaults to 3, also used if None
+                is given.
+
+        Returns:
+            The profile ID of the player, None if no player matches the name.
+        """
+        leaderboard_id = 3 if leaderboard_id is None else int(leaderboard_id)
+        key = (game, leaderboard_id, search.strip().casefold())
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        profile_id = self._search(search, game, leaderboard_id)
+        ttl = self.ttl if profile_id is not None else self.negative_ttl
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, profile_id)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return profile_id
+
+    def rewrite(self, params: dict[str, Any]) -> dict[str, Any]:
+        """
+        Rewrite the parameters of a query by 'search' into those of the same query by 'profile_id',
+        if the name resolves to a player. Queries by 'steam_id' or 'profile_id', or for names matching
+        no player, are returned unchanged.
+
+        Args:
+            params (dict): the parameters of the query, with their 'game' and 'leaderboard_id'.
+
+        Returns:
+            The parameters to send the query with.
+        """
+        search = params.get("search")
+        if not search or params.get("steam_id") or params.get("profile_id"):
+            return params
+        if getattr(self._searching, "active", False):  # the resolution's own search, given this resolver
+            return params
+        profile_id = self.resolve(
+            search, game=params.get("game") or "aoe2de", leaderboard_id=params.get("leaderboard_id")
+        )
+        if profile_id is None:
+            return params
+        logger.trace(f"Resolved search '{search}' to profile ID {profile_id}")
+        return {**params, "search": None, "profile_id": profile_id}
+
+    def clear(self) -> None:
+        """Remove all cached names. Hit and miss counts are kept."""
+        with self._lock:
+            self._entries.clear()
+
+    def _search(self, search: str, game: str, leaderboard_id: int) -> int | None:
+        """Search a leaderboard for a name, and pick the profile ID it designates."""
+        logger.debug(f"Resolving search '{search}' on leaderboard {leaderboard_id}")
+        self._searching.active = True
+        try:
+            response = self.client.leaderboard(
+                game=game, leaderboard_id=leaderboard_id, start=1, count=1, search=search
+            )
+        finally:
+            self._searching.active = False
+        spots = response.leaderboard
+        if not spots or spots[0].profile_id is None:
+            logger.debug(f"No player found for search '{search}'")
+            return None
+        return spots[0].profile_id
@@ -0,0 +1,230 @@
+"""
+aoe2netwrapper.snapshot
+-----------------------
+
+This module implements a fixed-width binary format for leaderboard snapshots, which is memory-mapped
+when read so that many processes can share one snapshot without deserializing or copying it.
+"""
+
+from __future__ import annotations
+
+import time
+
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+
+from loguru import logger
+
+from aoe2netwrapper.models import LeaderBoardResponse
+from aoe2netwrapper.models.leaderboard import LeaderBoardSpot
+
+try:
+    import numpy as np
+except ImportError as error:
+    logger.error("User tried to use the 'snapshot' submodule without the 'numpy' library.")
+    msg = "The 'snapshot' submodule requires the 'numpy' library to function."
+    raise NotImplementedError(msg) from error
+
+from aoe2netwrapper.arrayfile import map_arrays, write_arrays
+
+_MAGIC: bytes = b"AOE2LBS1"
+
+# Integer fields of a LeaderBoardSpot, each stored at a fixed width. Missing values are stored as the
+# smallest value of the field's dtype. The player's icon is not stored
+_INTEGER_FIELDS: dict[str, str] = {
+    "profile_id": "<i8",
+    "rank": "<i4",
+    "rating": "<i4",
+    "steam_id": "<i8",
+    "previous_rating": "<i4",
+    "highest_rating": "<i4",
+    "streak": "<i4",
+    "lowest_streak": "<i4",
+    "highest_streak": "<i4",
+    "games": "<i4",
+    "wins": "<i4",
+    "losses": "<i4",
+    "drops": "<i4",
+    "last_match": "<i8",
+    "last_match_time": "<i8",
+}
+# Text fields are stored as the id of the string in the snapshot's string table, -1 when missing
+_STRING_FIELDS: tuple[str, ...] = ("name", "clan", "country")
+_RECORD_DTYPE = np.dtype(list(_INTEGER_FIELDS.items()) + [(field, "<i4") for field in _STRING_FIELDS])
+
+
+class LeaderBoardSnapshot:
+    """
+    The 'LeaderBoardSnapshot' class reads leaderboard snapshots written with its 'write' classmethod.
+    A snapshot file holds one fixed-width record per LeaderBoardSpot, and a string table with each
+    distinct name, clan and country once, as UTF-8 bytes and offsets.
+
+    Opening a snapshot only memory-maps the file: 'column' returns zero-copy NumPy views on a field of
+    all records, and LeaderBoardSpot objects are only built when accessed by position or iteration. Since
+    the mapping is read-only and backed by the page cache, worker processes opening the same snapshot
+    share its memory.
+    """
+
+    def __init__(self, path: str | Path):
+        """
+        Args:
+            path (str | Path): the snapshot file to memory-map.
+
+        Raises:
+            ValueError: if the file is not a leaderboard snapshot.
+        """
+        self.path = Path(path)
+        logger.debug(f"Memory-mapping leaderboard snapshot at '{self.path}'")
+        arrays, metadata = map_arrays(self.path, magic=_MAGIC)
+        self.records: np.ndarray = arrays["records"]
+        self._string_data: np.ndarray = arrays["string_data"]
+        self._string_offsets: np.ndarray = arrays["string_offsets"]
+        self.leaderboard_id: int | None = metadata.get("leaderboard_id")
+        self.total: int | None = metadata.get("total")
+        self.created: float | None = metadata.get("created")
+
+    def __repr__(self) -> str:
+        return f"Leaderboard snapshot of {len(self)} players from '{self.path}'"
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __getitem__(self, position: int) -> LeaderBoardSpot:
+        record = self.records[position]
+        fields = {
+            field: None if record[field] == _missing_value(field) else int(record[field])
+            for field in _INTEGER_FIELDS
+        }
+        fields.update({field: self.string(int(record[field])) for field in _STRING_FIELDS})
+        return LeaderBoardSpot(**fields)
+
+    def __iter__(self) -> Iterator[LeaderBoardSpot]:
+        for position in range(len(self)):
+            yield self[position]
+
+    def column(self, field: str) -> np.ndarray:
+        """
+        Get a field of all records as a zero-copy view on the memory-mapped file. Missing values hold
+        the smallest value of the field's dtype, and text fields hold string ids (see 'string').
+
+        Args:
+            field (str): the LeaderBoardSpot field to get (ex: 'rating').
+
+        Raises:
+            KeyError: if the field is not stored in snapshots.
+
+        Returns:
+            A read-only NumPy array with the field's value for each record, in snapshot order.
+        """
+        if field not in _RECORD_DTYPE.names:
+            logger.error(f"Field '{field}' is not stored in leaderboard snapshots")
+            msg = f"Unknown snapshot field '{field}', expected one of {list(_RECORD_DTYPE.names)}."
+            raise KeyError(msg)
+        return self.records[field]
+
+    def missing_value(self, field: str) -> int:
+        """
+        Args:
+            field (str): an integer LeaderBoardSpot field stored in snapshots (ex: 'rating').
+
+        Raises:
+            KeyError: if the field is not an integer field stored in snapshots.
+
+        Returns:
+            The value marking missing values in the field's column, the smallest value of its dtype.
+        """
+        if field not in _INTEGER_FIELDS:
+            logger.error(f"Field '{field}' is not an integer field of leaderboard snapshots")
+            msg = f"Unknown integer snapshot field '{field}', expected one of {list(_INTEGER_FIELDS)}."
+            raise KeyError(msg)
+        return _missing_value(field)
+
+    def string(self, string_id: int) -> str | None:
+        """
+        Args:
+            string_id (int): the id of a string in the snapshot's string table, as found in the 'name',
+                'clan' and 'country' columns.
+
+        Returns:
+            The decoded string, None for the id of a missing value (-1).
+        """
+        if string_id < 0:
+            return None
+        start, end = self._string_offsets[string_id], self._string_offsets[string_id + 1]
+        return self._string_data[start:end].tobytes().decode("utf-8")
+
+    @classmethod
+    def write(
+        cls,
+        path: str | Path,
+        leaderboard: LeaderBoardResponse | Iterable[LeaderBoardSpot],
+        leaderboard_id: int | None = None,
+        total: int | None = None,
+    ) -> LeaderBoardSnapshot:
+        """
+        Write a leaderboard snapshot file. The file is written under a temporary name then atomically
+        renamed, so readers never map a partially written snapshot.
+
+        Args:
+            path (str | Path): the file to write to.
+            leaderboard (LeaderBoardResponse | Iterable[LeaderBoardSpot]): a validated response from
+                the leaderboard API endpoint, or the LeaderBoardSpot objects to write.
+            leaderboard_id (int): Optional. The leaderboard the spots are from, taken from the response
+                if not provided.
+            total (int): Optional. The total number of entries in the leaderboard, taken from the
+                response if not provided.
+
+        Raises:
+            OverflowError: if an integer field does not fit its fixed width.
+
+        Returns:
+            The written snapshot, memory-mapped.
+        """
+        if isinstance(leaderboard, LeaderBoardResponse):
+            leaderboard_id = leaderboard_id if leaderboard_id is not None else leaderboard.leaderboard_id
+            total = total if total is not None else leaderboard.total
+            spots = leaderboard.leaderboard or []
+        else:
+            spots = list(leaderboard)
+
+        logger.debug(f"Packing {len(spots)} leaderboard spots")
+        records = np.zeros(len(spots), dtype=_RECORD_DTYPE)
+        string_ids: dict[str, int] = {}
+        for field, dtype in _INTEGER_FIELDS.items():
+            records[field] = _pack_integers([getattr(spot, field) for spot in spots], field, dtype)
+        for field in _STRING_FIELDS:
+            records[field] = [
+                -1 if value is None else string_ids.setdefault(value, len(string_ids))
+                for value in (getattr(spot, field) for spot in spots)
+            ]
+
+        encoded = [string.encode("utf-8") for string in string_ids]  # dicts keep insertion order
+        offsets = np.zeros(len(encoded) + 1, dtype="<i8")
+        np.cumsum([len(string) for string in encoded], dtype=np.int64, out=offsets[1:])
+        arrays = {
+            "records": records,
+            "string_data": np.frombuffer(b"".join(encoded), dtype=np.uint8),
+            "string_offsets": offsets,
+        }
+        metadata = {"leaderboard_id": leaderboard_id, "total": total, "created": time.time()}
+        write_arrays(arrays, Path(path), magic=_MAGIC, metadata=metadata)
+        return cls(path)
+
+
+# ----- Helpers ----- #
+
+
+def _missing_value(field: str) -> int:
+    """The value marking a missing integer field in snapshots: the smallest value of its dtype."""
+    return int(np.iinfo(_INTEGER_FIELDS[field]).min)
+
+
+def _pack_integers(values: list[int | None], field: str, dtype: str) -> np.ndarray:
+    """Pack a field's values in its fixed-width dtype, missing ones as the dtype's smallest value."""
+    info, missing = np.iinfo(dtype), _missing_value(field)
+    present = [value for value in values if value is not None]
+    if present and (min(present) <= info.min or max(present) > info.max):
+        logger.error(f"Values of field '{field}' overflow {dtype}")
+        msg = f"Cannot pack '{field}' values."
+        raise OverflowError(msg)
+    return np.array([missing if value is None else value for value in values], dtype=dtype)
@@ -0,0 +1,448 @@
+"""
+aoe2netwrapper.standin
+----------------------
+
+This module implements a local stand-in for the aoe2.net API, serving synthetic but model-consistent
+data, to load-test code using the clients without hitting aoe2.net.
+"""
+
+from __future__ import annotations
+
+import json
+import random
+import threading
+import time
+
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+from urllib.parse import parse_qs, urlsplit
+
+from loguru import logger
+
+from aoe2netwrapper.api import _MAX_LEADERBOARD_COUNT, _MAX_MATCH_HISTORY_COUNT, _MAX_RATING_HISTORY_COUNT
+
+_BASE_TIMESTAMP: int = 1_700_000_000
+_GAME_INTERVAL: int = 1_800  # seconds between two synthetic games of a player
+_COUNTRIES: tuple[str, ...] = ("BR", "CN", "DE", "ES", "FR", "IT", "KR", "NO", "US", "VN")
+_CIVILIZATIONS: tuple[str, ...] = ("Aztecs", "Berbers", "Britons", "Byzantines", "Celts", "Chinese")
+_MAP_TYPES: dict[int, str] = {9: "Arabia", 10: "Archipelago", 29: "Arena", 33: "Nomad"}
+_STRINGS: dict[str, Any] = {
+    "language": "en",
+    "age": [{"id": 0, "string": "Standard"}, {"id": 2, "string": "Dark Age"}],
+    "civ": [{"id": index, "string": civ} for index, civ in enumerate(_CIVILIZATIONS)],
+    "game_type": [{"id": 0, "string": "Random Map"}, {"id": 1, "string": "Regicide"}],
+    "leaderboard": [
+        {"id": 0, "string": "Unranked"},
+        {"id": 1, "string": "1v1 Death Match"},
+        {"id": 2, "string": "Team Death Match"},
+        {"id": 3, "string": "1v1 Random Map"},
+        {"id": 4, "string": "Team Random Map"},
+    ],
+    "map_size": [{"id": 0, "string": "Tiny (2 player)"}, {"id": 1, "string": "Small (3 player)"}],
+    "map_type": [{"id": map_id, "string": name} for map_id, name in _MAP_TYPES.items()],
+    "rating_type": [{"id": 1, "string": "1v1 Death Match"}, {"id": 2, "string": "1v1 Random Map"}],
+    "resources": [{"id": 0, "string": "Standard"}, {"id": 1, "string": "Low"}],
+    "speed": [{"id": 1, "string": "Casual"}, {"id": 2, "string": "Normal"}],
+    "victory": [{"id": 1, "string": "Conquest"}, {"id": 7, "string": "Time Limit"}],
+    "visibility": [{"id": 0, "string": "Normal"}, {"id": 1, "string": "Explored"}],
+}
+
+
+class StandInServer:
+    """
+    The 'StandInServer' class is a local HTTP server implementing the routes of the aoe2.net API used by
+    the clients: '/api/strings', '/api/leaderboard', '/api/player/matches', '/api/player/ratinghistory'
+    and '/api/nightbot/*'. It serves a deterministic synthetic population of players, with paginated
+    leaderboards, match and rating histories consistent with the models.
+
+    Latency, server errors (500) and throttling (429 when over a number of requests per second) can be
+    injected. The server handles each connection in a thread and keeps connections alive, so clients'
+    sessions reuse them. Use 'point' to direct a client at the server instead of aoe2.net.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        num_players: int = 10_000,
+        history_length: int = 1_000,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        max_requests_per_second: float | None = None,
+        seed: int = 0,
+    ):
+        """
+        Args:
+            host (str): The address to listen on. Defaults to '127.0.0.1'.
+            port (int): The port to listen on. Defaults to 0, which picks a free port.
+            num_players (int): Number of players in the synthetic leaderboards. Defaults to 10 000.
+            history_length (int): Number of matches and rating points in each player's histories.
+                Defaults to 1000.
+            latency (float): Seconds to wait before answering each request. Defaults to 0.
+            error_rate (float): Probability for each request to be answered with a 500 status code.
+                Defaults to 0.
+            max_requests_per_second (float): Optional. Requests beyond this rate are answered with a
+                429 status code. Unlimited by default.
+            seed (int): Seed of the synthetic data and of the error injection. Defaults to 0.
+        """
+        self.num_players = num_players
+        self.history_length = history_length
+        self.latency = latency
+        self.error_rate = error_rate
+        self.max_requests_per_second = max_requests_per_second
+        self.requests_served = 0
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._tokens = max_requests_per_second or 0.0
+        self._last_refill = time.monotonic()
+        self._players = _generate_players(num_players, seed)
+        self._by_profile_id = {player["profile_id"]: player for player in self._players}
+        self._by_steam_id = {player["steam_id"]: player for player in self._players}
+        self._strings_body = json.dumps(_STRINGS).encode()
+
+        self._server = ThreadingHTTPServer((host, port), _StandInRequestHandler)
+        self._server.daemon_threads = True
+        self._server.standin = self  # type: ignore[attr-defined]
+        self._thread: threading.Thread | None = None
+
+    def __repr__(self) -> str:
+        return f"Stand-in aoe2.net API at <{self.url}>"
+
+    def __enter__(self) -> StandInServer:
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    @property
+    def url(self) -> str:
+        """The base URL of the stand-in API, equivalent to 'https://aoe2.net/api'."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/api"
+
+    def start(self) -> StandInServer:
+        """Start serving requests in a background thread."""
+        logger.debug(f"Starting stand-in aoe2.net API at <{self.url}>")
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop serving requests and close the listening socket."""
+        logger.debug(f"Stopping stand-in aoe2.net API at <{self.url}>")
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def point(self, client: Any) -> Any:
+        """
+        Direct a client at the stand-in server, by overriding its base URL and endpoints.
+
+        Args:
+            client (AoE2NetAPI | AoE2NightbotAPI): the client to direct at the server.
+
+        Returns:
+            The same client, for convenience.
+        """
+        official = "https://aoe2.net/api"
+        for attribute in dir(type(client)):  # base URL and endpoints are class attributes
+            value = getattr(client, attribute)
+            if isinstance(value, str) and value.startswith(official):
+                setattr(client, attribute, self.url + value[len(official) :])
+        return client
+
+    # ----- Request handling ----- #
+
+    def _admit(self) -> int | None:
+        """Count a request, and decide if it is throttled (429) or fails (500) rather than served."""
+        with self._lock:
+            self.requests_served += 1
+            if self.max_requests_per_second is not None:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.max_requests_per_second,
+                    self._tokens + (now - self._last_refill) * self.max_requests_per_second,
+                )
+                self._last_refill = now
+                if self._tokens < 1:
+                    return 429
+                self._tokens -= 1
+            if self.error_rate and self._random.random() < self.error_rate:
+                return 500
+        return None
+
+    def _strings(self, params: dict[str, str]) -> bytes:
+        return self._strings_body
+
+    def _leaderboard(self, params: dict[str, str]) -> bytes:
+        leaderboard_id = int(params.get("leaderboard_id", 3))
+        if "profile_id" in params or "steam_id" in params:
+            player = self._find(params)
+            spots = [player] if player is not None else []
+        elif "search" in params:
+            search = params["search"].casefold()
+            spots = [player for player in self._players if search in player["name"].casefold()]
+        else:
+            spots = self._players
+        start = max(int(params.get("start", 1)), 1)
+        count = min(int(params.get("count", 10)), _MAX_LEADERBOARD_COUNT)
+        page = spots[start - 1 : start - 1 + count]
+        response = {
+            "total": len(spots),
+            "leaderboard_id": leaderboard_id,
+            "start": start,
+            "count": len(page),
+            "leaderboard": page,
+        }
+        return json.dumps(response).encode()
+
+    def _match_history(self, params: dict[str, str]) -> bytes:
+        player = self._find(params)
+        if player is None:
+            return b"[]"
+        start = int(params.get("start", 0))
+        count = min(int(params.get("count", 10)), _MAX_MATCH_HISTORY_COUNT)
+        games = range(start, min(start + count, self.history_length))
+        return json.dumps([self._match(player, game) for game in games]).encode()
+
+    def _rating_history(self, params: dict[str, str]) -> bytes:
+        player = self._find(params)
+        if player is None:
+            return b"[]"
+        start = int(params.get("start", 0))
+        count = min(int(params.get("count", 10)), _MAX_RATING_HISTORY_COUNT)
+        series = _rating_series(
+            player["profile_id"], player["rating"], player["wins"], player["losses"], self.history_length
+        )
+        return json.dumps(series[start : start + count]).encode()
+
+    def _nightbot(self, route: str, params: dict[str, str]) -> bytes:
+        player = self._find(params) if "search" not in params else self._search_best(params["search"])
+        if player is None:
+            return b"Player not found"
+        flag = _flag(player["country"]) + " " if params.get("flag", "true") == "true" else ""
+        last_match = self._match(player, 0)
+        opponent = self._by_profile_id[last_match["players"][0]["profile_id"]]
+        if route == "rank":
+            winrate = round(100 * player["wins"] / max(player["games"], 1))
+            text = (
+                f"{flag}{player['name']} ({player['rating']}) Rank #{player['rank']}, has played "
+                f"{player['games']:,} games with a {winrate}% winrate, {player['streak']:+} streak, and "
+                f"{player['drops']} drops"
+            )
+        elif route == "opponent":
+            text = f"{flag}{opponent['name']} ({opponent['rating']}) Rank #{opponent['rank']}"
+        elif route == "match":
+            text = f"{player['name']} ({player['rating']}) as {self._civ(last_match, 1)} -VS- " + (
+                f"{opponent['name']} ({opponent['rating']}) as {self._civ(last_match, 0)} on "
+                f"{_MAP_TYPES[last_match['map_type']]}"
+            )
+        elif route == "civs":
+            text = f"{self._civ(last_match, 1)} -VS- {self._civ(last_match, 0)}"
+        else:
+            text = _MAP_TYPES[last_match["map_type"]]
+        return text.encode()
+
+    def _find(self, params: dict[str, str]) -> dict | None:
+        """The player identified by the 'profile_id' or 'steam_id' parameter, if any."""
+        if "profile_id" in params:
+            return self._by_profile_id.get(int(params["profile_id"]))
+        if "steam_id" in params:
+            return self._by_steam_id.get(int(params["steam_id"]))
+        return None
+
+    def _search_best(self, search: str) -> dict | None:
+        """The highest rated player whose name contains the search, as done by the Nightbot API."""
+        search = search.casefold()
+        return next((player for player in self._players if search in player["name"].casefold()), None)
+
+    def _match(self, player: dict, game: int) -> dict:
+        """The 'game'-th most recent synthetic match of a player, against a player close in rank."""
+        rng = random.Random(player["profile_id"] * 1_000_003 + game)
+        opponent = self._players[(player["rank"] - 1 + rng.randint(1, 50)) % len(self._players)]
+        started = _BASE_TIMESTAMP - game * _GAME_INTERVAL
+        won = rng.random() < 0.5  # noqa: PLR2004
+        members = [
+            _member(opponent, slot=1, team=1, civ=rng.randrange(len(_CIVILIZATIONS)), won=not won),
+            _member(player, slot=2, team=2, civ=rng.randrange(len(_CIVILIZATIONS)), won=won),
+        ]
+        return {
+            "match_id": player["profile_id"] * self.history_length + (self.history_length - game),
+            "lobby_id": None,
+            "match_uuid": f"{player['profile_id']:08x}-{game:04x}-0000-0000-000000000000",
+            "version": "43210",
+            "name": "AUTOMATCH",
+            "num_players": 2,
+            "num_slots": 2,
+            "average_rating": (player["rating"] + opponent["rating"]) // 2,
+            "cheats": False,
+            "full_tech_tree": False,
+            "ending_age": 5,
+            "game_type": 0,
+            "has_password": True,
+            "lock_speed": True,
+            "lock_teams": True,
+            "map_size": 0,
+            "map_type": rng.choice(list(_MAP_TYPES)),
+            "pop": 200,
+            "ranked": True,
+            "leaderboard_id": 3,
+            "rating_type": 2,
+            "resources": 1,
+            "server": "westeurope",
+            "shared_exploration": False,
+            "speed": 2,
+            "starting_age": 2,
+            "team_together": True,
+            "team_positions": True,
+            "treaty_length": 0,
+            "turbo": False,
+            "victory": 1,
+            "victory_time": 0,
+            "visibility": 0,
+            "opened": started - 60,
+            "started": started,
+            "finished": started + rng.randint(900, 3_600),
+            "players": members,
+        }
+
+    @staticmethod
+    def _civ(match: dict, position: int) -> str:
+        return _CIVILIZATIONS[match["players"][position]["civ"]]
+
+
+class _StandInRequestHandler(BaseHTTPRequestHandler):
+    """Dispatch GET requests to the routes of the StandInServer the handling server belongs to."""
+
+    protocol_version = "HTTP/1.1"  # keep connections alive for clients' sessions
+    disable_nagle_algorithm = True  # headers and body are separate writes, do not delay the latter
+
+    def do_GET(self) -> None:  # noqa: N802
+        standin: StandInServer = self.server.standin  # type: ignore[attr-defined]
+        parts = urlsplit(self.path)
+        params = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+        if standin.latency:
+            time.sleep(standin.latency)
+
+        status = standin._admit()  # noqa: SLF001
+        if status is not None:
+            self._reply(status, b'{"error": "injected"}', "application/json")
+            return
+
+        path = parts.path.rstrip("/")
+        routes = {
+            "/api/strings": standin._strings,  # noqa: SLF001
+            "/api/leaderboard": standin._leaderboard,  # noqa: SLF001
+            "/api/player/matches": standin._match_history,  # noqa: SLF001
+            "/api/player/ratinghistory": standin._rating_history,  # noqa: SLF001
+        }
+        try:
+            if path in routes:
+                self._reply(200, routes[path](params), "application/json")
+            elif path.startswith("/api/nightbot/"):
+                route = path.rsplit("/", 1)[-1]
+                if route not in ("rank", "opponent", "match", "civs", "map"):
+                    self._reply(404, b"Not found", "text/plain")
+                    return
+                body = standin._nightbot(route, params)  # noqa: SLF001
+                self._reply(200, body, "text/plain; charset=utf-8")
+            else:
+                self._reply(404, b"Not found", "text/plain")
+        except ValueError:  # malformed integer parameters
+            self._reply(400, b"Bad request", "text/plain")
+
+    def _reply(self, status: int, body: bytes, content_type: str) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if status == 429:  # noqa: PLR2004
+            self.send_header("Retry-After", "1")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:  # noqa: A002
+        """Silence the default per-request logging to stderr, which would slow down load tests."""
+
+
+# ----- Helpers ----- #
+
+
+def _generate_players(num_players: int, seed: int) -> list[dict]:
+    """Generate the leaderboard spots of a synthetic population, sorted by decreasing rating."""
+    rng = random.Random(seed)
+    ratings = sorted((int(rng.gauss(1_200, 300)) for _ in range(num_players)), reverse=True)
+    players = []
+    for index, rating in enumerate(ratings):
+        games = rng.randint(10, 5_000)
+        wins = rng.randint(0, games)
+        players.append(
+            {
+                "profile_id": 1_000_000 + index,
+                "rank": index + 1,
+                "rating": rating,
+                "steam_id": 76_561_198_000_000_000 + index,
+                "icon": None,
+                "name": f"Player{index:05d}",
+                "clan": rng.choice([None, "GL", "SY", "TYRANT", "DS"]),
+                "country": rng.choice(_COUNTRIES),
+                "previous_rating": rating + rng.randint(-16, 16),
+                "highest_rating": rating + rng.randint(0, 200),
+                "streak": rng.randint(-5, 5),
+                "lowest_streak": -rng.randint(5, 15),
+                "highest_streak": rng.randint(5, 15),
+                "games": games,
+                "wins": wins,
+                "losses": games - wins,
+                "drops": rng.randint(0, 20),
+                "last_match": _BASE_TIMESTAMP,
+                "last_match_time": _BASE_TIMESTAMP,
+            }
+        )
+    return players
+
+
+@lru_cache(maxsize=1_024)
+def _rating_series(profile_id: int, rating: int, wins: int, losses: int, length: int) -> list[dict]:
+    """The synthetic rating history of a player, most recent first, ending at their current rating."""
+    rng = random.Random(profile_id)
+    series = []
+    for point in range(length):
+        series.append(
+            {
+                "rating": rating,
+                "num_wins": max(wins - point // 2, 0),
+                "num_losses": max(losses - (point + 1) // 2, 0),
+                "streak": rng.randint(-5, 5),
+                "drops": 0,
+                "timestamp": _BASE_TIMESTAMP - point * _GAME_INTERVAL,
+            }
+        )
+        rating -= rng.randint(-16, 16)
+    return series
+
+
+def _member(player: dict, slot: int, team: int, civ: int, won: bool) -> dict:
+    """A lobby member entry for a player in a synthetic match."""
+    return {
+        "profile_id": player["profile_id"],
+        "steam_id": str(player["steam_id"]),
+        "name": player["name"],
+        "clan": player["clan"],
+        "country": player["country"],
+        "slot": slot,
+        "slot_type": 1,
+        "rating": player["rating"],
+        "rating_change": 16 if won else -16,
+        "color": slot,
+        "team": team,
+        "civ": civ,
+        "won": won,
+    }
+
+
+def _flag(country: str) -> str:
+    """The emoji flag of a two-letter country code."""
+    return "".join(chr(0x1F1E6 + ord(letter) - ord("A")) for letter in country)
@@ -0,0 +1,321 @@
+"""
+aoe2netwrapper.sync
+-------------------
+
+This module implements incremental synchronization of per-player data, which only fetches what was not
+seen during previous syncs instead of re-downloading whole histories.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+from typing import Any, Protocol
+
+from loguru import logger
+from pydantic import BaseModel, Field
+
+from aoe2netwrapper.api import _MAX_MATCH_HISTORY_COUNT, _MAX_RATING_HISTORY_COUNT, AoE2NetAPI
+from aoe2netwrapper.models import MatchLobby, RatingTimePoint
+
+
+class MatchHighWaterMark(BaseModel):
+    """An object to encapsulate the newest match seen for a player during previous syncs."""
+
+    profile_id: int = Field(..., description="The ID attributed to the player by AoE II")
+    match_id: int | None = Field(None, description="ID of the newest match seen for the player")
+    started: Any | None = Field(None, description="Timestamp of the start of the newest match seen")
+    page_size: int = Field(..., description="Number of matches to request per call for this player")
+
+
+class MatchHistorySync:
+    """
+    The 'MatchHistorySync' class fetches the new matches of tracked players. It records, for each
+    player, the newest match seen (its high-water mark), and on the next sync requests small pages of
+    the player's match history from the most recent match until it reaches that known match. The
+    bandwidth and latency of a sync hence scale with the number of new games, not with history size.
+
+    Each player starts with a small page size, which is widened for players who played more games than
+    fit in a page since the last sync, and narrowed back down for those who did not. The 'marks'
+    attribute holds the state, and can be persisted with 'model_dump' and restored through 'load'.
+    """
+
+    def __init__(
+        self,
+        client: AoE2NetAPI | None = None,
+        game: str = "aoe2de",
+        min_page_size: int = 10,
+        max_page_size: int = _MAX_MATCH_HISTORY_COUNT,
+        max_pages: int = 10,
+    ):
+        """
+        Args:
+            client (AoE2NetAPI): Optional. The client used to query the match history API endpoint. A
+                new one is created if not provided.
+            game (str): The game for which to sync match histories. Defaults to 'aoe2de'.
+            min_page_size (int): Number of matches requested per call for players who play little, and
+                for the first sync of a player. Defaults to 10.
+            max_page_size (int): Largest number of matches requested per call (must be 1000 or less).
+                Defaults to 1000.
+            max_pages (int): Maximum number of calls made for a player during a single sync. Defaults
+                to 10.
+        """
+        self.client = client or AoE2NetAPI()
+        self.game = game
+        self.min_page_size = min_page_size
+        self.max_page_size = min(max_page_size, _MAX_MATCH_HISTORY_COUNT)
+        self.max_pages = max_pages
+        self.marks: dict[int, MatchHighWaterMark] = {}
+
+    def __repr__(self) -> str:
+        return f"Match history sync for {len(self.marks)} players"
+
+    def load(self, marks: Iterable[MatchHighWaterMark | dict]) -> None:
+        """
+        Restore high-water marks, for instance persisted from a previous process with 'model_dump'.
+
+        Args:
+            marks (Iterable[MatchHighWaterMark | dict]): the high-water marks to restore.
+        """
+        for mark in marks:
+            validated = MatchHighWaterMark.model_validate(mark)
+            self.marks[validated.profile_id] = validated
+
+    def fetch_new(self, profile_id: int) -> list[MatchLobby]:
+        """
+        Fetch the matches of a player that were not seen during previous syncs, and move the player's
+        high-water mark to the newest of them. On the first sync of a player, only one page of their
+        most recent matches is fetched.
+
+        Args:
+            profile_id (int): The player's profile ID (ex: 459658).
+
+        Returns:
+            A list of MatchLobby validated objects for the new matches, most recent first.
+        """
+        mark = self.marks.get(profile_id)
+        page_size = mark.page_size if mark is not None else self.min_page_size
+
+        new_matches: list[MatchLobby] = []
+        seen_ids: set[int | None] = set()
+        start, reached_known, end_of_history = 0, mark is None, False
+        for _ in range(self.max_pages):
+            page = self.client.match_history(
+                game=self.game, start=start, count=page_size, profile_id=profile_id
+            )
+            for match_lobby in page:
+                if mark is not None and _is_known(match_lobby, mark):
+                    reached_known = True
+                    break
+                if match_lobby.match_id not in seen_ids:  # pages can shift if a game ends meanwhile
+                    seen_ids.add(match_lobby.match_id)
+                    new_matches.append(match_lobby)
+
+            end_of_history = len(page) < page_size
+            if reached_known or end_of_history:
+                break
+            start += len(page)
+            page_size = min(2 * page_size, self.max_page_size)  # this player is busy, widen pages
+
+        if not (reached_known or end_of_history):
+            logger.warning(f"Stopped syncing player {profile_id} after {self.max_pages} pages")
+            logger.warning("Older new matches of this player will not be fetched")
+
+        self._move_mark(profile_id, mark, new_matches)
+        logger.debug(f"Fetched {len(new_matches)} new matches for player {profile_id}")
+        return new_matches
+
+    def sync(self, profile_ids: Iterable[int]) -> dict[int, list[MatchLobby]]:
+        """
+        Fetch the new matches of several players, one after the other.
+
+        Args:
+            profile_ids (Iterable[int]): The profile IDs of the players to sync.
+
+        Returns:
+            A dictionary with the new matches of each player, most recent first.
+        """
+        return {profile_id: self.fetch_new(profile_id) for profile_id in profile_ids}
+
+    def _move_mark(self, profile_id: int, mark: MatchHighWaterMark | None, new: list[MatchLobby]) -> None:
+        """Record the newest match and adapt the player's page size to the amount of new matches."""
+        if mark is None:  # first sync, there is no telling how much this player plays yet
+            mark = MatchHighWaterMark(profile_id=profile_id, page_size=self.min_page_size)
+        elif len(new) >= mark.page_size:
+            mark.page_size = min(2 * mark.page_size, self.max_page_size)
+        elif len(new) < mark.page_size // 4:
+            mark.page_size = max(mark.page_size // 2, self.min_page_size)
+
+        if new:
+            mark.match_id, mark.started = new[0].match_id, new[0].started
+        self.marks[profile_id] = mark
+
+
+class RatingStore(Protocol):
+    """The interface of the local stores that RatingHistorySync appends new rating points to."""
+
+    def last_timestamp(self, profile_id: int, leaderboard_id: int) -> int | None:
+        """Timestamp of the most recent stored point of a series, None if it has none."""
+
+    def append(self, profile_id: int, leaderboard_id: int, points: list[RatingTimePoint]) -> None:
+        """Append points, in chronological order and all more recent than the stored ones, to a series."""
+
+
+class InMemoryRatingStore:
+    """
+    The 'InMemoryRatingStore' class is the simplest RatingStore: it keeps the RatingTimePoint series of
+    each (profile_id, leaderboard_id) pair in chronological lists.
+    """
+
+    def __init__(self):
+        self.series: dict[tuple[int, int], list[RatingTimePoint]] = {}
+
+    def __repr__(self) -> str:
+        return f"In-memory rating store with {len(self.series)} series"
+
+    def last_timestamp(self, profile_id: int, leaderboard_id: int) -> int | None:
+        series = self.series.get((profile_id, leaderboard_id))
+        return series[-1].timestamp if series else None
+
+    def append(self, profile_id: int, leaderboard_id: int, points: list[RatingTimePoint]) -> None:
+        self.series.setdefault((profile_id, leaderboard_id), []).extend(points)
+
+    def get(self, profile_id: int, leaderboard_id: int) -> list[RatingTimePoint]:
+        """
+        Args:
+            profile_id (int): The player's profile ID (ex: 459658).
+            leaderboard_id (int): The leaderboard of the series.
+
+        Returns:
+            The stored RatingTimePoint series, oldest first. Empty if there is none.
+        """
+        return list(self.series.get((profile_id, leaderboard_id), []))
+
+
+class RatingHistorySync:
+    """
+    The 'RatingHistorySync' class fetches the new rating points of tracked players and appends them to a
+    local store. The most recent timestamp held by the store for each (profile_id, leaderboard_id) pair
+    serves as high-water mark: pages of the player's rating history are requested from the most recent
+    point, growing in size, only until they overlap known data. The first sync of a series fetches the
+    whole history, with the largest page size.
+    """
+
+    def __init__(
+        self,
+        client: AoE2NetAPI | None = None,
+        store: RatingStore | None = None,
+        game: str = "aoe2de",
+        min_page_size: int = 10,
+        max_page_size: int = _MAX_RATING_HISTORY_COUNT,
+        max_pages: int = 10,
+    ):
+        """
+        Args:
+            client (AoE2NetAPI): Optional. The client used to query the rating history API endpoint. A
+                new one is created if not provided.
+            store (RatingStore): Optional. The store holding the known rating points. An
+                InMemoryRatingStore is created if not provided.
+            game (str): The game for which to sync rating histories. Defaults to 'aoe2de'.
+            min_page_size (int): Number of points requested in the first call of a sync. Defaults to
+                10.
+            max_page_size (int): Largest number of points requested per call (must be 10000 or less),
+                also used for the first sync of a series. Defaults to 10 000.
+            max_pages (int): Maximum number of calls made for a player during a single sync. Defaults
+                to 10.
+        """
+        self.client = client or AoE2NetAPI()
+        self.store = store if store is not None else InMemoryRatingStore()
+        self.game = game
+        self.min_page_size = min_page_size
+        self.max_page_size = min(max_page_size, _MAX_RATING_HISTORY_COUNT)
+        self.max_pages = max_pages
+
+    def __repr__(self) -> str:
+        return f"Rating history sync to {self.store!r}"
+
+    def fetch_new(self, profile_id: int, leaderboard_id: int = 3) -> list[RatingTimePoint]:
+        """
+        Fetch the rating points of a player more recent than the last stored one, and append them to
+        the store. Points without a timestamp cannot be ordered and are dropped.
+
+        Args:
+            profile_id (int): The player's profile ID (ex: 459658).
+            leaderboard_id (int): Leaderboard to sync the rating history of. Defaults to 3.
+
+        Returns:
+            A list of the new RatingTimePoint objects, oldest first.
+        """
+        last_timestamp = self.store.last_timestamp(profile_id, leaderboard_id)
+        page_size = self.min_page_size if last_timestamp is not None else self.max_page_size
+
+        new_points: list[RatingTimePoint] = []  # most recent first, as returned by the API
+        seen_timestamps: set[int] = set()
+        start, overlaps, end_of_history = 0, False, False
+        for _ in range(self.max_pages):
+            page = self.client.rating_history(
+                game=self.game,
+                leaderboard_id=leaderboard_id,
+                start=start,
+                count=page_size,
+                profile_id=profile_id,
+            )
+            for point in page:
+                if point.timestamp is None:
+                    continue
+                if last_timestamp is not None and point.timestamp <= last_timestamp:
+                    overlaps = True
+                    break
+                if point.timestamp not in seen_timestamps:  # pages can shift if a game ends meanwhile
+                    seen_timestamps.add(point.timestamp)
+                    new_points.append(point)
+
+            end_of_history = len(page) < page_size
+            if overlaps or end_of_history:
+                break
+            start += len(page)
+            page_size = min(2 * page_size, self.max_page_size)
+
+        if not (overlaps or end_of_history):
+            logger.warning(f"Stopped syncing player {profile_id} after {self.max_pages} pages")
+            logger.warning("Older new rating points of this player will not be fetched")
+
+        new_points.reverse()
+        if new_points:
+            self.store.append(profile_id, leaderboard_id, new_points)
+        logger.debug(f"Fetched {len(new_points)} new rating points for player {profile_id}")
+        return new_points
+
+    def sync(self, profile_ids: Iterable[int], leaderboard_id: int = 3) -> dict[int, list[RatingTimePoint]]:
+        """
+        Fetch and store the new rating points of several players, one after the other.
+
+        Args:
+            profile_ids (Iterable[int]): The profile IDs of the players to sync.
+            leaderboard_id (int): Leaderboard to sync the rating histories of. Defaults to 3.
+
+        Returns:
+            A dictionary with the new rating points of each player, oldest first.
+        """
+        return {profile_id: self.fetch_new(profile_id, leaderboard_id) for profile_id in profile_ids}
+
+
+# ----- Helpers ----- #
+
+
+def _is_known(match_lobby: MatchLobby, mark: MatchHighWaterMark) -> bool:
+    """
+    Whether a match was already seen according to a high-water mark: it is the marked match itself, or
+    it started no later than the marked match.
+
+    Args:
+        match_lobby (MatchLobby): the match to check.
+        mark (MatchHighWaterMark): the player's high-water mark.
+
+    Returns:
+        True if the match was already seen, False otherwise.
+    """
+    if mark.match_id is not None and match_lobby.match_id == mark.match_id:
+        return True
+    if mark.started is not None and match_lobby.started is not None:
+        return match_lobby.started <= mark.started
+    return False
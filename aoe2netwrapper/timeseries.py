@@ -0,0 +1,325 @@
+"""
+aoe2netwrapper.timeseries
+-------------------------
+
+This module implements a compact store for the rating histories of many players, which delta-encodes
+each series into packed arrays saved to a single file that can be memory-mapped. Missing values of
+rating points are kept track of in packed validity bitmasks, and returned as missing.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+from pathlib import Path
+
+from loguru import logger
+
+from aoe2netwrapper.models import RatingTimePoint
+
+try:
+    import numpy as np
+    import pandas as pd
+except ImportError as error:
+    logger.error("User tried to use the 'timeseries' submodule without the 'pandas' library.")
+    msg = "The 'timeseries' submodule requires the 'pandas' library to function."
+    raise NotImplementedError(msg) from error
+
+from aoe2netwrapper.arrayfile import map_arrays, write_arrays
+
+_MAGIC: bytes = b"AOE2RTS2"
+
+# Each series column is stored as deltas between consecutive points, in the narrowest dtype that fits
+# the differences between two games (the first delta of a series is 0, its first value is in the index).
+# Missing values are encoded as the previous value of their series, and flagged in a bitmask per column
+_DELTA_DTYPES: dict[str, str] = {
+    "timestamp": "<i4",
+    "rating": "<i2",
+    "num_wins": "<i2",
+    "num_losses": "<i2",
+    "streak": "<i2",
+    "drops": "<i2",
+}
+_INDEX_DTYPE = np.dtype(
+    [("profile_id", "<i8"), ("leaderboard_id", "<i4"), ("offset", "<i8"), ("length", "<i8")]
+    + [(f"first_{column}", "<i8") for column in _DELTA_DTYPES]
+    + [("last_timestamp", "<i8")]
+)
+
+
+class RatingSeriesStore:
+    """
+    The 'RatingSeriesStore' class holds RatingTimePoint series per (profile_id, leaderboard_id) pair in
+    packed, delta-encoded arrays. Ratings, wins and losses barely change from one game to the next, so
+    their deltas fit in 2 bytes, and timestamp deltas fit in 4 bytes, for 14 bytes per point instead of
+    the dozens of an object or pickled frame row. A bit per column and point records whether the
+    value is present.
+
+    Saved stores are a single file: a header followed by the aligned arrays, which are memory-mapped when
+    opened so that several processes can share one store without copies. Points appended after opening
+    are kept in memory until the next 'save'. This class implements the RatingStore interface, and can
+    be used as the store of a RatingHistorySync.
+    """
+
+    def __init__(self, path: str | Path | None = None):
+        """
+        Args:
+            path (str | Path): Optional. The store's file, memory-mapped if it exists. It is also where
+                'save' writes to by default.
+        """
+        self.path = Path(path) if path is not None else None
+        self._index: dict[tuple[int, int], np.void] = {}
+        self._columns: dict[str, np.ndarray] = {}
+        self._pending: dict[tuple[int, int], list[RatingTimePoint]] = {}
+        if self.path is not None and self.path.exists():
+            self._open(self.path)
+
+    def __repr__(self) -> str:
+        return f"Rating series store with {len(self)} series"
+
+    def __len__(self) -> int:
+        return len(self._index.keys() | self._pending.keys())
+
+    def keys(self) -> list[tuple[int, int]]:
+        """The (profile_id, leaderboard_id) pairs of all stored series."""
+        return sorted(self._index.keys() | self._pending.keys())
+
+    def last_timestamp(self, profile_id: int, leaderboard_id: int) -> int | None:
+        """
+        Args:
+            profile_id (int): The player's profile ID (ex: 459658).
+            leaderboard_id (int): The leaderboard of the series.
+
+        Returns:
+            The timestamp of the most recent point of the series, None if it has none.
+        """
+        key = (profile_id, leaderboard_id)
+        if self._pending.get(key):
+            return self._pending[key][-1].timestamp
+        if key in self._index:
+            return int(self._index[key]["last_timestamp"])
+        return None
+
+    def append(self, profile_id: int, leaderboard_id: int, points: list[RatingTimePoint]) -> None:
+        """
+        Append points to a series. They have to be in chronological order, and more recent than the
+        stored points. Points without a timestamp are dropped, and missing values are kept as missing.
+
+        Args:
+            profile_id (int): The player's profile ID (ex: 459658).
+            leaderboard_id (int): The leaderboard of the series.
+            points (list[RatingTimePoint]): the points to append, oldest first.
+
+        Raises:
+            ValueError: if the points are not more recent than the already stored ones.
+        """
+        points = [point for point in points if point.timestamp is not None]
+        if not points:
+            return
+        last = self.last_timestamp(profile_id, leaderboard_id)
+        timestamps = [point.timestamp for point in points]
+        if (last is not None and timestamps[0] <= last) or timestamps != sorted(timestamps):
+            logger.error("Tried to append rating points out of chronological order")
+            msg = "Points have to be in chronological order and more recent than stored ones."
+            raise ValueError(msg)
+        self._pending.setdefault((profile_id, leaderboard_id), []).extend(points)
+
+    def series(
+        self,
+        profile_id: int,
+        leaderboard_id: int,
+        start: int | datetime | None = None,
+        end: int | datetime | None = None,
+    ) -> dict[str, np.ma.MaskedArray]:
+        """
+        Decode the points of a series within a time range. The range is found by binary search on the
+        decoded timestamps.
+
+        Args:
+            profile_id (int): The player's profile ID (ex: 459658).
+            leaderboard_id (int): The leaderboard of the series.
+            start (int | datetime): Optional. Only return points at or after this time (timestamp or
+                datetime object).
+            end (int | datetime): Optional. Only return points before this time (timestamp or datetime
+                object).
+
+        Returns:
+            A dictionary with an int64 masked array for each of 'timestamp', 'rating', 'num_wins',
+            'num_losses', 'streak' and 'drops', oldest first, in which missing values are masked.
+            Arrays are empty if there is no point.
+        """
+        key = (profile_id, leaderboard_id)
+        decoded = [self._decode(key)] if key in self._index else []
+        if self._pending.get(key):
+            decoded.append(_points_to_arrays(self._pending[key]))
+        if not decoded:
+            return {
+                column: np.ma.masked_array(np.empty(0, dtype=np.int64), mask=False)
+                for column in _DELTA_DTYPES
+            }
+
+        arrays = {
+            column: _carry_over(np.ma.concatenate([part[column] for part in decoded]))
+            for column in _DELTA_DTYPES
+        }
+        timestamps = arrays["timestamp"].data
+        low = 0 if start is None else int(np.searchsorted(timestamps, _to_timestamp(start)))
+        high = None if end is None else int(np.searchsorted(timestamps, _to_timestamp(end)))
+        return {column: values[low:high] for column, values in arrays.items()}
+
+    def to_dataframe(
+        self,
+        profile_id: int,
+        leaderboard_id: int,
+        start: int | datetime | None = None,
+        end: int | datetime | None = None,
+    ) -> pd.DataFrame:
+        """
+        Get (part of) a series as a pandas DataFrame with the same layout as the output of
+        'Convert.rating_history': most recent point first, timestamps converted to a 'time' column of
+        datetime objects, and columns with missing values as floats with NaN where values are missing.
+
+        Args:
+            profile_id (int): The player's profile ID (ex: 459658).
+            leaderboard_id (int): The leaderboard of the series.
+            start (int | datetime): Optional. Only return points at or after this time.
+            end (int | datetime): Optional. Only return points before this time.
+
+        Returns:
+            A pandas DataFrame of the series' points.
+        """
+        arrays = self.series(profile_id, leaderboard_id, start, end)
+        dframe = pd.DataFrame({column: _unmask(values[::-1]) for column, values in arrays.items()})
+        dframe["time"] = pd.to_datetime(dframe["timestamp"], unit="s")
+        return dframe.drop(columns=["timestamp"])
+
+    def save(self, path: str | Path | None = None) -> Path:
+        """
+        Write all series, including the points appended since opening, to a single file. The file is
+        written under a temporary name then atomically renamed, and memory-mapped back afterwards.
+
+        Args:
+            path (str | Path): Optional. The file to write to. Defaults to the store's path.
+
+        Raises:
+            ValueError: if no path is given and the store has none.
+            OverflowError: if a difference between two consecutive points does not fit its packed dtype.
+
+        Returns:
+            The path of the written file.
+        """
+        path = Path(path) if path is not None else self.path
+        if path is None:
+            logger.error("Tried to save a rating series store without a path")
+            msg = "A path is required to save a store that was not opened from one."
+            raise ValueError(msg)
+
+        keys = self.keys()
+        logger.debug(f"Encoding {len(keys)} rating series")
+        index = np.zeros(len(keys), dtype=_INDEX_DTYPE)
+        deltas: dict[str, list[np.ndarray]] = {column: [] for column in _DELTA_DTYPES}
+        valid: dict[str, list[np.ndarray]] = {column: [] for column in _DELTA_DTYPES}
+        offset = 0
+        for position, key in enumerate(keys):
+            arrays = self.series(*key)
+            length = len(arrays["timestamp"])
+            index[position]["profile_id"], index[position]["leaderboard_id"] = key
+            index[position]["offset"], index[position]["length"] = offset, length
+            index[position]["last_timestamp"] = arrays["timestamp"][-1]
+            for column, values in arrays.items():
+                index[position][f"first_{column}"] = values.data[0]
+                deltas[column].append(_encode_deltas(values.data, column))
+                valid[column].append(~np.ma.getmaskarray(values))
+            offset += length
+
+        arrays = {"index": index}
+        for column, parts in deltas.items():
+            arrays[column] = np.concatenate(parts) if parts else np.empty(0, dtype=_DELTA_DTYPES[column])
+            arrays[f"valid_{column}"] = np.packbits(np.concatenate(valid[column]) if valid[column] else [])
+        write_arrays(arrays, path, magic=_MAGIC)
+
+        self._columns, self._index, self._pending = {}, {}, {}  # release the mapping before re-opening
+        self._open(path)
+        self.path = path
+        return path
+
+    def _open(self, path: Path) -> None:
+        """Memory-map the arrays of a saved store."""
+        logger.debug(f"Memory-mapping rating series store at '{path}'")
+        arrays, _ = map_arrays(path, magic=_MAGIC)
+        index = arrays.pop("index")
+        self._columns = arrays
+        self._index = {(int(row["profile_id"]), int(row["leaderboard_id"])): row for row in index}
+
+    def _decode(self, key: tuple[int, int]) -> dict[str, np.ma.MaskedArray]:
+        """Decode the saved part of a series, by cumulative sums of its deltas, masking missing values."""
+        row = self._index[key]
+        offset, length = int(row["offset"]), int(row["length"])
+        window = slice(offset, offset + length)
+        return {
+            column: np.ma.masked_array(
+                np.cumsum(self._columns[column][window], dtype=np.int64) + row[f"first_{column}"],
+                mask=~_unpack_bits(self._columns[f"valid_{column}"], offset, length),
+            )
+            for column in _DELTA_DTYPES
+        }
+
+
+# ----- Helpers ----- #
+
+
+def _points_to_arrays(points: list[RatingTimePoint]) -> dict[str, np.ma.MaskedArray]:
+    """Turn a list of RatingTimePoint objects into an int64 masked array per column."""
+    arrays = {}
+    for column in _DELTA_DTYPES:
+        values = [getattr(point, column) for point in points]
+        arrays[column] = np.ma.masked_array(
+            np.fromiter((value or 0 for value in values), dtype=np.int64, count=len(values)),
+            mask=np.fromiter((value is None for value in values), dtype=bool, count=len(values)),
+        )
+    return arrays
+
+
+def _carry_over(values: np.ma.MaskedArray) -> np.ma.MaskedArray:
+    """
+    Set the data under the masked values of a series to the previous present value (the first present
+    one for leading missing values), so that missing values encode as deltas of 0.
+    """
+    valid = ~np.ma.getmaskarray(values)
+    if valid.all() or not valid.any():
+        return np.ma.masked_array(values.data, mask=~valid)
+    positions = np.maximum.accumulate(np.where(valid, np.arange(len(valid)), 0))
+    positions[: np.argmax(valid)] = np.argmax(valid)
+    return np.ma.masked_array(values.data[positions], mask=~valid)
+
+
+def _unmask(values: np.ma.MaskedArray) -> np.ndarray:
+    """An int64 array of a column without missing values, a float64 one with NaN for missing values."""
+    if not np.ma.is_masked(values):
+        return np.ma.getdata(values)
+    return values.astype(np.float64).filled(np.nan)
+
+
+def _encode_deltas(values: np.ndarray, column: str) -> np.ndarray:
+    """Delta-encode a column of a series in its packed dtype, checking that no difference overflows."""
+    deltas = np.diff(values, prepend=values[:1])
+    info = np.iinfo(_DELTA_DTYPES[column])
+    if len(deltas) and (deltas.min() < info.min or deltas.max() > info.max):
+        logger.error(f"Differences between consecutive '{column}' values overflow {_DELTA_DTYPES[column]}")
+        msg = f"Cannot pack '{column}' deltas."
+        raise OverflowError(msg)
+    return deltas.astype(_DELTA_DTYPES[column])
+
+
+def _unpack_bits(packed: np.ndarray, start: int, length: int) -> np.ndarray:
+    """Unpack the booleans from position start to start + length of a packed bitmask, only from their bytes."""
+    first_bit = start % 8
+    bits = np.unpackbits(packed[start // 8 : (start + length + 7) // 8])
+    return bits[first_bit : first_bit + length].astype(bool)
+
+
+def _to_timestamp(moment: int | datetime) -> int:
+    """A timestamp from either a timestamp or a datetime object, naive ones being considered UTC."""
+    if isinstance(moment, datetime):
+        timestamp = pd.Timestamp(moment)
+        return int((timestamp.tz_localize("UTC") if timestamp.tzinfo is None else timestamp).timestamp())
+    return int(moment)
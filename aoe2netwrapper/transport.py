@@ -0,0 +1,169 @@
+"""
+aoe2netwrapper.transport
+------------------------
+
+This module implements a record / replay transport for the clients' sessions, to capture real traffic
+with the APIs once and serve it back offline, for deterministic tests and benchmarks.
+"""
+
+from __future__ import annotations
+
+import base64
+import gzip
+import hashlib
+import json
+import os
+import time
+
+from pathlib import Path
+from typing import Any
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+
+from loguru import logger
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+_MODES: tuple[str, ...] = ("record", "replay")
+
+
+class CassetteAdapter(HTTPAdapter):
+    """
+    The 'CassetteAdapter' class is a requests transport adapter which records or replays responses,
+    stored as one gzip-compressed JSON 'cassette' file per request in a directory. Requests are keyed
+    by their method and URL, with query parameters sorted so that their order does not matter.
+
+    Since both clients send all their requests through their 'session' attribute, mounting this adapter
+    on it (see 'use_cassettes') puts it under every query of the client. In 'record' mode, requests go
+    to the network and responses are written as cassettes. In 'replay' mode, the network is never used:
+    responses are served from cassettes at full speed, or after the recorded latency if requested.
+    """
+
+    def __init__(self, directory: str | Path, mode: str = "replay", latency: bool = False, **kwargs):
+        """
+        Args:
+            directory (str | Path): the directory holding the cassette files, created if needed.
+            mode (str): Either 'record' or 'replay'. Defaults to 'replay'.
+            latency (bool): In 'replay' mode, whether to wait for the recorded duration of a request
+                before serving its response. Defaults to False.
+            **kwargs: keyword arguments passed on to the underlying HTTPAdapter.
+
+        Raises:
+            ValueError: if the mode is not one of 'record' or 'replay'.
+        """
+        if mode not in _MODES:
+            logger.error(f"Invalid cassette mode '{mode}'")
+            msg = f"Mode should be one of {_MODES}, got '{mode}'."
+            raise ValueError(msg)
+        super().__init__(**kwargs)
+        self.directory = Path(directory)
+        self.mode = mode
+        self.latency = latency
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def __repr__(self) -> str:
+        return f"Cassette adapter in {self.mode} mode at '{self.directory}'"
+
+    def send(self, request: requests.PreparedRequest, **kwargs) -> requests.Response:
+        """
+        Record or replay the response to a request, depending on the adapter's mode.
+
+        Raises:
+            requests.exceptions.ConnectionError: in 'replay' mode, if no cassette was recorded for the
+                request.
+        """
+        path = self.cassette_path(request)
+        if self.mode == "record":
+            start = time.perf_counter()
+            response = super().send(request, **kwargs)
+            _write_cassette(path, request, response, elapsed=time.perf_counter() - start)
+            return response
+
+        if not path.exists():
+            logger.error(f"No cassette recorded for {request.method} request at '{request.url}'")
+            msg = f"Cannot replay {request.method} request at '{request.url}': no cassette found."
+            raise requests.exceptions.ConnectionError(msg, request=request)
+        logger.trace(f"Replaying cassette '{path.name}'")
+        with gzip.open(path, "rt", encoding="utf-8") as fileobj:
+            cassette = json.load(fileobj)
+        if self.latency:
+            time.sleep(cassette["elapsed"])
+        return _build_response(request, cassette, self)
+
+    def cassette_path(self, request: requests.PreparedRequest) -> Path:
+        """
+        Args:
+            request (requests.PreparedRequest): the request to find the cassette of.
+
+        Returns:
+            The path of the cassette file for this request, whether it exists or not.
+        """
+        return self.directory / f"{_request_key(request.method, request.url)}.json.gz"
+
+
+def use_cassettes(client: Any, directory: str | Path, mode: str = "replay", latency: bool = False) -> Any:
+    """
+    Mount a CassetteAdapter on a client's session, for both HTTP and HTTPS requests.
+
+    Args:
+        client (AoE2NetAPI | AoE2NightbotAPI): the client to record or replay the traffic of.
+        directory (str | Path): the directory holding the cassette files.
+        mode (str): Either 'record' or 'replay'. Defaults to 'replay'.
+        latency (bool): In 'replay' mode, whether to replay the recorded latency. Defaults to False.
+
+    Returns:
+        The same client, for convenience.
+    """
+    adapter = CassetteAdapter(directory, mode=mode, latency=latency)
+    client.session.mount("https://", adapter)
+    client.session.mount("http://", adapter)
+    return client
+
+
+# ----- Helpers ----- #
+
+
+def _request_key(method: str | None, url: str | None) -> str:
+    """A stable key for a request, from its method and URL with sorted query parameters."""
+    parts = urlsplit(url or "")
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    normalized = urlunsplit((parts.scheme, parts.netloc, parts.path, query, ""))
+    return hashlib.sha256(f"{method} {normalized}".encode()).hexdigest()
+
+
+def _write_cassette(
+    path: Path, request: requests.PreparedRequest, response: requests.Response, elapsed: float
+) -> None:
+    """Write a response as a compressed cassette, under a temporary name then atomically renamed."""
+    cassette = {
+        "method": request.method,
+        "url": request.url,
+        "status_code": response.status_code,
+        "reason": response.reason,
+        "headers": dict(response.headers),
+        "content": base64.b64encode(response.content).decode("ascii"),
+        "elapsed": elapsed,
+    }
+    temporary = path.with_name(f".{path.name}.tmp")
+    with gzip.open(temporary, "wt", encoding="utf-8") as fileobj:
+        json.dump(cassette, fileobj)
+    os.replace(temporary, path)
+    logger.trace(f"Recorded cassette '{path.name}' for '{request.url}'")
+
+
+def _build_response(
+    request: requests.PreparedRequest, cassette: dict, adapter: HTTPAdapter
+) -> requests.Response:
+    """Build a requests Response object from a recorded cassette."""
+    response = requests.Response()
+    response.status_code = cassette["status_code"]
+    response.reason = cassette["reason"]
+    response.headers = CaseInsensitiveDict(cassette["headers"])
+    response.headers.pop("content-encoding", None)  # the content is stored decoded
+    response._content = base64.b64decode(cassette["content"])  # noqa: SLF001
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+    response.url = request.url
+    response.request = request
+    response.connection = adapter
+    return response
@@ -0,0 +1,340 @@
+"""
+aoe2netwrapper.winrates
+-----------------------
+
+This module implements a parallel aggregation of win rates per civilization, map and rating bracket over
+crawled match histories, deduplicating matches found in the histories of several players.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import os
+import threading
+
+from collections.abc import Iterable
+from concurrent.futures import Executor, ProcessPoolExecutor
+from pathlib import Path
+
+from loguru import logger
+
+from aoe2netwrapper.models import MatchLobby
+
+try:
+    import numpy as np
+    import pandas as pd
+except ImportError as error:
+    logger.error("User tried to use the 'winrates' submodule without the 'pandas' library.")
+    msg = "The 'winrates' submodule requires the 'pandas' library to function."
+    raise NotImplementedError(msg) from error
+
+_Dimensions = tuple[tuple[str, ...], ...]
+
+DEFAULT_DIMENSIONS: _Dimensions = (("civ",), ("map_type",), ("bracket",))
+
+# One row per player of a match, with missing values as -1 to keep compact integer columns
+_ROW_DTYPES: dict[str, str] = {
+    "match_id": "int64",
+    "profile_id": "int64",
+    "slot": "int16",
+    "civ": "int16",
+    "map_type": "int32",
+    "rating": "int32",
+    "won": "int8",
+}
+_MISSING: int = -1
+_DIMENSION_COLUMNS: tuple[str, ...] = ("civ", "map_type", "bracket", "slot")
+_LOBBIES_PER_CHUNK: int = 10_000
+# Shards of lobbies set right before forking worker processes, which inherit them without pickling
+_FORKED_SHARDS: list[list[MatchLobby]] = []
+_FORK_LOCK = threading.Lock()
+
+
+class WinRates:
+    """
+    The 'WinRates' class holds win and game counts along several dimensions (for instance per civ, per
+    map and per rating bracket), as partial aggregates: counts over disjoint sets of matches are merged
+    by summing them, with 'merge' or the '+' operator, so that they can be computed in parallel over
+    shards of the matches then combined.
+    """
+
+    def __init__(self, counts: dict[tuple[str, ...], pd.DataFrame] | None = None, matches: int = 0):
+        """
+        Args:
+            counts (dict[tuple[str, ...], pd.DataFrame]): Optional. For each dimension (a tuple of
+                column names), a DataFrame indexed by the values of these columns, with the 'wins' and
+                'games' counts of players. Defaults to no counts.
+            matches (int): The number of distinct matches counted. Defaults to 0.
+        """
+        self.counts = counts or {}
+        self.matches = matches
+
+    def __repr__(self) -> str:
+        dimensions = ", ".join("/".join(dimension) for dimension in self.counts)
+        return f"Win rates over {self.matches} matches by {dimensions or 'nothing'}"
+
+    def __add__(self, other: WinRates) -> WinRates:
+        return self.merge(other)
+
+    def __radd__(self, other: int | WinRates) -> WinRates:
+        return self if isinstance(other, int) and other == 0 else self.merge(other)  # to support sum()
+
+    def merge(self, other: WinRates) -> WinRates:
+        """
+        Combine the counts of two aggregates over disjoint sets of matches.
+
+        Args:
+            other (WinRates): the other aggregate.
+
+        Returns:
+            A new WinRates aggregate with the summed counts.
+        """
+        counts = dict(self.counts)
+        for dimension, table in other.counts.items():
+            counts[dimension] = (
+                counts[dimension].add(table, fill_value=0).astype("int64") if dimension in counts else table
+            )
+        return WinRates(counts, self.matches + other.matches)
+
+    def table(self, *dimension: str) -> pd.DataFrame:
+        """
+        Args:
+            *dimension (str): the columns of one of the aggregated dimensions, for instance 'civ', or
+                'civ' and 'bracket' if aggregated along both.
+
+        Raises:
+            KeyError: if the dimension was not aggregated.
+
+        Returns:
+            A pandas DataFrame indexed by the values of the dimension, sorted, with the 'wins' and
+            'games' counts and the 'win_rate' of the players.
+        """
+        if dimension not in self.counts:
+            logger.error(f"Win rates were not aggregated by {dimension}")
+            msg = f"No counts for dimension {dimension}, aggregated are {list(self.counts)}."
+            raise KeyError(msg)
+        table = self.counts[dimension].sort_index()
+        return table.assign(win_rate=table["wins"] / table["games"])
+
+
+def aggregate_matches(
+    streams: Iterable[Iterable[MatchLobby]],
+    bracket_width: int = 100,
+    dimensions: Iterable[tuple[str, ...]] = DEFAULT_DIMENSIONS,
+    workers: int | None = None,
+) -> WinRates:
+    """
+    Aggregate win rates over streams of matches, for instance the results of AoE2NetAPI().match_history
+    calls for many players. Matches found in several streams are only counted once.
+
+    The lobbies are sharded by 'match_id' as the streams are consumed, then the worker process of each
+    shard unpacks the players of its lobbies to compact rows, deduplicates and counts them. Where
+    processes can be forked, workers inherit the shards instead of receiving pickled copies, which
+    would cost more than the unpacking itself.
+
+    Args:
+        streams (Iterable[Iterable[MatchLobby]]): the streams of MatchLobby objects.
+        bracket_width (int): Width of the rating brackets. A player's bracket is their rating rounded
+            down to a multiple of this width. Defaults to 100.
+        dimensions (Iterable[tuple[str, ...]]): The dimensions to aggregate along, as tuples of columns
+            among 'civ', 'map_type', 'bracket' and 'slot'. Defaults to per civ, per map and per bracket.
+        workers (int): Optional. Number of worker processes, defaults to the number of CPUs. With 1,
+            everything runs in the current process.
+
+    Raises:
+        ValueError: if a dimension has columns other than 'civ', 'map_type', 'bracket' and 'slot'.
+
+    Returns:
+        A WinRates aggregate. Only players whose game has a known outcome are counted.
+    """
+    dimensions = _check_dimensions(dimensions)
+    workers = workers or os.cpu_count() or 1
+    logger.debug(f"Aggregating win rates over match streams in {workers} shards")
+    shards: list[list[MatchLobby]] = [[] for _ in range(workers)]
+    for stream in streams:
+        for lobby in stream:
+            shards[(lobby.match_id or 0) % workers].append(lobby)  # lobbies without ID are not counted
+    if workers == 1 or "fork" not in multiprocessing.get_all_start_methods():
+        with _executor(workers) as executor:
+            partials = executor.map(_count_lobbies, shards, [bracket_width] * workers, [dimensions] * workers)
+            return sum(partials, WinRates())
+
+    with _FORK_LOCK:
+        _FORKED_SHARDS[:] = shards
+        try:
+            context = multiprocessing.get_context("fork")
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+                partials = executor.map(
+                    _count_forked_shard, range(workers), [bracket_width] * workers, [dimensions] * workers
+                )
+                return sum(partials, WinRates())
+        finally:
+            _FORKED_SHARDS.clear()
+
+
+def aggregate_parquet(
+    paths: Iterable[str | Path],
+    bracket_width: int = 100,
+    dimensions: Iterable[tuple[str, ...]] = DEFAULT_DIMENSIONS,
+    workers: int | None = None,
+) -> WinRates:
+    """
+    Aggregate win rates over Parquet files with the layout of 'Convert.match_history', for instance the
+    partitions of the 'match_history' dataset written by a ParquetWriter. Matches found in several files
+    are only counted once. This requires the 'pyarrow' library.
+
+    Files are read and sharded by 'match_id' by worker processes, then each shard is deduplicated and
+    counted by its own worker process.
+
+    Args:
+        paths (Iterable[str | Path]): Parquet files, or directories whose visible '.parquet' files, at
+            any depth, are read.
+        bracket_width (int): Width of the rating brackets, see 'aggregate_matches'. Defaults to 100.
+        dimensions (Iterable[tuple[str, ...]]): The dimensions to aggregate along, see
+            'aggregate_matches'. Defaults to per civ, per map and per bracket.
+        workers (int): Optional. Number of worker processes, defaults to the number of CPUs. With 1,
+            everything runs in the current process.
+
+    Raises:
+        ValueError: if a dimension has columns other than 'civ', 'map_type', 'bracket' and 'slot'.
+
+    Returns:
+        A WinRates aggregate. Only players whose game has a known outcome are counted.
+    """
+    dimensions = _check_dimensions(dimensions)
+    workers = workers or os.cpu_count() or 1
+    files = _parquet_files(paths)
+    logger.debug(f"Aggregating win rates over {len(files)} Parquet files in {workers} shards")
+    shards: list[list[pd.DataFrame]] = [[] for _ in range(workers)]
+    with _executor(workers) as executor:
+        for sharded in executor.map(_read_parquet_shards, files, [workers] * len(files)):
+            for shard, rows in zip(shards, sharded, strict=True):
+                shard.append(rows)
+    return _reduce(shards, bracket_width, dimensions, workers)
+
+
+# ----- Helpers ----- #
+
+
+def _check_dimensions(dimensions: Iterable[tuple[str, ...]]) -> _Dimensions:
+    """Validate the requested dimensions, as a tuple of tuples of column names."""
+    dimensions = tuple(tuple(dimension) for dimension in dimensions)
+    unknown = {column for dimension in dimensions for column in dimension} - set(_DIMENSION_COLUMNS)
+    if unknown:
+        logger.error(f"Cannot aggregate win rates by {sorted(unknown)}")
+        msg = f"Dimensions should be made of columns among {_DIMENSION_COLUMNS}, got {sorted(unknown)}."
+        raise ValueError(msg)
+    return dimensions
+
+
+def _count_lobbies(lobbies: list[MatchLobby], bracket_width: int, dimensions: _Dimensions) -> WinRates:
+    """Unpack the players of a shard's lobbies to compact rows, then deduplicate and count them."""
+    chunks = range(0, len(lobbies), _LOBBIES_PER_CHUNK)
+    rows = [_lobby_rows(lobbies[start : start + _LOBBIES_PER_CHUNK]) for start in chunks]
+    return _count_shard(rows, bracket_width, dimensions)
+
+
+def _count_forked_shard(shard: int, bracket_width: int, dimensions: _Dimensions) -> WinRates:
+    """Count a shard of lobbies inherited from the parent process when the worker was forked."""
+    return _count_lobbies(_FORKED_SHARDS[shard], bracket_width, dimensions)
+
+
+def _lobby_rows(lobbies: list[MatchLobby]) -> pd.DataFrame:
+    """Unpack the players of lobbies to compact rows, one per player."""
+    columns: dict[str, list[int]] = {column: [] for column in _ROW_DTYPES}
+    for lobby in lobbies:
+        for player in lobby.players or []:
+            columns["match_id"].append(_value(lobby.match_id))
+            columns["map_type"].append(_value(lobby.map_type))
+            for column in ("profile_id", "slot", "civ", "rating", "won"):
+                columns[column].append(_value(getattr(player, column)))
+    return pd.DataFrame(
+        {column: np.array(values, dtype=_ROW_DTYPES[column]) for column, values in columns.items()}
+    )
+
+
+def _value(value: int | bool | None) -> int:
+    """An integer value, or the marker for missing values."""
+    return _MISSING if value is None else int(value)
+
+
+def _read_parquet_shards(path: Path, shards: int) -> list[pd.DataFrame]:
+    """Read the rows of a Parquet file with the columns needed for win rates, and shard them."""
+    dframe = pd.read_parquet(path, columns=list(_ROW_DTYPES), dtype_backend="numpy_nullable")
+    rows = pd.DataFrame(
+        {  # nullable integers, since floats would lose the precision of large IDs
+            column: dframe[column].astype("Int64").fillna(_MISSING).to_numpy(dtype=dtype)
+            for column, dtype in _ROW_DTYPES.items()
+        }
+    )
+    return _shard(rows, shards)
+
+
+def _shard(rows: pd.DataFrame, shards: int) -> list[pd.DataFrame]:
+    """Split rows by 'match_id', so that all rows of a match end up in the same shard."""
+    keys = rows["match_id"].to_numpy() % shards
+    return [rows[keys == shard] for shard in range(shards)]
+
+
+def _reduce(
+    shards: list[list[pd.DataFrame]], bracket_width: int, dimensions: _Dimensions, workers: int
+) -> WinRates:
+    """Count each shard in a worker process, and merge the partial aggregates."""
+    with _executor(workers) as executor:
+        partials = list(
+            executor.map(_count_shard, shards, [bracket_width] * len(shards), [dimensions] * len(shards))
+        )
+    return sum(partials, WinRates())
+
+
+def _count_shard(parts: list[pd.DataFrame], bracket_width: int, dimensions: _Dimensions) -> WinRates:
+    """
+    Deduplicate the rows of a shard and count wins and games along each dimension. The same match can
+    be seen in several histories, possibly before and after its outcome was known: for each player slot
+    of a match, a row with a known outcome is kept over one without.
+    """
+    rows = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=list(_ROW_DTYPES))
+    rows = rows[rows["match_id"] != _MISSING]
+    rows = rows.sort_values("won", ascending=False, kind="stable")  # known outcomes (0 or 1) before -1
+    rows = rows.drop_duplicates(["match_id", "slot", "profile_id"])
+    matches = rows["match_id"].nunique()
+
+    rows = rows[rows["won"] != _MISSING].assign(
+        won=lambda dframe: dframe["won"].astype("int64"),
+        bracket=lambda dframe: (dframe["rating"] // bracket_width * bracket_width).where(
+            dframe["rating"] != _MISSING, _MISSING
+        ),
+    )
+    counts = {}
+    for dimension in dimensions:
+        known = rows[(rows[list(dimension)] != _MISSING).all(axis="columns")]
+        known = known.astype(dict.fromkeys(dimension, "int64"))  # compact columns only for transfers
+        counts[dimension] = known.groupby(list(dimension)).agg(wins=("won", "sum"), games=("won", "size"))
+    return WinRates(counts, matches)
+
+
+def _parquet_files(paths: Iterable[str | Path]) -> list[Path]:
+    """The Parquet files to read, directories being replaced by their visible '.parquet' files."""
+    files: list[Path] = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            files.extend(
+                file
+                for file in sorted(path.rglob("*.parquet"))
+                if not any(part.startswith(".") for part in file.relative_to(path).parts)
+            )
+        else:
+            files.append(path)
+    return files
+
+
+def _executor(workers: int) -> Executor:
+    """A process pool with the given number of workers, or an executor running in-process for 1."""
+    return ProcessPoolExecutor(max_workers=workers) if workers > 1 else _InlineExecutor()
+
+
+class _InlineExecutor(Executor):
+    """An executor running calls in the current process, when a pool would only add overhead."""
+
+    def map(self, function, *iterables, **kwargs):  # noqa: ARG002
+        return map(function, *iterables)
@@ -0,0 +1,295 @@
+"""
+aoe2netwrapper.writers
+----------------------
+
+This module implements a writer to persist the pandas DataFrames obtained from the converters module to a
+partitioned Parquet dataset on disk, which later analytics can read selectively.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import uuid
+
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from loguru import logger
+
+try:
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError as error:
+    logger.error("User tried to use the 'writers' submodule without the 'pandas' and 'pyarrow' libraries.")
+    msg = "The 'writers' submodule requires the 'pandas' and 'pyarrow' libraries to function."
+    raise NotImplementedError(msg) from error
+
+# Hive convention for partitions whose key is missing, which pyarrow reads back as null
+_NULL_PARTITION: str = "__HIVE_DEFAULT_PARTITION__"
+_PARTITION_FIELDS: tuple[pa.Field, ...] = (
+    pa.field("game", pa.string()),
+    pa.field("leaderboard_id", pa.int32()),
+    pa.field("day", pa.string()),
+)
+_GAME_PATTERN: re.Pattern = re.compile(r"[A-Za-z0-9_-]+")
+# Key of the Parquet metadata in which compacted files list the names of the files they replace
+_REPLACES_KEY: bytes = b"aoe2netwrapper.replaces"
+
+
+class ParquetWriter:
+    """
+    The 'ParquetWriter' class appends the DataFrames returned by the 'Convert' methods to Parquet datasets
+    stored under a common root directory. Each method below is named after the 'Convert' method whose
+    output it persists, and writes to its own dataset partitioned as
+    '<dataset>/game=<game>/leaderboard_id=<id>/day=<YYYY-MM-DD>/part-<uuid>.parquet'.
+
+    Every file is first written under a hidden temporary name then atomically renamed, so readers never
+    see partially written files. Since each append creates new files, call 'compact' regularly to merge
+    them into one file per partition. Categorical columns, as in the compact outputs of 'Convert', are
+    written as plain values so that files of a partition always have compatible schemas.
+    """
+
+    def __init__(self, root: str | Path, row_group_size: int = 131_072, compression: str = "zstd"):
+        """
+        Args:
+            root (str | Path): directory under which the datasets are stored. Created if needed.
+            row_group_size (int): maximum number of rows per Parquet row group. Large row groups are
+                best for scans, as they allow for efficient column chunk reads. Defaults to 131 072.
+            compression (str): compression codec used for the Parquet files. Defaults to 'zstd'.
+        """
+        self.root = Path(root)
+        self.row_group_size = row_group_size
+        self.compression = compression
+
+    def __repr__(self) -> str:
+        return f"Parquet writer at <{self.root}>"
+
+    def leaderboard(
+        self, dataframe: pd.DataFrame, game: str = "aoe2de", snapshot_time: datetime | None = None
+    ) -> list[Path]:
+        """
+        Append the output of 'Convert.leaderboard' to the 'leaderboard' dataset. Rows are partitioned
+        by the day the snapshot was taken.
+
+        Args:
+            dataframe (pd.DataFrame): the DataFrame returned by 'Convert.leaderboard'.
+            game (str): The game the leaderboard was queried for. Defaults to 'aoe2de'.
+            snapshot_time (datetime): Optional. When the leaderboard was queried. Defaults to the
+                current UTC time.
+
+        Raises:
+            ValueError: if 'game' is not a valid partition key.
+
+        Returns:
+            The list of the written files' paths.
+        """
+        snapshot_time = snapshot_time or datetime.now(tz=timezone.utc)
+        days = pd.Series(snapshot_time.strftime("%Y-%m-%d"), index=dataframe.index)
+        return self._append("leaderboard", dataframe, game, dataframe["leaderboard_id"], days)
+
+    def match_history(self, dataframe: pd.DataFrame, game: str = "aoe2de") -> list[Path]:
+        """
+        Append the output of 'Convert.match_history' (or of any of the chunks yielded by
+        'Convert.match_history_chunks') to the 'match_history' dataset. Rows are partitioned by the
+        day the match started.
+
+        Args:
+            dataframe (pd.DataFrame): the DataFrame returned by 'Convert.match_history'.
+            game (str): The game the match history was queried for. Defaults to 'aoe2de'.
+
+        Raises:
+            ValueError: if 'game' is not a valid partition key.
+
+        Returns:
+            The list of the written files' paths.
+        """
+        return self._append(
+            "match_history", dataframe, game, dataframe["leaderboard_id"], _days(dataframe["started"])
+        )
+
+    def rating_history(
+        self, dataframe: pd.DataFrame, leaderboard_id: int, game: str = "aoe2de"
+    ) -> list[Path]:
+        """
+        Append the output of 'Convert.rating_history' to the 'rating_history' dataset. Rows are
+        partitioned by the day of the rating data point.
+
+        Args:
+            dataframe (pd.DataFrame): the DataFrame returned by 'Convert.rating_history'.
+            leaderboard_id (int): Leaderboard the rating history was queried for, since it is not part
+                of the converted DataFrame.
+            game (str): The game the rating history was queried for. Defaults to 'aoe2de'.
+
+        Raises:
+            ValueError: if 'game' is not a valid partition key.
+
+        Returns:
+            The list of the written files' paths.
+        """
+        leaderboard_ids = pd.Series(leaderboard_id, index=dataframe.index)
+        return self._append("rating_history", dataframe, game, leaderboard_ids, _days(dataframe["time"]))
+
+    def read(
+        self, dataset: str, columns: list[str] | None = None, filters: Any | None = None
+    ) -> pd.DataFrame:
+        """
+        Read (part of) a dataset back to a pandas DataFrame. Partition columns ('game',
+        'leaderboard_id' and 'day') are included, and filtering on them only opens matching files.
+
+        Args:
+            dataset (str): name of the dataset, one of 'leaderboard', 'match_history' or
+                'rating_history'.
+            columns (list[str]): Optional. The columns to read, all of them if not provided.
+            filters (Any): Optional. A 'pyarrow.compute.Expression' or a list of DNF tuples (as accepted
+                by 'pandas.read_parquet'), for instance [("leaderboard_id", "=", 3)].
+
+        Returns:
+            A pandas DataFrame with the selected data, empty if the dataset does not exist yet.
+        """
+        schemas, _ = self._live_files(dataset)
+        files = list(schemas)
+        if not files:
+            logger.warning(f"No data found for dataset '{dataset}' under '{self.root}'")
+            return pd.DataFrame(columns=columns)
+
+        logger.debug(f"Reading dataset '{dataset}' from {len(files)} files")
+        file_schema = pa.unify_schemas(list(schemas.values()), promote_options="permissive")
+        schema = pa.schema(list(file_schema) + list(_PARTITION_FIELDS))
+        partitioning = ds.partitioning(pa.schema(_PARTITION_FIELDS), flavor="hive")
+        dataset_ = ds.dataset(
+            [str(file) for file in files],
+            schema=schema,
+            partitioning=partitioning,
+            partition_base_dir=str(self.root / dataset),
+        )
+
+        if filters is not None and not isinstance(filters, ds.Expression):
+            filters = pq.filters_to_expression(filters)
+        return dataset_.to_table(columns=columns, filter=filters).to_pandas()
+
+    def compact(self, dataset: str) -> int:
+        """
+        Merge all files of each partition of a dataset into a single file, re-chunked to the writer's
+        row group size. The merged file is atomically renamed into place, then the small files are
+        removed. The merged file lists the files it replaces in its Parquet metadata, and reads skip
+        those, so rows are never seen twice nor missing. If a compaction is interrupted before removing
+        the replaced files, the next one removes them.
+
+        Args:
+            dataset (str): name of the dataset to compact.
+
+        Returns:
+            The number of partitions that were compacted.
+        """
+        schemas, superseded = self._live_files(dataset)
+        for file in superseded:
+            logger.debug(f"Removing '{file}', already merged by an interrupted compaction")
+            file.unlink()
+
+        partitions: dict[Path, list[Path]] = {}
+        for file in schemas:
+            partitions.setdefault(file.parent, []).append(file)
+
+        compacted = 0
+        for directory, files in partitions.items():
+            if len(files) < 2:  # noqa: PLR2004
+                continue
+            logger.debug(f"Compacting {len(files)} files in '{directory}'")
+            tables = [pq.ParquetFile(file).read() for file in files]
+            merged = pa.concat_tables(tables, promote_options="permissive")
+            replaces = json.dumps([file.name for file in files])
+            metadata = {**(merged.schema.metadata or {}), _REPLACES_KEY: replaces}
+            merged = merged.replace_schema_metadata(metadata)
+            self._write_table(merged, directory)
+            for file in files:
+                file.unlink()
+            compacted += 1
+        return compacted
+
+    def _append(
+        self,
+        dataset: str,
+        dataframe: pd.DataFrame,
+        game: str,
+        leaderboard_ids: pd.Series,
+        days: pd.Series,
+    ) -> list[Path]:
+        """Split the DataFrame by partition and write each group to a new file in its partition."""
+        if not isinstance(game, str) or not _GAME_PATTERN.fullmatch(game):
+            logger.error(f"Invalid game '{game}' for a partition directory")
+            msg = "The 'game' should only hold letters, digits, '_' and '-' (ex: 'aoe2de')."
+            raise ValueError(msg)
+
+        logger.debug(f"Appending {len(dataframe)} rows to dataset '{dataset}'")
+        leaderboard_keys = leaderboard_ids.astype("Int64").astype("string").fillna(_NULL_PARTITION)
+        day_keys = days.fillna(_NULL_PARTITION)
+        data = dataframe.drop(columns=[field.name for field in _PARTITION_FIELDS], errors="ignore")
+        categoricals = data.select_dtypes("category").columns
+        data = data.astype({column: data[column].cat.categories.dtype for column in categoricals})
+
+        written: list[Path] = []
+        for (leaderboard_key, day_key), group in data.groupby([leaderboard_keys, day_keys], sort=True):
+            directory = (
+                self.root / dataset / f"game={game}" / f"leaderboard_id={leaderboard_key}" / f"day={day_key}"
+            )
+            table = pa.Table.from_pandas(group, preserve_index=False)
+            written.append(self._write_table(table, directory))
+        return written
+
+    def _write_table(self, table: pa.Table, directory: Path) -> Path:
+        """
+        Write a table to a new file in the given directory, through an atomic rename. The temporary file
+        is removed if the write fails.
+        """
+        directory.mkdir(parents=True, exist_ok=True)
+        destination = directory / f"part-{uuid.uuid4().hex}.parquet"
+        temporary = directory / f".{destination.name}.tmp"  # hidden files are ignored by readers
+
+        logger.trace(f"Writing {table.num_rows} rows to '{destination}'")
+        try:
+            pq.write_table(table, temporary, row_group_size=self.row_group_size, compression=self.compression)
+        except BaseException:
+            logger.error(f"Could not write rows to '{destination}'")
+            temporary.unlink(missing_ok=True)
+            raise
+        os.replace(temporary, destination)
+        return destination
+
+    def _live_files(self, dataset: str) -> tuple[dict[Path, pa.Schema], list[Path]]:
+        """
+        The schemas of the data files of a dataset holding its rows, and the files which are superseded
+        by a compacted file of their partition, left by an interrupted compaction.
+        """
+        schemas = {file: pq.read_schema(file) for file in self._data_files(dataset)}
+        superseded: set[Path] = set()
+        for file, schema in schemas.items():
+            replaces = (schema.metadata or {}).get(_REPLACES_KEY)
+            if replaces:
+                superseded.update(file.parent / name for name in json.loads(replaces))
+        live = {file: schema for file, schema in schemas.items() if file not in superseded}
+        return live, sorted(superseded & schemas.keys())
+
+    def _data_files(self, dataset: str) -> list[Path]:
+        """All visible data files of a dataset, sorted for deterministic reads."""
+        return sorted((self.root / dataset).glob("game=*/leaderboard_id=*/day=*/part-*.parquet"))
+
+
+# ----- Helpers ----- #
+
+
+def _days(timestamps: pd.Series) -> pd.Series:
+    """
+    Format a Series of datetime objects to the 'YYYY-MM-DD' strings used as the 'day' partition key.
+
+    Args:
+        timestamps (pd.Series): a Series of datetime objects, possibly with missing values.
+
+    Returns:
+        A Series of the corresponding day strings, with missing values for missing timestamps.
+    """
+    return pd.to_datetime(timestamps).dt.strftime("%Y-%m-%d")
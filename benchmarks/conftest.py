@@ -0,0 +1,162 @@
+"""
+Fixtures for the benchmark suite: payloads scaled up from the test inputs, and helpers to record the
+peak memory of a stage and the size of the DataFrames it produces alongside its timings.
+
+Timings are saved and compared by pytest-benchmark (see its '--benchmark-save' and '--benchmark-compare'
+options). They depend on the machine, so timing baselines are only meaningful when recorded with
+'make benchmarks' on the machine that compares against them, and are not committed. Peak memory is saved
+with '--memory-save' and compared with '--memory-compare', failing the benchmarks whose peak memory grew
+beyond '--memory-compare-fail'. It barely depends on the machine, and its baselines are committed under
+'benchmarks/baselines' for CI to compare against (see the 'benchmarks' targets of the Makefile).
+"""
+
+import copy
+import json
+import pathlib
+import tracemalloc
+
+import pytest
+
+INPUTS_DIR = pathlib.Path(__file__).parent.parent / "tests" / "inputs"
+
+LEADERBOARD_ROWS: int = 10_000
+MATCHES: int = 100_000
+RATING_POINTS: int = 1_000_000
+# Match history conversion unfolds each lobby in its own DataFrame, at tens of milliseconds per match,
+# so it is benchmarked on fewer matches than the other stages
+CONVERTED_MATCHES: int = 1_000
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--payload-scale",
+        type=float,
+        default=1.0,
+        help="Fraction of the full payload sizes to benchmark with (ex: 0.1 for a quick run).",
+    )
+    parser.addoption("--memory-save", default=None, help="JSON file to save peak memory baselines to.")
+    parser.addoption("--memory-compare", default=None, help="JSON file of peak memory baselines.")
+    parser.addoption(
+        "--memory-compare-fail",
+        type=float,
+        default=20.0,
+        help="Fail benchmarks whose peak memory grew by more than this percentage. Defaults to 20.",
+    )
+
+
+def pytest_configure(config):
+    config.peak_memories = {}
+
+
+def pytest_sessionfinish(session):
+    path = session.config.getoption("--memory-save")
+    if path and session.config.peak_memories:
+        pathlib.Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with pathlib.Path(path).open("w") as fileobj:
+            json.dump(session.config.peak_memories, fileobj, indent=2, sort_keys=True)
+
+
+def _load(name: str):
+    with (INPUTS_DIR / name).open("r") as fileobj:
+        return json.load(fileobj)
+
+
+def size(request, full_size: int) -> int:
+    """The payload size to use given the '--payload-scale' option, at least 1."""
+    return max(int(full_size * request.config.getoption("--payload-scale")), 1)
+
+
+# ----- Scaled Payloads ----- #
+
+
+@pytest.fixture(scope="session")
+def converted_matches_count(request) -> int:
+    """The number of matches to benchmark match history conversion with, given '--payload-scale'."""
+    return size(request, CONVERTED_MATCHES)
+
+
+@pytest.fixture(scope="session")
+def leaderboard_payload(request) -> dict:
+    """A leaderboard response of 10k spots, repeating the test input spots with unique IDs."""
+    payload = _load("leaderboard_defaults.json")
+    spots = payload["leaderboard"]
+    rows = size(request, LEADERBOARD_ROWS)
+    scaled = []
+    for index in range(rows):
+        spot = dict(spots[index % len(spots)])
+        spot.update(profile_id=index, steam_id=76_561_198_000_000_000 + index, rank=index + 1)
+        scaled.append(spot)
+    return dict(payload, start=1, count=rows, total=rows, leaderboard=scaled)
+
+
+@pytest.fixture(scope="session")
+def match_history_payload(request) -> list[dict]:
+    """A match history of 100k matches, repeating the test input matches with unique IDs."""
+    matches = _load("match_history_profileid.json")
+    scaled = []
+    for index in range(size(request, MATCHES)):
+        match = copy.deepcopy(matches[index % len(matches)])
+        match.update(match_id=str(100_000_000 - index), started=1_700_000_000 - 60 * index)
+        scaled.append(match)
+    return scaled
+
+
+@pytest.fixture(scope="session")
+def rating_history_payload(request) -> list[dict]:
+    """A rating history of 1M points, repeating the test input points with decreasing timestamps."""
+    points = _load("rating_history_profileid.json")
+    return [
+        dict(points[index % len(points)], timestamp=1_700_000_000 - 60 * index)
+        for index in range(size(request, RATING_POINTS))
+    ]
+
+
+# ----- Measurement Helpers ----- #
+
+
+@pytest.fixture
+def peak_memory(benchmark, request):
+    """
+    Run a callable once under tracemalloc, and record its peak memory allocation (in MiB) in the
+    benchmark's extra info, which is saved and reported along with timings. This run is separate from
+    the timed ones since tracing allocations slows execution down. If a baseline file is given with
+    '--memory-compare', the benchmark fails when its peak memory regressed.
+    """
+    config = request.config
+
+    def measure(function, *args, **kwargs):
+        tracemalloc.start()
+        try:
+            function(*args, **kwargs)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        peak_mib = round(peak / 2**20, 2)
+        benchmark.extra_info["peak_memory_mib"] = peak_mib
+        config.peak_memories[request.node.nodeid] = peak_mib
+
+        baseline_file = config.getoption("--memory-compare")
+        if baseline_file:
+            with pathlib.Path(baseline_file).open("r") as fileobj:
+                baseline = json.load(fileobj).get(request.node.nodeid)
+            threshold = config.getoption("--memory-compare-fail")
+            if baseline and peak_mib > baseline * (1 + threshold / 100):
+                pytest.fail(f"Peak memory regressed: {peak_mib} MiB against a {baseline} MiB baseline")
+        return peak
+
+    return measure
+
+
+@pytest.fixture
+def frame_memory(benchmark):
+    """
+    Record the memory used by a DataFrame (in MiB, including the contents of object columns) in the
+    benchmark's extra info, to compare the sizes of outputs. Peak memory can not tell them apart, as it
+    includes the intermediate frames built by a stage.
+    """
+
+    def measure(dframe):
+        benchmark.extra_info["frame_memory_mib"] = round(dframe.memory_usage(deep=True).sum() / 2**20, 2)
+        return dframe
+
+    return measure
@@ -0,0 +1,46 @@
+"""Benchmarks of the analytics stage: statistics over the rating histories of many players at once."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from aoe2netwrapper import analytics
+
+POINTS_PER_PLAYER: int = 1_000
+
+
+@pytest.fixture(scope="module")
+def rating_points(rating_history_payload) -> pd.DataFrame:
+    """The scaled rating history as a batch of players of 1k points each, in 'rating_frame' layout."""
+    dframe = pd.DataFrame(rating_history_payload)
+    dframe.insert(0, "profile_id", np.arange(len(dframe)) // POINTS_PER_PLAYER)
+    dframe["time"] = pd.to_datetime(dframe.pop("timestamp"), unit="s")
+    return dframe
+
+
+@pytest.mark.parametrize(
+    "statistic",
+    [
+        analytics.rolling_win_rate,
+        analytics.rolling_volatility,
+        analytics.drawdown,
+        analytics.streak_distribution,
+        analytics.games_per_day,
+        analytics.summary,
+    ],
+    ids=lambda function: function.__name__,
+)
+def test_analytics(benchmark, peak_memory, rating_points, statistic):
+    peak_memory(statistic, rating_points)
+    result = benchmark.pedantic(statistic, args=(rating_points,), rounds=3, iterations=1)
+    assert len(result) > 0
+
+
+@pytest.mark.parametrize("freq", ["D", "W"])
+def test_align_leaderboards(benchmark, peak_memory, rating_points, freq):
+    points = rating_points.assign(leaderboard_id=np.array([3, 4, 13])[np.arange(len(rating_points)) % 3])
+    peak_memory(analytics.align_leaderboards, points, freq=freq)
+    result = benchmark.pedantic(
+        analytics.align_leaderboards, args=(points,), kwargs={"freq": freq}, rounds=3, iterations=1
+    )
+    assert list(result.columns.get_level_values("leaderboard_id")) == [3, 4, 13]
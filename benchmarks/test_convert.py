@@ -0,0 +1,50 @@
+"""Benchmarks of the conversion stage: turning validated models into pandas DataFrames."""
+
+import pytest
+
+from aoe2netwrapper.api import _LIST_MATCHLOBBY_ADAPTER, _LIST_RATINGTIMEPOINT_ADAPTER
+from aoe2netwrapper.converters import Convert
+from aoe2netwrapper.models import LeaderBoardResponse
+
+
+@pytest.fixture(scope="module")
+def leaderboard(leaderboard_payload):
+    return LeaderBoardResponse.model_validate(leaderboard_payload)
+
+
+@pytest.fixture(scope="module")
+def matches(match_history_payload, converted_matches_count):
+    return _LIST_MATCHLOBBY_ADAPTER.validate_python(match_history_payload[:converted_matches_count])
+
+
+@pytest.fixture(scope="module")
+def rating_points(rating_history_payload):
+    return _LIST_RATINGTIMEPOINT_ADAPTER.validate_python(rating_history_payload)
+
+
+@pytest.mark.parametrize("compact", [False, True], ids=["default", "compact"])
+def test_convert_leaderboard(benchmark, peak_memory, frame_memory, leaderboard, compact):
+    peak_memory(Convert.leaderboard, leaderboard, compact=compact)
+    result = benchmark(Convert.leaderboard, leaderboard, compact=compact)
+    frame_memory(result)
+    assert len(result) == len(leaderboard.leaderboard)
+
+
+@pytest.mark.parametrize("compact", [False, True], ids=["default", "compact"])
+def test_convert_match_history(benchmark, peak_memory, frame_memory, matches, compact):
+    peak_memory(Convert.match_history, matches, compact=compact)
+    result = benchmark.pedantic(
+        Convert.match_history, args=(matches,), kwargs={"compact": compact}, rounds=2, iterations=1
+    )
+    frame_memory(result)
+    assert result["match_id"].nunique() == len(matches)
+
+
+@pytest.mark.parametrize("compact", [False, True], ids=["default", "compact"])
+def test_convert_rating_history(benchmark, peak_memory, frame_memory, rating_points, compact):
+    peak_memory(Convert.rating_history, rating_points, compact=compact)
+    result = benchmark.pedantic(
+        Convert.rating_history, args=(rating_points,), kwargs={"compact": compact}, rounds=3, iterations=1
+    )
+    frame_memory(result)
+    assert len(result) == len(rating_points)
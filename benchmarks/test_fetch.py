@@ -0,0 +1,38 @@
+"""Benchmarks of the fetch stage: sending the request and decoding the JSON response."""
+
+import json
+
+import pytest
+import requests
+import responses
+
+from aoe2netwrapper.api import _get_request_response_json
+
+LEADERBOARD_URL = "https://aoe2.net/api/leaderboard"
+MATCH_HISTORY_URL = "https://aoe2.net/api/player/matches"
+RATING_HISTORY_URL = "https://aoe2.net/api/player/ratinghistory"
+
+
+@pytest.fixture
+def session():
+    with requests.Session() as session:
+        yield session
+
+
+@pytest.mark.parametrize(
+    ("url", "payload_fixture"),
+    [
+        (LEADERBOARD_URL, "leaderboard_payload"),
+        (MATCH_HISTORY_URL, "match_history_payload"),
+        (RATING_HISTORY_URL, "rating_history_payload"),
+    ],
+    ids=["leaderboard", "match_history", "rating_history"],
+)
+@responses.activate
+def test_fetch(benchmark, peak_memory, session, request, url, payload_fixture):
+    body = json.dumps(request.getfixturevalue(payload_fixture))
+    responses.add(responses.GET, url, body=body, status=200, content_type="application/json")
+
+    peak_memory(_get_request_response_json, session, url)
+    result = benchmark.pedantic(_get_request_response_json, args=(session, url), rounds=5, iterations=1)
+    assert result
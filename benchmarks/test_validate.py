@@ -0,0 +1,26 @@
+"""Benchmarks of the validation stage: turning decoded JSON into the pydantic models."""
+
+from aoe2netwrapper.api import _LIST_MATCHLOBBY_ADAPTER, _LIST_RATINGTIMEPOINT_ADAPTER
+from aoe2netwrapper.models import LeaderBoardResponse
+
+
+def test_validate_leaderboard(benchmark, peak_memory, leaderboard_payload):
+    peak_memory(LeaderBoardResponse.model_validate, leaderboard_payload)
+    result = benchmark(LeaderBoardResponse.model_validate, leaderboard_payload)
+    assert len(result.leaderboard) == len(leaderboard_payload["leaderboard"])
+
+
+def test_validate_match_history(benchmark, peak_memory, match_history_payload):
+    peak_memory(_LIST_MATCHLOBBY_ADAPTER.validate_python, match_history_payload)
+    result = benchmark.pedantic(
+        _LIST_MATCHLOBBY_ADAPTER.validate_python, args=(match_history_payload,), rounds=3, iterations=1
+    )
+    assert len(result) == len(match_history_payload)
+
+
+def test_validate_rating_history(benchmark, peak_memory, rating_history_payload):
+    peak_memory(_LIST_RATINGTIMEPOINT_ADAPTER.validate_python, rating_history_payload)
+    result = benchmark.pedantic(
+        _LIST_RATINGTIMEPOINT_ADAPTER.validate_python, args=(rating_history_payload,), rounds=3, iterations=1
+    )
+    assert len(result) == len(rating_history_payload)
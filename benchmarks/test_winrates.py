@@ -0,0 +1,22 @@
+"""Benchmarks of the win rates aggregation: scaling of the deduplicated counts with worker processes."""
+
+import pytest
+
+from aoe2netwrapper.api import _LIST_MATCHLOBBY_ADAPTER
+from aoe2netwrapper.winrates import aggregate_matches
+
+
+@pytest.fixture(scope="module")
+def streams(match_history_payload):
+    """The scaled match history as 100 overlapping streams, as crawled from the histories of players."""
+    matches = _LIST_MATCHLOBBY_ADAPTER.validate_python(match_history_payload)
+    step = max(len(matches) // 100, 1)
+    return [matches[start : start + 2 * step] for start in range(0, len(matches), step)]
+
+
+@pytest.mark.parametrize("workers", [1, 2, 4])
+def test_aggregate_matches(benchmark, streams, workers):
+    result = benchmark.pedantic(
+        aggregate_matches, args=(streams,), kwargs={"workers": workers}, rounds=3, iterations=1
+    )
+    assert result.matches == len({match.match_id for stream in streams for match in stream})
@@ -0,0 +1,270 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from aoe2netwrapper import analytics
+from aoe2netwrapper.models import RatingTimePoint
+from aoe2netwrapper.timeseries import RatingSeriesStore
+
+
+@pytest.fixture
+def batch(rating_history_converted) -> pd.DataFrame:
+    """Three series built from the converted test payload, rows shuffled and with a non-default index."""
+    first = rating_history_converted.assign(profile_id=1, leaderboard_id=3)
+    second = rating_history_converted.iloc[30:].assign(
+        profile_id=2, leaderboard_id=3, rating=lambda dframe: dframe.rating - 100
+    )
+    third = rating_history_converted.iloc[:50].assign(profile_id=1, leaderboard_id=4)
+    dframe = pd.concat([first, second, third], ignore_index=True)
+    dframe = dframe.sample(frac=1, random_state=0)
+    dframe.index = dframe.index * 10
+    return dframe
+
+
+def _per_series(dframe: pd.DataFrame, function) -> pd.Series:
+    """Apply a reference function to each series in chronological order, aligned back on the rows."""
+    results = []
+    for _, series in dframe.groupby(["profile_id", "leaderboard_id"]):
+        series = series.sort_values("time")
+        results.append(pd.Series(function(series), index=series.index))
+    return pd.concat(results).reindex(dframe.index)
+
+
+def _reference_win_rate(series: pd.DataFrame, window: int) -> list[float]:
+    wins = series.num_wins.diff().fillna(0).clip(lower=0).to_numpy()
+    losses = series.num_losses.diff().fillna(0).clip(lower=0).to_numpy()
+    rates = []
+    for position in range(len(series)):
+        low = max(position + 1 - window, 0)
+        games = wins[low : position + 1].sum() + losses[low : position + 1].sum()
+        rates.append(wins[low : position + 1].sum() / games if games else np.nan)
+    return rates
+
+
+class TestRollingStatistics:
+    @pytest.mark.parametrize("window", [1, 5, 20, 500])
+    def test_rolling_win_rate_matches_reference(self, batch, window):
+        result = analytics.rolling_win_rate(batch, window=window)
+        expected = _per_series(batch, lambda series: _reference_win_rate(series, window))
+        pd.testing.assert_series_equal(result, expected, check_names=False)
+        assert result.name == "win_rate"
+
+    @pytest.mark.parametrize("window", [2, 5, 20])
+    def test_rolling_volatility_matches_reference(self, batch, window):
+        result = analytics.rolling_volatility(batch, window=window)
+        expected = _per_series(
+            batch, lambda series: series.rating.diff().rolling(window, min_periods=2).std().to_numpy()
+        )
+        pd.testing.assert_series_equal(result, expected, check_names=False)
+
+    def test_single_series_without_identifiers(self, rating_history_converted):
+        result = analytics.rolling_win_rate(rating_history_converted, window=10)
+        assert result.index.equals(rating_history_converted.index)
+        expected = _reference_win_rate(rating_history_converted.iloc[::-1], window=10)[::-1]
+        np.testing.assert_allclose(result.to_numpy(), expected)
+
+    def test_invalid_window(self, batch):
+        with pytest.raises(ValueError, match="at least 1 point"):
+            analytics.rolling_win_rate(batch, window=0)
+
+    def test_missing_columns(self, batch):
+        with pytest.raises(ValueError, match="rating"):
+            analytics.rolling_volatility(batch.drop(columns=["rating"]))
+
+
+class TestMissingValues:
+    def test_missing_values_are_carried_over(self, batch):
+        compact = batch.astype({column: "Int64" for column in ["rating", "num_wins", "num_losses", "streak"]})
+        latest = compact[compact.profile_id == 2].time.idxmax()
+        compact.loc[latest, ["rating", "num_wins"]] = pd.NA
+        first = compact[compact.profile_id == 2].time.idxmin()
+        compact.loc[first, "num_losses"] = pd.NA
+
+        result = analytics.summary(compact)
+        expected = analytics.summary(batch)
+        previous = batch[batch.profile_id == 2].sort_values("time").iloc[-2]
+        assert result.loc[(2, 3)].rating == previous.rating
+        pd.testing.assert_frame_equal(result.loc[[(1, 3), (1, 4)]], expected.loc[[(1, 3), (1, 4)]])
+        assert analytics.rolling_win_rate(compact).notna().sum() > 0
+        assert analytics.drawdown(compact).loc[latest, "peak"] >= previous.rating
+
+    def test_float_frames_with_nan(self, batch):
+        series = batch[(batch.profile_id == 1) & (batch.leaderboard_id == 3)].sort_values("time")
+        missing, previous = series.index[10], series.index[9]
+        with_nan = batch.astype({"rating": "float64"})
+        with_nan.loc[missing, "rating"] = np.nan
+        carried = batch.copy()
+        carried.loc[missing, "rating"] = batch.loc[previous, "rating"]
+
+        expected = analytics.rolling_volatility(carried)
+        pd.testing.assert_series_equal(analytics.rolling_volatility(with_nan), expected)
+
+
+class TestDrawdown:
+    def test_drawdown_matches_reference(self, batch):
+        result = analytics.drawdown(batch)
+        peaks = _per_series(batch, lambda series: series.rating.cummax().to_numpy())
+        assert result.index.equals(batch.index)
+        assert (result["peak"] == peaks).all()
+        assert (result["drawdown"] == peaks - batch.rating).all()
+        assert (result["drawdown"] >= 0).all()
+
+
+class TestStreaks:
+    def test_streak_distribution(self):
+        dframe = pd.DataFrame(
+            {
+                "profile_id": 1,
+                "rating": 1000,
+                "num_wins": 0,
+                "num_losses": 0,
+                "streak": [1, 2, 3, -1, -2, 1, -1, 1, 2, 0, -1, -2],
+                "timestamp": range(12),
+            }
+        )
+        result = analytics.streak_distribution(dframe)
+        assert result.to_dict("list") == {
+            "profile_id": [1, 1, 1, 1, 1],
+            "streak": [-2, -1, 1, 2, 3],
+            "count": [2, 1, 1, 1, 1],
+        }
+
+    def test_streak_distribution_counts_streaks_per_series(self, batch):
+        result = analytics.streak_distribution(batch)
+        assert list(result.columns) == ["profile_id", "leaderboard_id", "streak", "count"]
+        series = set(result[["profile_id", "leaderboard_id"]].itertuples(index=False))
+        assert series == {(1, 3), (2, 3), (1, 4)}
+        assert (result["streak"] != 0).all()
+
+        whole = result[(result.profile_id == 1) & (result.leaderboard_id == 3)]
+        assert whole.streak.max() == 7
+        assert whole.streak.min() == -4
+
+
+class TestGamesPerDay:
+    def test_games_per_day(self, batch):
+        result = analytics.games_per_day(batch)
+        assert result.index.names == ["profile_id", "leaderboard_id", "day"]
+        assert result.loc[(1, 3)].sum() == 100  # 99 increments of one game, plus the first point
+        assert result.loc[(1, 4)].sum() == 50
+        assert (result > 0).all()
+
+
+class TestSummary:
+    def test_summary(self, batch):
+        result = analytics.summary(batch)
+        assert result.index.names == ["profile_id", "leaderboard_id"]
+        assert list(result.index) == [(1, 3), (1, 4), (2, 3)]
+
+        whole = result.loc[(1, 3)]
+        assert whole.games == 100
+        assert whole.win_rate == pytest.approx(59 / 99)
+        assert whole.rating == 2345
+        assert whole.peak == batch.rating.max()
+        assert whole.longest_win_streak == 7
+        assert whole.longest_loss_streak == 4
+        shifted = result.loc[(2, 3)]
+        assert shifted.rating == batch[batch.profile_id == 2].sort_values("time").rating.iloc[-1]
+        assert shifted.games == 70
+        assert shifted.first_time == whole.first_time
+
+    def test_summary_of_single_series(self, rating_history_converted):
+        result = analytics.summary(rating_history_converted)
+        assert len(result) == 1
+        assert result.iloc[0].volatility == pytest.approx(rating_history_converted.rating.diff().std())
+
+
+def _reference_alignment(dframe: pd.DataFrame, freq: str) -> pd.DataFrame:
+    """Resample each series on its own, then carry values forward over each player's buckets."""
+    frames = []
+    for profile_id, player in dframe.groupby("profile_id"):
+        periods = player.time.dt.to_period(freq)
+        buckets = pd.period_range(periods.min(), periods.max(), freq=freq)
+        columns = {}
+        for leaderboard_id, series in player.groupby("leaderboard_id"):
+            series = series.sort_values("time")
+            last = series.groupby(series.time.dt.to_period(freq)).rating.last()
+            columns[("rating", leaderboard_id)] = last.reindex(buckets).ffill().astype(float).to_numpy()
+        index = pd.MultiIndex.from_product([[profile_id], buckets.start_time], names=["profile_id", "time"])
+        frames.append(pd.DataFrame(columns, index=index))
+    return pd.concat(frames)
+
+
+class TestAlignLeaderboards:
+    @pytest.mark.parametrize("freq", ["D", "W"])
+    def test_alignment_matches_reference(self, batch, freq):
+        result = analytics.align_leaderboards(batch, freq=freq)
+        expected = _reference_alignment(batch, freq).reindex(columns=result.columns)
+
+        assert result.index.names == ["profile_id", "time"]
+        assert result.columns.names == [None, "leaderboard_id"]
+        pd.testing.assert_frame_equal(result, expected, check_names=False, check_freq=False)
+
+    def test_values_are_as_of_the_end_of_buckets(self):
+        dframe = pd.DataFrame(
+            {
+                "profile_id": [1, 1, 1, 1, 2],
+                "leaderboard_id": [3, 4, 3, 3, 3],
+                "rating": [1000, 1200, 1010, 1020, 900],
+                "timestamp": [0, 2 * 86_400, 2 * 86_400 + 5, 5 * 86_400, 86_400],
+            }
+        )
+        result = analytics.align_leaderboards(dframe, columns=["rating", "timestamp"], leaderboard_ids=[4, 3])
+
+        assert list(result.columns) == [("rating", 4), ("rating", 3), ("timestamp", 4), ("timestamp", 3)]
+        assert len(result.loc[1]) == 6
+        assert result.loc[1]["rating"][3].tolist() == [1000, 1000, 1010, 1010, 1010, 1020]
+        assert result.loc[1]["rating"][4].isna().tolist() == [True, True, False, False, False, False]
+        assert result.loc[2]["rating"][3].tolist() == [900]
+        assert result.loc[2]["rating"][4].isna().all()
+
+        stale = analytics.align_leaderboards(dframe, tolerance="2D")
+        assert stale.loc[1]["rating"][4].isna().tolist() == [True, True, False, False, True, True]
+
+    def test_weekly_buckets_start_on_monday(self, batch):
+        result = analytics.align_leaderboards(batch, freq="W", leaderboard_ids=[4])
+        assert (result.index.get_level_values("time").dayofweek == 0).all()
+        assert list(result.columns) == [("rating", 4)]
+
+    def test_missing_columns(self, batch):
+        with pytest.raises(ValueError, match="leaderboard_id"):
+            analytics.align_leaderboards(batch.drop(columns=["leaderboard_id"]))
+
+
+class TestRatingFrame:
+    def test_rating_frame_from_store(self, rating_history_profileid_payload, rating_history_converted):
+        points = [RatingTimePoint(**point) for point in reversed(rating_history_profileid_payload)]
+        store = RatingSeriesStore()
+        store.append(459658, 3, points)
+        store.append(1, 4, points[:10])
+
+        dframe = analytics.rating_frame(store)
+        assert len(dframe) == 110
+        assert list(dframe.columns) == [
+            "profile_id",
+            "leaderboard_id",
+            "rating",
+            "num_wins",
+            "num_losses",
+            "streak",
+            "drops",
+            "time",
+        ]
+        single = analytics.summary(rating_history_converted)
+        assert analytics.summary(dframe).loc[(459658, 3)].equals(single.iloc[0].rename((459658, 3)))
+
+    def test_rating_frame_keeps_missing_values(self):
+        store = RatingSeriesStore()
+        points = [
+            RatingTimePoint(rating=rating, timestamp=time) for time, rating in enumerate([1800, None, 1816])
+        ]
+        store.append(1, 3, points)
+
+        dframe = analytics.rating_frame(store)
+        assert dframe["rating"].isna().tolist() == [False, True, False]
+        assert analytics.drawdown(dframe)["drawdown"].tolist() == [0, 0, 0]
+        assert analytics.rolling_volatility(dframe).iloc[-1] == pytest.approx(np.std([0, 16], ddof=1))
+
+    def test_rating_frame_empty(self):
+        dframe = analytics.rating_frame(RatingSeriesStore())
+        assert dframe.empty
@@ -1,10 +1,11 @@
 import pathlib
+import threading
 
 import pytest
 import responses
 
 from aoe2netwrapper.exceptions import NightBotError
-from aoe2netwrapper.nightbot import AoE2NightbotAPI, _get_request_text_response_decoded
+from aoe2netwrapper.nightbot import AoE2NightbotAPI, NightbotCache, _get_request_text_response_decoded
 
 CURRENT_DIR = pathlib.Path(__file__).parent
 INPUTS_DIR = CURRENT_DIR / "inputs"
@@ -253,3 +254,117 @@ class TestMethods:
         )
         assert result == returned_text
         assert len(responses.calls) == 1
+
+
+class TestCache:
+    @responses.activate
+    def test_repeated_queries_are_cached(self):
+        responses.add(responses.GET, "https://aoe2.net/api/nightbot/rank", body=RANKS["viper"], status=200)
+        cache = NightbotCache()
+        client = AoE2NightbotAPI(cache=cache)
+
+        assert client.rank(search="GL.TheViper") == RANKS["viper"]
+        assert client.rank(search="GL.TheViper") == RANKS["viper"]
+        assert len(responses.calls) == 1
+        assert (cache.hits, cache.misses) == (1, 1)
+
+        client.rank(search="GL.TheViper", flag="false")  # different parameters, different entry
+        assert len(responses.calls) == 2
+
+    @responses.activate
+    def test_per_endpoint_ttls(self, monkeypatch):
+        responses.add(responses.GET, "https://aoe2.net/api/nightbot/rank", body=RANKS["viper"], status=200)
+        responses.add(
+            responses.GET, "https://aoe2.net/api/nightbot/civs", body="Britons -VS- Franks", status=200
+        )
+        now = [1_000.0]
+        monkeypatch.setattr("aoe2netwrapper.nightbot.time.monotonic", lambda: now[0])
+        client = AoE2NightbotAPI(cache=NightbotCache(ttls={"civs": 10}))
+
+        client.rank(profile_id=196240)
+        client.civs(profile_id=196240)
+        now[0] += 30  # civs expired, rank did not
+        client.rank(profile_id=196240)
+        client.civs(profile_id=196240)
+
+        assert [call.request.url.split("?")[0] for call in responses.calls] == [
+            "https://aoe2.net/api/nightbot/rank",
+            "https://aoe2.net/api/nightbot/civs",
+            "https://aoe2.net/api/nightbot/civs",
+        ]
+
+    @responses.activate
+    def test_negative_caching(self, monkeypatch):
+        responses.add(
+            responses.GET, "https://aoe2.net/api/nightbot/rank", body="Player not found", status=200
+        )
+        now = [1_000.0]
+        monkeypatch.setattr("aoe2netwrapper.nightbot.time.monotonic", lambda: now[0])
+        client = AoE2NightbotAPI(cache=NightbotCache(negative_ttl=5))
+
+        client.rank(search="nobody")
+        client.rank(search="nobody")
+        assert len(responses.calls) == 1
+        now[0] += 10
+        client.rank(search="nobody")
+        assert len(responses.calls) == 2
+
+    @responses.activate
+    def test_errors_are_not_cached(self):
+        responses.add(responses.GET, "https://aoe2.net/api/nightbot/map", body="Oops", status=500)
+        client = AoE2NightbotAPI(cache=NightbotCache())
+
+        for _ in range(2):
+            with pytest.raises(NightBotError):
+                client.map(profile_id=196240)
+        assert len(responses.calls) == 2
+        assert len(client.cache) == 0
+
+    def test_eviction(self):
+        cache = NightbotCache(max_size=2)
+        for profile_id in range(3):
+            cache.put("https://aoe2.net/api/nightbot/rank", {"profile_id": profile_id}, "text")
+
+        assert len(cache) == 2
+        assert cache.get("https://aoe2.net/api/nightbot/rank", {"profile_id": 0}) is None
+        assert cache.get("https://aoe2.net/api/nightbot/rank", {"profile_id": 2}) == "text"
+
+
+class TestOverview:
+    def test_overview_misses_required_param(self, caplog):
+        with pytest.raises(NightBotError):
+            AoE2NightbotAPI().overview()
+
+        for record in caplog.records:
+            assert record.levelname == "ERROR"
+            assert "Missing one of 'search', 'steam_id', 'profile_id'" in caplog.text
+
+    @responses.activate
+    def test_overview(self):
+        for endpoint, body in [("rank", RANKS["viper"]), ("opponent", "Opponent"), ("match", "Match")]:
+            responses.add(responses.GET, f"https://aoe2.net/api/nightbot/{endpoint}", body=body, status=200)
+        responses.add(responses.GET, "https://aoe2.net/api/nightbot/civs", body="Britons", status=200)
+        responses.add(responses.GET, "https://aoe2.net/api/nightbot/map", body="Oops", status=500)
+
+        overview = AoE2NightbotAPI().overview(profile_id=196240)
+
+        assert overview.rank == RANKS["viper"]
+        assert (overview.opponent, overview.match, overview.civs) == ("Opponent", "Match", "Britons")
+        assert overview.map is None
+        assert list(overview.errors) == ["map"]
+        assert "500" in overview.errors["map"]
+        assert len(responses.calls) == 5
+        assert all("profile_id=196240" in call.request.url for call in responses.calls)
+
+    def test_queries_are_concurrent(self, monkeypatch):
+        barrier = threading.Barrier(5, timeout=5)
+
+        def fake_query(self, url, params):
+            barrier.wait()  # only passes if all five queries are in flight at once
+            return url.rsplit("/", 1)[-1]
+
+        monkeypatch.setattr(AoE2NightbotAPI, "_query", fake_query)
+        overview = AoE2NightbotAPI().overview(search="GL.TheViper")
+
+        assert overview.errors == {}
+        assert overview.map == "map"
@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+
+from aoe2netwrapper.arrayfile import map_arrays, write_arrays
+
+MAGIC = b"TESTARR1"
+
+
+class TestArrayFile:
+    def test_roundtrip(self, tmp_path):
+        records = np.array([(1, 2.5), (3, 4.5)], dtype=[("id", "<i8"), ("value", "<f4")])
+        arrays = {"small": np.arange(3, dtype="<i2"), "records": records, "empty": np.empty(0, "<i4")}
+        write_arrays(arrays, tmp_path / "arrays.bin", magic=MAGIC, metadata={"created": 1})
+
+        mapped, metadata = map_arrays(tmp_path / "arrays.bin", magic=MAGIC)
+        assert metadata == {"created": 1}
+        assert list(mapped) == ["small", "records", "empty"]
+        for name, values in arrays.items():
+            np.testing.assert_array_equal(mapped[name], values)
+            assert mapped[name].dtype == values.dtype
+        assert isinstance(mapped["small"], np.memmap)
+        assert not list(tmp_path.glob(".*.tmp"))
+
+    def test_wrong_magic(self, tmp_path):
+        write_arrays({"values": np.arange(3)}, tmp_path / "arrays.bin", magic=MAGIC)
+        with pytest.raises(ValueError, match="Invalid file format"):
+            map_arrays(tmp_path / "arrays.bin", magic=b"OTHERFMT")
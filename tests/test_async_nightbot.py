@@ -0,0 +1,104 @@
+import asyncio
+
+import httpx
+import pytest
+
+from aoe2netwrapper.async_nightbot import AsyncAoE2NightbotAPI
+from aoe2netwrapper.exceptions import NightBotError
+from aoe2netwrapper.nightbot import NightbotCache
+
+RANK = "GL.TheViper (2501) Rank #1, has played 762 games with a 69% winrate, -1 streak, and 2 drops"
+
+
+def _transport(requests_seen: list, statuses: dict | None = None) -> httpx.MockTransport:
+    """A mock transport answering with the endpoint's name, or the given status code for some endpoints."""
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests_seen.append(request)
+        endpoint = request.url.path.rsplit("/", 1)[-1]
+        if statuses and endpoint in statuses:
+            return httpx.Response(statuses[endpoint], text="Oops")
+        return httpx.Response(200, text=RANK if endpoint == "rank" else endpoint)
+
+    return httpx.MockTransport(handler)
+
+
+class TestExceptions:
+    @pytest.mark.parametrize("method", ["rank", "opponent", "match", "civs", "map", "overview"])
+    def test_misses_required_param(self, method, caplog):
+        async def query():
+            async with AsyncAoE2NightbotAPI() as client:
+                await getattr(client, method)()
+
+        with pytest.raises(NightBotError):
+            asyncio.run(query())
+
+        for record in caplog.records:
+            assert record.levelname == "ERROR"
+            assert "Missing one of 'search', 'steam_id', 'profile_id'" in caplog.text
+
+    def test_raise_on_invalid_status_codes(self, caplog):
+        async def query():
+            async with AsyncAoE2NightbotAPI(transport=_transport([], statuses={"rank": 404})) as client:
+                await client.rank(profile_id=196240)
+
+        with pytest.raises(NightBotError):
+            asyncio.run(query())
+
+        for record in caplog.records:
+            assert record.levelname == "ERROR"
+            assert "returned a 404 status code" in caplog.text
+
+
+class TestAsyncClient:
+    def test_repr_and_timeout(self):
+        client = AsyncAoE2NightbotAPI(timeout=(1, 3))
+        assert repr(client) == "Async client for <https://aoe2.net/api/nightbot>"
+        assert client.client.timeout.connect == 1
+        assert client.client.timeout.read == 3
+        asyncio.run(client.aclose())
+
+    def test_methods(self):
+        seen = []
+
+        async def query():
+            async with AsyncAoE2NightbotAPI(transport=_transport(seen)) as client:
+                return [
+                    await client.rank(profile_id=196240),
+                    await client.opponent(search="GL.TheViper"),
+                    await client.match(steam_id=76561197984749679),
+                    await client.civs(profile_id=196240),
+                    await client.map(profile_id=196240),
+                ]
+
+        assert asyncio.run(query()) == [RANK, "opponent", "match", "civs", "map"]
+        assert "search" not in seen[0].url.params  # unset parameters are not sent
+        assert seen[0].url.params["profile_id"] == "196240"
+        assert seen[1].url.params["search"] == "GL.TheViper"
+
+    def test_concurrent_commands_with_cache(self):
+        seen = []
+        cache = NightbotCache()
+
+        async def query():
+            async with AsyncAoE2NightbotAPI(cache=cache, transport=_transport(seen)) as client:
+                await client.rank(profile_id=196240)
+                return await asyncio.gather(*(client.rank(profile_id=196240) for _ in range(1_000)))
+
+        assert set(asyncio.run(query())) == {RANK}
+        assert len(seen) == 1
+        assert cache.hits == 1_000
+
+    def test_overview(self):
+        seen = []
+
+        async def query():
+            async with AsyncAoE2NightbotAPI(transport=_transport(seen, statuses={"map": 500})) as client:
+                return await client.overview(profile_id=196240)
+
+        overview = asyncio.run(query())
+        assert overview.rank == RANK
+        assert (overview.opponent, overview.match, overview.civs) == ("opponent", "match", "civs")
+        assert overview.map is None
+        assert list(overview.errors) == ["map"]
+        assert len(seen) == 5
@@ -49,6 +49,15 @@ class TestExceptions:
             assert record.levelname == "ERROR"
             assert "Tried to use method with a parameter of type != 'List[MatchLobby]'" in caplog.text
 
+    @pytest.mark.parametrize(("existing", "new"), [(None, []), (pd.DataFrame(), "not a list")])
+    def test_merge_match_history_fail_on_wrong_type(self, caplog, existing, new):
+        with pytest.raises(TypeError):
+            _ = Convert.merge_match_history(existing, new)
+
+        for record in caplog.records:
+            assert record.levelname == "ERROR"
+            assert "Tried to use method with a parameter of type" in caplog.text
+
     def test_rating_history_fail_on_wrong_type(self, caplog):
         with pytest.raises(TypeError):
             _ = Convert.rating_history(4.5)
@@ -84,6 +93,14 @@ class TestExceptions:
     #         assert record.levelname == "ERROR"
     #         assert "Tried to use method with a parameter of type != 'NumOnlineResponse'" in caplog.text
 
+    def test_match_history_chunks_fail_on_invalid_chunk_size(self, caplog):
+        with pytest.raises(ValueError):
+            _ = next(Convert.match_history_chunks([], chunk_size=0))
+
+        for record in caplog.records:
+            assert record.levelname == "ERROR"
+            assert "'chunk_size' has to be a positive integer" in caplog.text
+
     def test_match_lobby_unfolding_raises_on_wrong_type(self, caplog):
         with pytest.raises(TypeError):
             _ = _unfold_match_lobby_to_dataframe(10)
@@ -182,6 +199,125 @@ class TestConvert:
         assert dframe.shape == (26, 57)
         pd.testing.assert_frame_equal(dframe, match_history_converted)
 
+    @responses.activate
+    @pytest.mark.parametrize("chunk_size", [1, 5, 26, 100])
+    def test_match_history_chunks(self, match_history_steamid_payload, match_history_converted, chunk_size):
+        responses.add(
+            responses.GET,
+            "https://aoe2.net/api/player/matches",
+            json=match_history_steamid_payload,
+            status=200,
+        )
+
+        result = self.client.match_history(steam_id=76561199003184910)
+        chunks = list(Convert.match_history_chunks(iter(result), chunk_size=chunk_size))
+
+        assert all(len(chunk) == chunk_size for chunk in chunks[:-1])
+        assert 0 < len(chunks[-1]) <= chunk_size
+        pd.testing.assert_frame_equal(pd.concat(chunks), match_history_converted)
+
+    @responses.activate
+    def test_merge_match_history(self, match_history_steamid_payload, match_history_converted):
+        responses.add(
+            responses.GET,
+            "https://aoe2.net/api/player/matches",
+            json=match_history_steamid_payload,
+            status=200,
+        )
+
+        result = self.client.match_history(steam_id=76561199003184910)  # most recent match first
+        existing = Convert.match_history(result[5:])
+        merged = Convert.merge_match_history(existing, result)
+        expected = match_history_converted.set_index(["match_id", "profile_id"]).sort_index()
+
+        assert merged.index.names == ["match_id", "profile_id"]
+        assert merged.index.is_monotonic_increasing
+        assert merged.index.is_unique
+        pd.testing.assert_frame_equal(merged, expected)
+
+    @responses.activate
+    def test_merge_match_history_out_of_order(self, match_history_steamid_payload, match_history_converted):
+        responses.add(
+            responses.GET,
+            "https://aoe2.net/api/player/matches",
+            json=match_history_steamid_payload,
+            status=200,
+        )
+
+        result = self.client.match_history(steam_id=76561199003184910)
+        existing = Convert.merge_match_history(Convert.match_history(result[:3]), result[6:])
+        merged = Convert.merge_match_history(existing, result)
+        expected = match_history_converted.set_index(["match_id", "profile_id"]).sort_index()
+
+        pd.testing.assert_frame_equal(merged, expected)
+
+    @responses.activate
+    def test_merge_match_history_nothing_new(self, match_history_steamid_payload):
+        responses.add(
+            responses.GET,
+            "https://aoe2.net/api/player/matches",
+            json=match_history_steamid_payload,
+            status=200,
+        )
+
+        result = self.client.match_history(steam_id=76561199003184910)
+        existing = Convert.merge_match_history(Convert.match_history(result), [])
+        merged = Convert.merge_match_history(existing, result[:4])
+
+        assert merged is existing
+
+    @responses.activate
+    def test_merge_match_history_filtered(self, match_history_steamid_payload, match_history_converted):
+        responses.add(
+            responses.GET,
+            "https://aoe2.net/api/player/matches",
+            json=match_history_steamid_payload,
+            status=200,
+        )
+
+        result = self.client.match_history(steam_id=76561199003184910)
+        existing = Convert.merge_match_history(Convert.match_history(result), [])
+        filtered = existing.drop(index=result[0].match_id, level="match_id")  # index levels keep its id
+        merged = Convert.merge_match_history(filtered, result)
+        expected = match_history_converted.set_index(["match_id", "profile_id"]).sort_index()
+
+        pd.testing.assert_frame_equal(merged, expected)
+
+    @responses.activate
+    def test_merge_match_history_compact(self, match_history_steamid_payload):
+        responses.add(
+            responses.GET,
+            "https://aoe2.net/api/player/matches",
+            json=match_history_steamid_payload,
+            status=200,
+        )
+
+        result = self.client.match_history(steam_id=76561199003184910)
+        existing = Convert.merge_match_history(pd.DataFrame(), result[:1], compact=True)
+        merged = Convert.merge_match_history(existing, result[1:], compact=True)
+        expected = Convert.merge_match_history(pd.DataFrame(), result, compact=True)
+
+        for column in ("country", "server", "clan"):
+            assert isinstance(merged[column].dtype, pd.CategoricalDtype)
+            assert merged[column].astype(object).equals(expected[column].astype(object))
+        assert merged.dtypes.astype(str).equals(expected.dtypes.astype(str))
+
+    @responses.activate
+    def test_merge_match_history_into_empty(self, match_history_steamid_payload, match_history_converted):
+        responses.add(
+            responses.GET,
+            "https://aoe2.net/api/player/matches",
+            json=match_history_steamid_payload,
+            status=200,
+        )
+
+        result = self.client.match_history(steam_id=76561199003184910)
+        merged = Convert.merge_match_history(pd.DataFrame(), result)
+        expected = match_history_converted.set_index(["match_id", "profile_id"]).sort_index()
+
+        pd.testing.assert_frame_equal(merged, expected)
+        assert Convert.merge_match_history(pd.DataFrame(), []).empty
+
     @responses.activate
     def test_rating_history(self, rating_history_profileid_payload, rating_history_converted):
         responses.add(
@@ -199,6 +335,62 @@ class TestConvert:
         assert dframe.shape == (100, 6)
         pd.testing.assert_frame_equal(dframe, rating_history_converted)
 
+    @responses.activate
+    def test_leaderboard_compact(self, leaderboard_defaults_payload, leaderboard_converted):
+        responses.add(
+            responses.GET,
+            "https://aoe2.net/api/leaderboard",
+            json=leaderboard_defaults_payload,
+            status=200,
+        )
+
+        result = self.client.leaderboard()
+        dframe = Convert.leaderboard(result, compact=True)
+
+        assert dframe.shape == leaderboard_converted.shape
+        assert dframe["rating"].dtype == "Int16"
+        assert dframe["leaderboard_id"].dtype == "Int8"
+        assert isinstance(dframe["country"].dtype, pd.CategoricalDtype)
+        # Compact columns hold <NA> where default ones hold NaN or None, compare them as objects with <NA>
+        pd.testing.assert_frame_equal(
+            dframe.astype(object).mask(dframe.isna(), pd.NA),
+            leaderboard_converted.astype(object).mask(leaderboard_converted.isna(), pd.NA),
+        )
+
+    @responses.activate
+    def test_match_history_compact(self, match_history_steamid_payload, match_history_converted):
+        responses.add(
+            responses.GET,
+            "https://aoe2.net/api/player/matches",
+            json=match_history_steamid_payload,
+            status=200,
+        )
+
+        result = self.client.match_history(steam_id=76561199003184910)
+        dframe = Convert.match_history(result, compact=True)
+
+        assert dframe.shape == match_history_converted.shape
+        assert dframe["slot"].dtype == "Int8"
+        assert dframe["team"].dtype == "Int8"
+        assert dframe["games"].isna().all()  # missing values are kept as <NA>
+        assert isinstance(dframe["server"].dtype, pd.CategoricalDtype)
+
+    @responses.activate
+    def test_rating_history_compact(self, rating_history_profileid_payload, rating_history_converted):
+        responses.add(
+            responses.GET,
+            "https://aoe2.net/api/player/ratinghistory",
+            json=rating_history_profileid_payload,
+            status=200,
+        )
+
+        result = self.client.rating_history(profile_id=459658)
+        dframe = Convert.rating_history(result, compact=True)
+
+        assert dframe["rating"].dtype == "Int16"
+        assert dframe["num_wins"].dtype == "Int32"
+        pd.testing.assert_frame_equal(dframe, rating_history_converted, check_dtype=False)
+
     # @responses.activate
     # def test_matches(self, matches_defaults_payload, matches_converted):
     #     # No longer tested as endpoint and method have been removed
@@ -252,3 +444,55 @@ class TestConvert:
     #     assert dframe.size == 5752
     #     assert dframe.shape == (719, 8)
     #     pd.testing.assert_frame_equal(dframe, num_online_converted)
+
+
+class TestCompactMemory:
+    """Compares the memory footprint of default and compact converted frames."""
+
+    client = AoE2NetAPI()
+
+    @staticmethod
+    def _deep_memory_usage(dframe: pd.DataFrame) -> int:
+        return int(dframe.memory_usage(deep=True).sum())
+
+    @responses.activate
+    def test_leaderboard_compact_uses_less_memory(self, leaderboard_defaults_payload):
+        responses.add(
+            responses.GET,
+            "https://aoe2.net/api/leaderboard",
+            json=leaderboard_defaults_payload,
+            status=200,
+        )
+
+        result = self.client.leaderboard()
+        default = self._deep_memory_usage(Convert.leaderboard(result))
+        compact = self._deep_memory_usage(Convert.leaderboard(result, compact=True))
+        assert compact < default
+
+    @responses.activate
+    def test_match_history_compact_uses_less_memory(self, match_history_steamid_payload):
+        responses.add(
+            responses.GET,
+            "https://aoe2.net/api/player/matches",
+            json=match_history_steamid_payload,
+            status=200,
+        )
+
+        result = self.client.match_history(steam_id=76561199003184910)
+        default = self._deep_memory_usage(Convert.match_history(result))
+        compact = self._deep_memory_usage(Convert.match_history(result, compact=True))
+        assert compact < default
+
+    @responses.activate
+    def test_rating_history_compact_uses_less_memory(self, rating_history_profileid_payload):
+        responses.add(
+            responses.GET,
+            "https://aoe2.net/api/player/ratinghistory",
+            json=rating_history_profileid_payload,
+            status=200,
+        )
+
+        result = self.client.rating_history(profile_id=459658)
+        default = self._deep_memory_usage(Convert.rating_history(result))
+        compact = self._deep_memory_usage(Convert.rating_history(result, compact=True))
+        assert compact < default
@@ -0,0 +1,55 @@
+import copy
+
+from aoe2netwrapper.diff import LeaderBoardDiff, diff_leaderboards
+from aoe2netwrapper.models import LeaderBoardResponse
+
+
+class TestDiffLeaderboards:
+    def test_identical_snapshots(self, leaderboard_defaults_payload):
+        snapshot = LeaderBoardResponse(**leaderboard_defaults_payload)
+        diff = diff_leaderboards(snapshot, snapshot)
+
+        assert isinstance(diff, LeaderBoardDiff)
+        assert diff.added == diff.removed == diff.changed == []
+
+    def test_added_removed_and_changed(self, leaderboard_defaults_payload):
+        old_payload = copy.deepcopy(leaderboard_defaults_payload)
+        new_payload = copy.deepcopy(leaderboard_defaults_payload)
+        dropout = new_payload["leaderboard"].pop(9)
+        newcomer = dict(dropout, profile_id=1, name="newcomer")
+        new_payload["leaderboard"].append(newcomer)
+
+        # players at rank 1 and 2 swap places after the second one won a game
+        first, second = new_payload["leaderboard"][0], new_payload["leaderboard"][1]
+        first["rank"], second["rank"] = 2, 1
+        second["rating"] += 15
+        second["games"] += 1
+
+        # player at rank 5 decays without playing
+        new_payload["leaderboard"][4]["rating"] -= 25
+
+        diff = diff_leaderboards(LeaderBoardResponse(**old_payload), LeaderBoardResponse(**new_payload))
+
+        assert [spot.profile_id for spot in diff.added] == [1]
+        assert [spot.profile_id for spot in diff.removed] == [dropout["profile_id"]]
+        assert [change.profile_id for change in diff.changed] == [
+            first["profile_id"],
+            second["profile_id"],
+            new_payload["leaderboard"][4]["profile_id"],
+        ]
+
+        climber = diff.climbers[0]
+        assert climber.profile_id == second["profile_id"]
+        assert climber.rank_delta == 1
+        assert climber.rating_delta == 15
+        assert climber.games_played == 1
+
+        assert [change.rating_delta for change in diff.decays] == [-25]
+
+    def test_accepts_iterables_of_spots(self, leaderboard_defaults_payload):
+        snapshot = LeaderBoardResponse(**leaderboard_defaults_payload)
+        diff = diff_leaderboards(iter(snapshot.leaderboard[:5]), iter(snapshot.leaderboard[3:]))
+
+        assert len(diff.added) == 5
+        assert len(diff.removed) == 3
+        assert diff.changed == []
@@ -0,0 +1,131 @@
+import json
+
+import numpy as np
+import pytest
+import responses
+
+from aoe2netwrapper.api import AoE2NetAPI
+from aoe2netwrapper.headtohead import HeadToHead, HeadToHeadMatrix
+from aoe2netwrapper.standin import StandInServer
+
+MATCHES_URL = "https://aoe2.net/api/player/matches"
+LEADERBOARD_URL = "https://aoe2.net/api/leaderboard"
+
+
+def _match(match_id: int, winner: int, loser: int, leaderboard_id: int = 3, won: bool | None = True) -> dict:
+    """A 1v1 match payload between two players."""
+    return {
+        "match_id": match_id,
+        "leaderboard_id": leaderboard_id,
+        "started": 1_600_000_000 + match_id,
+        "players": [
+            {"profile_id": winner, "team": 1, "won": won},
+            {"profile_id": loser, "team": 2, "won": None if won is None else not won},
+        ],
+    }
+
+
+HISTORIES = {
+    1: [_match(5, 1, 3), _match(4, 2, 1), _match(3, 1, 2), _match(2, 1, 2)],
+    2: [
+        _match(6, 2, 3),
+        _match(4, 2, 1),
+        _match(3, 1, 2),
+        _match(2, 1, 2),
+        _match(1, 2, 1, leaderboard_id=4),
+    ],
+    3: [_match(7, 3, 9, won=None), _match(6, 2, 3), _match(5, 1, 3)],
+}
+
+
+def _histories_callback(request):
+    profile_id = int(request.params["profile_id"])
+    start, count = int(request.params["start"]), int(request.params["count"])
+    return 200, {}, json.dumps(HISTORIES.get(profile_id, [])[start : start + count])
+
+
+@pytest.fixture
+def mocked_histories():
+    with responses.RequestsMock() as mocked:
+        mocked.add_callback(responses.GET, MATCHES_URL, callback=_histories_callback)
+        yield mocked
+
+
+class TestHeadToHead:
+    def test_matches_are_counted_once(self, mocked_histories):
+        head_to_head = HeadToHead()
+        matrix = head_to_head.matrix(profile_ids=[1, 2, 3])
+
+        assert isinstance(matrix, HeadToHeadMatrix)
+        assert matrix.shape == (3, 3)
+        assert matrix.record(1, 2) == (2, 1)  # match 1 is from another leaderboard
+        assert matrix.record(2, 1) == (1, 2)
+        assert matrix.record(1, 3) == (1, 0)
+        assert matrix.record(3, 2) == (0, 1)
+        assert len(head_to_head.matches) == 7
+        np.testing.assert_array_equal(matrix.to_dense(), [[0, 2, 1], [1, 0, 1], [0, 0, 0]])
+
+    def test_players_outside_the_matrix_are_ignored(self, mocked_histories):
+        matrix = HeadToHead().matrix(profile_ids=[2, 1])
+
+        np.testing.assert_array_equal(matrix.to_dense(), [[0, 1], [2, 0]])
+        with pytest.raises(KeyError):
+            matrix.record(1, 3)
+
+    def test_to_frame(self, mocked_histories):
+        dframe = HeadToHead().matrix(profile_ids=[3, 2, 1]).to_frame()
+        assert dframe.to_dict("list") == {
+            "profile_id": [1, 1, 2],
+            "opponent_id": [2, 3, 3],
+            "wins": [2, 1, 1],
+            "losses": [1, 0, 0],
+        }
+
+    def test_histories_are_cached(self, mocked_histories):
+        head_to_head = HeadToHead(history_size=100)
+        head_to_head.fetch([1, 2])
+        assert len(mocked_histories.calls) == 2
+        assert mocked_histories.calls[0].request.params["count"] == "100"
+
+        HISTORIES[1].insert(0, _match(8, 2, 1))
+        try:
+            fetched = head_to_head.fetch([1, 2, 3])
+        finally:
+            HISTORIES[1].pop(0)
+        assert fetched == {1: 1, 2: 0, 3: 3}
+        for call in mocked_histories.calls[2:]:  # only the new matches of known players
+            if call.request.params["profile_id"] != "3":
+                assert call.request.params["count"] == "10"
+        assert head_to_head.count([1, 2]).record(1, 2) == (2, 2)
+
+    def test_failed_histories_are_skipped(self):
+        with responses.RequestsMock() as mocked:
+            mocked.add(responses.GET, MATCHES_URL, json={"error": "unavailable"}, status=500)
+            assert HeadToHead().fetch([1, 2]) == {}
+
+    def test_top_players(self, leaderboard_defaults_payload):
+        with responses.RequestsMock() as mocked:
+            mocked.add(responses.GET, LEADERBOARD_URL, json=leaderboard_defaults_payload, status=200)
+            top = HeadToHead().top_players(10)
+            assert mocked.calls[0].request.params["count"] == "10"
+
+        expected = [spot["profile_id"] for spot in leaderboard_defaults_payload["leaderboard"]]
+        assert top == expected[:10]
+
+    def test_missing_players(self):
+        with pytest.raises(ValueError, match="'top' or 'profile_ids'"):
+            HeadToHead().matrix()
+
+
+class TestHeadToHeadWithStandIn:
+    def test_top_players_matrix(self):
+        with StandInServer(num_players=200, history_length=50) as server:
+            head_to_head = HeadToHead(client=server.point(AoE2NetAPI()), history_size=50)
+            matrix = head_to_head.matrix(top=100)
+
+        assert matrix.shape == (100, 100)
+        assert list(matrix.profile_ids) == [1_000_000 + index for index in range(100)]
+        dense = matrix.to_dense()
+        assert dense.trace() == 0
+        assert dense.sum() == matrix.wins.sum() == matrix.to_frame()[["wins", "losses"]].to_numpy().sum()
+        assert 0 < dense.sum() <= 100 * 50
@@ -0,0 +1,250 @@
+import pytest
+import responses
+
+from aoe2netwrapper.exceptions import Aoe2NetError
+from aoe2netwrapper.index import FuzzyNameIndex, LadderIndex, PlayerIndex
+from aoe2netwrapper.models import LeaderBoardResponse
+from aoe2netwrapper.snapshot import LeaderBoardSnapshot
+
+
+class TestExceptions:
+    index = PlayerIndex()
+
+    def test_get_misses_required_param(self, caplog):
+        with pytest.raises(Aoe2NetError):
+            self.index.get()
+
+        for record in caplog.records:
+            assert record.levelname == "ERROR"
+            assert "Missing one of 'profile_id', 'steam_id'" in caplog.text
+
+    def test_search_invalid_field(self, caplog):
+        with pytest.raises(Aoe2NetError):
+            self.index.search("viper", field="country")
+
+        for record in caplog.records:
+            assert record.levelname == "ERROR"
+            assert "Can only search on one of" in caplog.text
+
+
+class TestPlayerIndex:
+    @pytest.fixture
+    def index(self, leaderboard_defaults_payload) -> PlayerIndex:
+        index = PlayerIndex()
+        index.update(LeaderBoardResponse(**leaderboard_defaults_payload))
+        return index
+
+    def test_exact_lookups(self, index):
+        assert len(index) == 10
+        assert index.get(profile_id=196240).name == "GL.TheViper"
+        assert index.get(steam_id=76561197984749679).profile_id == 196240
+        assert index.hits == 2
+        assert index.misses == 0
+
+    def test_prefix_search(self, index):
+        assert [spot.name for spot in index.search("gl.")] == ["GL.TheViper"]
+        assert [spot.name for spot in index.search("GL.THEVIPER")] == ["GL.TheViper"]
+        assert len(index.search("", limit=3)) == 3
+        assert [spot.rank for spot in index.search("", limit=10)] == list(range(1, 11))
+        assert index.search("zzzz", fallback=False) == []
+
+    def test_update_replaces_player(self, index, leaderboard_defaults_payload):
+        renamed = dict(leaderboard_defaults_payload["leaderboard"][0], name="Renamed")
+        index.update(LeaderBoardResponse(leaderboard=[renamed]))
+
+        assert len(index) == 10
+        assert index.search("gl.", fallback=False) == []
+        assert index.search("renamed")[0].profile_id == 196240
+
+    @responses.activate
+    def test_get_falls_back_to_api(self, index, leaderboard_profileid_payload):
+        responses.add(
+            responses.GET,
+            "https://aoe2.net/api/leaderboard",
+            json=leaderboard_profileid_payload,
+            status=200,
+        )
+        profile_id = leaderboard_profileid_payload["leaderboard"][0]["profile_id"]
+        index.get(profile_id=196240)  # hit
+
+        assert index.get(profile_id=profile_id).profile_id == profile_id
+        assert index.get(profile_id=profile_id).profile_id == profile_id  # now indexed
+        assert len(responses.calls) == 1
+        assert (index.hits, index.misses) == (2, 1)
+
+    @responses.activate
+    def test_search_falls_back_to_api(self, leaderboard_search_payload):
+        index = PlayerIndex()
+        responses.add(
+            responses.GET,
+            "https://aoe2.net/api/leaderboard",
+            json=leaderboard_search_payload,
+            status=200,
+        )
+        name = leaderboard_search_payload["leaderboard"][0]["name"]
+
+        assert index.search(name)
+        assert index.search(name)
+        assert len(responses.calls) == 1
+        assert "search=" in responses.calls[0].request.url
+
+    @responses.activate
+    def test_refresh(self, leaderboard_defaults_payload):
+        responses.add(
+            responses.GET,
+            "https://aoe2.net/api/leaderboard",
+            json=dict(leaderboard_defaults_payload, total=10),
+            status=200,
+        )
+        index = PlayerIndex()
+
+        assert index.refresh() == 10
+        assert len(index) == 10
+        assert len(responses.calls) == 1
+
+
+class TestFuzzyNameIndex:
+    @pytest.fixture
+    def spots(self, leaderboard_defaults_payload) -> list:
+        return LeaderBoardResponse(**leaderboard_defaults_payload).leaderboard
+
+    def test_misspelled_name(self, spots):
+        index = FuzzyNameIndex(spots)
+        best, similarity = index.search("the vipper")[0]
+
+        assert len(index) == 10
+        assert best.name == "GL.TheViper"
+        assert 0 < similarity < 1
+
+    def test_exact_name_scores_one(self, spots):
+        best, similarity = FuzzyNameIndex(spots).search("gl.theviper")[0]
+        assert best.name == "GL.TheViper"
+        assert similarity == 1
+
+    def test_rating_breaks_ties(self, spots):
+        twin = spots[5].model_copy(update={"profile_id": 1, "rating": spots[5].rating + 100})
+        results = FuzzyNameIndex([spots[5], twin]).search(spots[5].name)
+
+        assert [spot.profile_id for spot, _ in results] == [1, spots[5].profile_id]
+
+    def test_no_match(self, spots):
+        assert FuzzyNameIndex(spots).search("qqqqqqqq") == []
+
+    def test_common_trigrams_are_skipped(self, spots):
+        index = FuzzyNameIndex(spots, max_posting=1)
+        assert index.search("the vipper")[0][0].name == "GL.TheViper"
+
+    def test_pruned_candidates_are_scored_on_all_trigrams(self, spots):
+        crowd = [spots[1].model_copy(update={"profile_id": pid, "name": f"The{pid}"}) for pid in range(3000)]
+        index = FuzzyNameIndex([*crowd, spots[0].model_copy(update={"name": "TheViper"})])
+
+        best, similarity = index.search("TheViper", min_similarity=0.9)[0]
+        assert best.name == "TheViper"
+        assert similarity == 1
+
+    def test_player_index_fuzzy_search(self, leaderboard_defaults_payload):
+        index = PlayerIndex()
+        index.update(LeaderBoardResponse(**leaderboard_defaults_payload))
+
+        assert index.fuzzy_search("theviper")[0][0].name == "GL.TheViper"
+        renamed = dict(leaderboard_defaults_payload["leaderboard"][0], name="SomeoneElse")
+        index.update(LeaderBoardResponse(leaderboard=[renamed]))
+        assert index.fuzzy_search("someone els")[0][0].profile_id == 196240
+
+
+class TestLadderIndex:
+    @pytest.fixture
+    def response(self, leaderboard_defaults_payload) -> LeaderBoardResponse:
+        return LeaderBoardResponse(**leaderboard_defaults_payload)
+
+    @pytest.fixture
+    def ladder(self, response) -> LadderIndex:
+        ladder = LadderIndex()
+        ladder.update(response)
+        return ladder
+
+    def test_rank_for_rating(self, ladder):
+        assert ladder.size(3) == 10
+        assert ladder.rank_for_rating(2600) == 1
+        assert ladder.rank_for_rating(2501) == 1
+        assert ladder.rank_for_rating(2500) == 2
+        assert ladder.rank_for_rating(2460) == 4
+        assert ladder.rank_for_rating(1850) == 11
+
+    def test_rating_for_rank(self, ladder, response):
+        for spot in response.leaderboard:
+            assert ladder.rating_for_rank(spot.rank) == spot.rating
+            assert ladder.rank_for_rating(spot.rating) == spot.rank
+
+    def test_percentile(self, ladder):
+        assert ladder.percentile(2501) == 90
+        assert ladder.percentile(2600) == 100
+        assert ladder.percentile(2425) == 0
+
+    def test_incremental_updates(self, ladder, response, leaderboard_defaults_payload):
+        assert ladder.rank_for_rating(2450) == 5
+        climber = dict(leaderboard_defaults_payload["leaderboard"][-1], rating=2550)
+        ladder.update(LeaderBoardResponse(leaderboard=[climber]), leaderboard_id=3)
+
+        assert ladder.size(3) == 10
+        assert ladder.rating_for_rank(1) == 2550
+        assert ladder.rating_for_rank(10) == 2427
+        assert ladder.rank_for_rating(2450) == 6
+
+        ladder.update(response.leaderboard, leaderboard_id=4)
+        assert ladder.leaderboards == [3, 4]
+        assert ladder.rating_for_rank(1, leaderboard_id=4) == 2501
+        assert len(ladder) == 20
+
+    def test_small_updates_are_patched_in_place(self, response):
+        spot = response.leaderboard[0]
+        ladder = LadderIndex()
+        ladder.update([spot.model_copy(update={"profile_id": pid, "rating": pid}) for pid in range(100)], 3)
+        built = ladder._ladder(3)
+
+        ladder.update([spot.model_copy(update={"profile_id": 0, "rating": 500})], leaderboard_id=3)
+        assert ladder._ladder(3) is built
+        assert list(built) == [*range(1, 100), 500]
+        assert ladder.rank_for_rating(99) == 2
+
+    def test_large_updates_sort_again(self, ladder, response):
+        spots = [spot.model_copy(update={"rating": spot.rating - 1000}) for spot in response.leaderboard]
+        ladder.rank_for_rating(2000)  # builds the sorted ladder
+        ladder.update(spots, leaderboard_id=3)
+        assert ladder.rank_for_rating(2000) == 1
+        assert ladder.rating_for_rank(1) == 1501
+
+    def test_from_snapshot(self, tmp_path, response, ladder):
+        unrated = response.leaderboard[0].model_copy(update={"profile_id": 1, "rating": None})
+        snapshot = LeaderBoardSnapshot.write(
+            tmp_path / "ladder.snap", [*response.leaderboard, unrated], leaderboard_id=3
+        )
+        from_snapshot = LadderIndex()
+
+        assert from_snapshot.update(snapshot) == 10
+        for rank in range(1, 11):
+            assert from_snapshot.rating_for_rank(rank) == ladder.rating_for_rank(rank)
+
+    @responses.activate
+    def test_refresh(self, leaderboard_defaults_payload):
+        responses.add(
+            responses.GET,
+            "https://aoe2.net/api/leaderboard",
+            json=dict(leaderboard_defaults_payload, total=10),
+            status=200,
+        )
+        ladder = LadderIndex()
+
+        assert ladder.refresh(leaderboard_id=3) == 10
+        assert ladder.rank_for_rating(2449) == 5
+        assert len(responses.calls) == 1
+
+    def test_invalid_queries(self, ladder, response):
+        with pytest.raises(Aoe2NetError):
+            ladder.rating_for_rank(11)
+        with pytest.raises(Aoe2NetError):
+            ladder.rating_for_rank(0)
+        with pytest.raises(Aoe2NetError):
+            ladder.percentile(2000, leaderboard_id=4)
+        with pytest.raises(Aoe2NetError):
+            ladder.update(response.leaderboard)
@@ -0,0 +1,100 @@
+import copy
+import json
+
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+import responses
+
+from aoe2netwrapper.exceptions import Aoe2NetError
+from aoe2netwrapper.mirror import LeaderBoardMirror
+from aoe2netwrapper.models import LeaderBoardResponse
+
+
+def _paginated_leaderboard_callback(entries: list[dict]):
+    """Serve the given entries as a leaderboard, honoring the 'start' and 'count' parameters."""
+
+    def callback(request):
+        params = parse_qs(urlparse(request.url).query)
+        start, count = int(params["start"][0]), int(params["count"][0])
+        page = entries[start - 1 : start - 1 + count]
+        body = {"total": len(entries), "leaderboard_id": 3, "start": start, "count": len(page)}
+        return 200, {}, json.dumps({**body, "leaderboard": page})
+
+    return callback
+
+
+class TestLeaderBoardMirror:
+    def test_upsert_only_counts_changes(self, leaderboard_defaults_payload):
+        mirror = LeaderBoardMirror()
+        response = LeaderBoardResponse(**leaderboard_defaults_payload)
+
+        assert mirror.upsert(3, response.leaderboard) == 10
+        assert mirror.upsert(3, response.leaderboard) == 0
+
+        changed = copy.deepcopy(leaderboard_defaults_payload)
+        changed["leaderboard"][0]["rating"] += 12
+        assert mirror.upsert(3, LeaderBoardResponse(**changed).leaderboard) == 1
+        assert mirror.get(profile_id=196240).rating == 2513
+        assert mirror.count() == 10
+
+    def test_lookups(self, leaderboard_defaults_payload):
+        mirror = LeaderBoardMirror()
+        mirror.upsert(3, LeaderBoardResponse(**leaderboard_defaults_payload).leaderboard)
+
+        assert mirror.get(profile_id=196240).name == "GL.TheViper"
+        assert mirror.get(steam_id=76561197984749679).profile_id == 196240
+        assert mirror.get(profile_id=1) is None
+        assert mirror.get(leaderboard_id=4, profile_id=196240) is None
+        assert mirror.at_rank(1).name == "GL.TheViper"
+        assert mirror.at_rank(10_000) is None
+        assert [spot.name for spot in mirror.search("gl.the")] == ["GL.TheViper"]
+        assert mirror.search("definitely not a player") == []
+
+    def test_get_misses_required_param(self, caplog):
+        with pytest.raises(Aoe2NetError):
+            LeaderBoardMirror().get()
+
+        for record in caplog.records:
+            assert record.levelname == "ERROR"
+            assert "Missing one of 'profile_id', 'steam_id'" in caplog.text
+
+    def test_file_database_uses_wal(self, tmp_path):
+        mirror = LeaderBoardMirror(tmp_path / "mirror.sqlite")
+        assert mirror.connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        mirror.close()
+
+    @responses.activate
+    def test_sync_pages_and_prunes(self, leaderboard_defaults_payload):
+        entries = leaderboard_defaults_payload["leaderboard"]
+        responses.add_callback(
+            responses.GET,
+            "https://aoe2.net/api/leaderboard",
+            callback=_paginated_leaderboard_callback(entries),
+        )
+        mirror = LeaderBoardMirror()
+
+        assert mirror.sync(page_size=3) == 10
+        assert len(responses.calls) == 4
+        assert mirror.sync(page_size=3) == 0
+
+        responses.replace(
+            responses.GET,
+            "https://aoe2.net/api/leaderboard",
+            json={"total": 9, "leaderboard_id": 3, "start": 1, "count": 9, "leaderboard": entries[:9]},
+        )
+        assert mirror.sync() == 1  # last player dropped off the leaderboard
+        assert mirror.count() == 9
+
+    @responses.activate
+    def test_sync_max_entries(self, leaderboard_defaults_payload):
+        responses.add_callback(
+            responses.GET,
+            "https://aoe2.net/api/leaderboard",
+            callback=_paginated_leaderboard_callback(leaderboard_defaults_payload["leaderboard"]),
+        )
+        mirror = LeaderBoardMirror()
+
+        assert mirror.sync(page_size=4, max_entries=6) == 6
+        assert mirror.count() == 6
+        assert "count=2" in responses.calls[-1].request.url
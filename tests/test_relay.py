@@ -0,0 +1,112 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+
+from aoe2netwrapper.nightbot import AoE2NightbotAPI, NightbotCache
+from aoe2netwrapper.relay import NightbotRelay
+from aoe2netwrapper.standin import StandInServer
+
+
+@pytest.fixture
+def upstream():
+    with StandInServer(num_players=100, history_length=10, latency=0.2) as standin:
+        yield standin
+
+
+def _relay(upstream: StandInServer, **kwargs) -> NightbotRelay:
+    return NightbotRelay(client=upstream.point(AoE2NightbotAPI()), **kwargs)
+
+
+class TestNightbotRelay:
+    def test_relays_and_caches(self, upstream):
+        with _relay(upstream) as relay:
+            first = requests.get(f"{relay.url}/rank", params={"profile_id": 1_000_000, "flag": "false"})
+            second = requests.get(f"{relay.url}/rank", params={"profile_id": 1_000_000, "flag": "false"})
+
+            assert first.status_code == 200
+            assert first.text.startswith("Player00000 (")
+            assert second.text == first.text
+            assert upstream.requests_served == 1
+            metrics = relay.snapshot_metrics()
+            assert (metrics["requests"], metrics["cache_hits"], metrics["cache_misses"]) == (2, 1, 1)
+
+    def test_concurrent_queries_are_coalesced(self, upstream):
+        with _relay(upstream, burst=100) as relay:
+            with ThreadPoolExecutor(max_workers=20) as executor:
+                texts = list(
+                    executor.map(
+                        lambda _: requests.get(f"{relay.url}/civs", params={"profile_id": 1_000_001}).text,
+                        range(20),
+                    )
+                )
+
+            assert len(set(texts)) == 1
+            assert upstream.requests_served == 1
+            assert relay.metrics["coalesced"] + relay.client.cache.hits == 19
+
+    def test_per_channel_rate_limit(self, upstream):
+        with _relay(upstream, rate_limit=0.01, burst=2) as relay:
+            statuses = [
+                requests.get(f"{relay.url}/map", params={"profile_id": 1_000_002, "channel": "a"}).status_code
+                for _ in range(3)
+            ]
+            other = requests.get(
+                f"{relay.url}/map",
+                params={"profile_id": 1_000_002},
+                headers={"Nightbot-Channel": "name=other&displayName=Other&provider=twitch&providerId=42"},
+            )
+
+            assert statuses == [200, 200, 429]
+            assert other.status_code == 200
+            assert relay.snapshot_metrics()["rate_limited"] == 1
+            assert relay.snapshot_metrics()["channels"] == 2
+
+    def test_invalid_queries(self, upstream):
+        with _relay(upstream) as relay:
+            assert requests.get(f"{relay.url}/rank").status_code == 400
+            assert requests.get(f"{relay.url}/unknown", params={"profile_id": 1}).status_code == 404
+            assert upstream.requests_served == 0
+
+    def test_upstream_errors(self):
+        with StandInServer(num_players=10, error_rate=1.0) as standin, _relay(standin) as relay:
+            response = requests.get(f"{relay.url}/rank", params={"search": "player"})
+
+            assert response.status_code == 502
+            assert relay.metrics["errors"] == 1
+            assert len(relay.client.cache) == 0
+
+    def test_metrics_endpoint(self, upstream):
+        with _relay(upstream) as relay:
+            requests.get(f"{relay.url}/rank", params={"profile_id": 1_000_000})
+            metrics = requests.get(relay.url.removesuffix("/nightbot") + "/metrics").json()
+
+            assert metrics["requests"] == 1
+            assert metrics["cached_responses"] == 1
+
+    def test_client_gets_a_cache(self):
+        client = AoE2NightbotAPI()
+        relay = NightbotRelay(client=client)
+        assert isinstance(relay.client.cache, NightbotCache)
+        assert client.cache is None
+        assert relay.client.session is client.session
+        relay._server.server_close()
+
+    def test_idle_channel_buckets_are_dropped(self):
+        relay = NightbotRelay(max_channels=2, burst=1)
+        assert relay._admit("first")
+        assert relay._admit("second")
+        assert not relay._admit("first")  # seen again, so 'second' is now the least recent
+        assert relay._admit("third")
+
+        assert relay.snapshot_metrics()["channels"] == 2
+        assert list(relay._buckets) == ["first", "third"]
+        relay._server.server_close()
+
+    def test_unexpected_errors_get_a_reply(self, upstream, monkeypatch):
+        with _relay(upstream) as relay:
+            monkeypatch.setattr(relay.client, "rank", lambda **_: 1 / 0)
+            response = requests.get(f"{relay.url}/rank", params={"profile_id": 1_000_000}, timeout=5)
+
+            assert response.status_code == 502
+            assert relay.metrics["errors"] == 1
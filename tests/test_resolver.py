@@ -0,0 +1,203 @@
+import pytest
+import responses
+
+from aoe2netwrapper.api import AoE2NetAPI
+from aoe2netwrapper.exceptions import Aoe2NetError
+from aoe2netwrapper.models import LeaderBoardResponse
+from aoe2netwrapper.nightbot import AoE2NightbotAPI
+from aoe2netwrapper.resolver import ProfileResolver
+
+LEADERBOARD_URL = "https://aoe2.net/api/leaderboard"
+RANK_URL = "https://aoe2.net/api/nightbot/rank"
+EMPTY_LEADERBOARD = {"total": 45161, "leaderboard_id": 3, "start": 1, "count": 0, "leaderboard": []}
+
+
+class TestProfileResolver:
+    @responses.activate
+    def test_resolve_picks_highest_ranked_match(self, leaderboard_search_payload):
+        responses.add(responses.GET, LEADERBOARD_URL, json=leaderboard_search_payload, status=200)
+        resolver = ProfileResolver()
+
+        assert resolver.resolve("GL.TheViper") == 196240
+        assert responses.calls[0].request.params == {
+            "game": "aoe2de",
+            "leaderboard_id": "3",
+            "start": "1",
+            "count": "1",
+            "search": "GL.TheViper",
+        }
+
+    @responses.activate
+    def test_resolutions_are_cached_case_insensitively(self, leaderboard_search_payload):
+        responses.add(responses.GET, LEADERBOARD_URL, json=leaderboard_search_payload, status=200)
+        resolver = ProfileResolver()
+
+        assert resolver.resolve("GL.TheViper") == 196240
+        assert resolver.resolve(" gl.theviper ") == 196240
+        assert len(responses.calls) == 1
+        assert (resolver.hits, resolver.misses) == (1, 1)
+
+    @responses.activate
+    def test_resolutions_are_cached_per_leaderboard(self, leaderboard_search_payload):
+        responses.add(responses.GET, LEADERBOARD_URL, json=leaderboard_search_payload, status=200)
+        resolver = ProfileResolver()
+
+        resolver.resolve("GL.TheViper", leaderboard_id=3)
+        resolver.resolve("GL.TheViper", leaderboard_id=4)
+        assert len(responses.calls) == 2
+
+    @responses.activate
+    def test_unknown_names_are_cached(self):
+        responses.add(responses.GET, LEADERBOARD_URL, json=EMPTY_LEADERBOARD, status=200)
+        resolver = ProfileResolver()
+
+        assert resolver.resolve("nobody") is None
+        assert resolver.resolve("nobody") is None
+        assert len(responses.calls) == 1
+
+    @responses.activate
+    def test_expired_resolutions_are_searched_again(self, leaderboard_search_payload):
+        responses.add(responses.GET, LEADERBOARD_URL, json=leaderboard_search_payload, status=200)
+        resolver = ProfileResolver(ttl=0)
+
+        resolver.resolve("GL.TheViper")
+        resolver.resolve("GL.TheViper")
+        assert len(responses.calls) == 2
+
+    @responses.activate
+    def test_least_recently_used_are_evicted(self, leaderboard_search_payload):
+        responses.add(responses.GET, LEADERBOARD_URL, json=leaderboard_search_payload, status=200)
+        resolver = ProfileResolver(max_size=2)
+
+        for name in ("a", "b", "a", "c"):
+            resolver.resolve(name)
+        assert len(resolver) == 2
+        resolver.resolve("a")
+        assert len(responses.calls) == 3  # 'b' was evicted, not 'a'
+
+    @responses.activate
+    def test_clear(self, leaderboard_search_payload):
+        responses.add(responses.GET, LEADERBOARD_URL, json=leaderboard_search_payload, status=200)
+        resolver = ProfileResolver()
+
+        resolver.resolve("GL.TheViper")
+        resolver.clear()
+        assert len(resolver) == 0
+        assert resolver.misses == 1
+
+    @responses.activate
+    def test_search_errors_are_raised(self):
+        responses.add(responses.GET, LEADERBOARD_URL, json={"error": "unavailable"}, status=500)
+
+        with pytest.raises(Aoe2NetError):
+            ProfileResolver().resolve("GL.TheViper")
+
+    @responses.activate
+    @pytest.mark.parametrize(
+        "params",
+        [
+            {"search": None, "steam_id": None, "profile_id": 459658},
+            {"search": "GL.TheViper", "steam_id": 76561199003184910, "profile_id": None},
+            {"search": "GL.TheViper", "steam_id": None, "profile_id": 459658},
+        ],
+    )
+    def test_rewrite_leaves_identified_queries(self, params):
+        assert ProfileResolver().rewrite(params) is params
+        assert len(responses.calls) == 0
+
+    @responses.activate
+    def test_rewrite_leaves_unknown_names(self):
+        responses.add(responses.GET, LEADERBOARD_URL, json=EMPTY_LEADERBOARD, status=200)
+        params = {"game": "aoe2de", "leaderboard_id": 3, "search": "nobody"}
+
+        assert ProfileResolver().rewrite(params) is params
+
+    @responses.activate
+    def test_rewrite_uses_game_and_leaderboard(self, leaderboard_search_payload):
+        responses.add(responses.GET, LEADERBOARD_URL, json=leaderboard_search_payload, status=200)
+        params = {"game": "aoe2hd", "leaderboard_id": 4, "search": "GL.TheViper", "profile_id": None}
+
+        assert ProfileResolver().rewrite(params) == {
+            "game": "aoe2hd",
+            "leaderboard_id": 4,
+            "search": None,
+            "profile_id": 196240,
+        }
+        assert responses.calls[0].request.params["game"] == "aoe2hd"
+        assert responses.calls[0].request.params["leaderboard_id"] == "4"
+
+    @responses.activate
+    def test_missing_leaderboard_defaults_to_random_map(self, leaderboard_search_payload):
+        responses.add(responses.GET, LEADERBOARD_URL, json=leaderboard_search_payload, status=200)
+        resolver = ProfileResolver()
+
+        assert resolver.rewrite({"search": "GL.TheViper", "leaderboard_id": None})["profile_id"] == 196240
+        assert resolver.resolve("GL.TheViper", leaderboard_id=None) == 196240
+        assert responses.calls[0].request.params["leaderboard_id"] == "3"
+        assert resolver.hits == 1
+
+
+class TestClientsWithResolver:
+    @responses.activate
+    def test_nightbot_queries_by_profile_id(self, leaderboard_search_payload):
+        responses.add(responses.GET, LEADERBOARD_URL, json=leaderboard_search_payload, status=200)
+        responses.add(responses.GET, RANK_URL, body="GL.TheViper (2501) Rank #1", status=200)
+        client = AoE2NightbotAPI(resolver=ProfileResolver())
+
+        for _ in range(3):
+            assert client.rank(search="GL.TheViper") == "GL.TheViper (2501) Rank #1"
+
+        rank_calls = [call for call in responses.calls if call.request.url.startswith(RANK_URL)]
+        assert len(responses.calls) - len(rank_calls) == 1  # a single name search
+        for call in rank_calls:
+            assert "search" not in call.request.params
+            assert call.request.params["profile_id"] == "196240"
+
+    @responses.activate
+    def test_nightbot_unknown_names_are_searched(self):
+        responses.add(responses.GET, LEADERBOARD_URL, json=EMPTY_LEADERBOARD, status=200)
+        responses.add(responses.GET, RANK_URL, body="Player not found", status=200)
+        client = AoE2NightbotAPI(resolver=ProfileResolver())
+
+        assert client.rank(search="nobody") == "Player not found"
+        assert responses.calls[-1].request.params["search"] == "nobody"
+
+    @responses.activate
+    def test_nightbot_overview_resolves_once(self, leaderboard_search_payload):
+        responses.add(responses.GET, LEADERBOARD_URL, json=leaderboard_search_payload, status=200)
+        for endpoint in ("rank", "opponent", "match", "civs", "map"):
+            url = f"https://aoe2.net/api/nightbot/{endpoint}"
+            responses.add(responses.GET, url, body=endpoint, status=200)
+        client = AoE2NightbotAPI(resolver=ProfileResolver())
+
+        overview = client.overview(search="GL.TheViper")
+        assert overview.rank == "rank"
+        assert overview.map == "map"
+        assert len(responses.calls) == 6
+        assert client.resolver.misses == 1
+
+    @responses.activate
+    def test_leaderboard_queries_by_profile_id(
+        self, leaderboard_search_payload, leaderboard_profileid_payload
+    ):
+        responses.add(responses.GET, LEADERBOARD_URL, json=leaderboard_search_payload, status=200)
+        client = AoE2NetAPI(resolver=ProfileResolver())
+        client.resolver.resolve("GL.TheViper")
+        responses.replace(responses.GET, LEADERBOARD_URL, json=leaderboard_profileid_payload, status=200)
+
+        result = client.leaderboard(search="GL.TheViper")
+        assert result == LeaderBoardResponse(**leaderboard_profileid_payload)
+        assert len(responses.calls) == 2
+        assert "search" not in responses.calls[-1].request.params
+        assert responses.calls[-1].request.params["profile_id"] == "196240"
+
+    @responses.activate
+    def test_resolver_of_its_own_client(self, leaderboard_search_payload):
+        responses.add(responses.GET, LEADERBOARD_URL, json=leaderboard_search_payload, status=200)
+        client = AoE2NetAPI()
+        client.resolver = ProfileResolver(client=client)
+
+        client.leaderboard(search="GL.TheViper")
+        assert len(responses.calls) == 2
+        assert responses.calls[0].request.params["search"] == "GL.TheViper"  # the resolution's search
+        assert responses.calls[1].request.params["profile_id"] == "196240"
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from aoe2netwrapper.models import LeaderBoardResponse
+from aoe2netwrapper.snapshot import LeaderBoardSnapshot
+
+
+@pytest.fixture
+def leaderboard(leaderboard_defaults_payload) -> LeaderBoardResponse:
+    return LeaderBoardResponse(**leaderboard_defaults_payload)
+
+
+class TestLeaderBoardSnapshot:
+    def test_round_trip(self, tmp_path, leaderboard):
+        snapshot = LeaderBoardSnapshot.write(tmp_path / "ladder.snap", leaderboard)
+
+        assert len(snapshot) == len(leaderboard.leaderboard)
+        assert snapshot.leaderboard_id == leaderboard.leaderboard_id
+        assert snapshot.total == leaderboard.total
+        for spot, expected in zip(snapshot, leaderboard.leaderboard, strict=True):
+            assert spot == expected.model_copy(update={"icon": None})
+
+    def test_columns_are_memory_mapped(self, tmp_path, leaderboard):
+        LeaderBoardSnapshot.write(tmp_path / "ladder.snap", leaderboard)
+        snapshot = LeaderBoardSnapshot(tmp_path / "ladder.snap")
+        ratings = snapshot.column("rating")
+
+        assert isinstance(snapshot.records, np.memmap)
+        assert np.shares_memory(ratings, snapshot.records)
+        assert not ratings.flags.writeable
+        assert ratings.tolist() == [spot.rating for spot in leaderboard.leaderboard]
+        assert snapshot.string(int(snapshot.column("name")[0])) == leaderboard.leaderboard[0].name
+
+    def test_missing_values_and_shared_strings(self, tmp_path, leaderboard):
+        spots = [
+            leaderboard.leaderboard[0].model_copy(update={"clan": None, "streak": None, "country": "FR"}),
+            leaderboard.leaderboard[1].model_copy(update={"country": "FR"}),
+        ]
+        snapshot = LeaderBoardSnapshot.write(tmp_path / "ladder.snap", spots, leaderboard_id=3)
+
+        assert snapshot[0].clan is None
+        assert snapshot[0].streak is None
+        assert snapshot.column("country")[0] == snapshot.column("country")[1]
+        assert snapshot.leaderboard_id == 3
+        assert snapshot.column("streak")[0] == snapshot.missing_value("streak")
+        with pytest.raises(KeyError):
+            snapshot.missing_value("name")
+
+    def test_empty_snapshot(self, tmp_path):
+        snapshot = LeaderBoardSnapshot.write(tmp_path / "ladder.snap", [])
+        assert len(snapshot) == 0
+        assert list(snapshot) == []
+
+    def test_unknown_column(self, tmp_path, leaderboard, caplog):
+        snapshot = LeaderBoardSnapshot.write(tmp_path / "ladder.snap", leaderboard)
+        with pytest.raises(KeyError):
+            snapshot.column("icon")
+
+        for record in caplog.records:
+            assert record.levelname == "ERROR"
+            assert "is not stored in leaderboard snapshots" in caplog.text
+
+    def test_invalid_file(self, tmp_path):
+        (tmp_path / "other.bin").write_bytes(b"NOTASNAPSHOT")
+        with pytest.raises(ValueError):
+            LeaderBoardSnapshot(tmp_path / "other.bin")
+
+    def test_overflow(self, tmp_path, leaderboard):
+        spots = [leaderboard.leaderboard[0].model_copy(update={"rating": 2**40})]
+        with pytest.raises(OverflowError):
+            LeaderBoardSnapshot.write(tmp_path / "ladder.snap", spots)
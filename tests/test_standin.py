@@ -0,0 +1,102 @@
+import pytest
+
+from aoe2netwrapper.api import AoE2NetAPI, _iter_leaderboard_pages
+from aoe2netwrapper.exceptions import Aoe2NetError, NightBotError
+from aoe2netwrapper.nightbot import AoE2NightbotAPI
+from aoe2netwrapper.standin import StandInServer
+
+
+@pytest.fixture(scope="module")
+def server():
+    with StandInServer(num_players=500, history_length=100) as standin:
+        yield standin
+
+
+class TestAoE2NetRoutes:
+    def test_point_client(self, server):
+        client = server.point(AoE2NetAPI())
+
+        assert client._LEADERBOARD_ENDPOINT == server.url + "/leaderboard"
+        assert AoE2NetAPI._LEADERBOARD_ENDPOINT == "https://aoe2.net/api/leaderboard"
+
+    def test_strings(self, server):
+        strings = server.point(AoE2NetAPI()).strings()
+        assert strings.language == "en"
+        assert strings.civ[0].string == "Aztecs"
+
+    def test_paginated_leaderboard(self, server):
+        client = server.point(AoE2NetAPI())
+        pages = list(_iter_leaderboard_pages(client, page_size=200))
+        spots = [spot for page in pages for spot in page.leaderboard]
+
+        assert len(pages) == 3
+        assert [spot.rank for spot in spots] == list(range(1, 501))
+        assert [spot.rating for spot in spots] == sorted((spot.rating for spot in spots), reverse=True)
+
+    def test_leaderboard_lookups(self, server):
+        client = server.point(AoE2NetAPI())
+        spot = client.leaderboard(profile_id=1_000_042).leaderboard[0]
+
+        assert client.leaderboard(steam_id=spot.steam_id).leaderboard[0] == spot
+        assert spot.name in [found.name for found in client.leaderboard(search=spot.name).leaderboard]
+
+    def test_match_history(self, server):
+        client = server.point(AoE2NetAPI())
+        first = client.match_history(profile_id=1_000_000, start=0, count=10)
+        second = client.match_history(profile_id=1_000_000, start=10, count=10)
+        matches = first + second
+
+        assert len(matches) == 20
+        assert [match.started for match in matches] == sorted((m.started for m in matches), reverse=True)
+        assert all(1_000_000 in [player.profile_id for player in match.players] for match in matches)
+        oldest = client.match_history(profile_id=1_000_000, start=95, count=10)
+        assert len(oldest) == 5
+        assert oldest[-1].match_id == 1_000_000 * 100 + 1
+
+    def test_rating_history(self, server):
+        client = server.point(AoE2NetAPI())
+        player = client.leaderboard(profile_id=1_000_007).leaderboard[0]
+        points = client.rating_history(profile_id=1_000_007, count=1_000)
+
+        assert len(points) == 100
+        assert points[0].rating == player.rating
+        assert [point.timestamp for point in points] == sorted((p.timestamp for p in points), reverse=True)
+
+
+class TestNightbotRoutes:
+    def test_rank(self, server):
+        client = server.point(AoE2NightbotAPI())
+        text = client.rank(profile_id=1_000_000, flag="false")
+        assert text.startswith("Player00000 (")
+        assert "Rank #1," in text
+
+    def test_other_routes(self, server):
+        client = server.point(AoE2NightbotAPI())
+        assert " -VS- " in client.match(search="player00003")
+        assert " -VS- " in client.civs(profile_id=1_000_003)
+        assert client.map(profile_id=1_000_003) in ("Arabia", "Archipelago", "Arena", "Nomad")
+        assert "Rank #" in client.opponent(steam_id=76_561_198_000_000_003)
+        assert client.rank(profile_id=1) == "Player not found"
+
+
+class TestInjection:
+    def test_errors(self):
+        with StandInServer(num_players=10, error_rate=1.0) as server:
+            with pytest.raises(Aoe2NetError):
+                server.point(AoE2NetAPI()).strings()
+            with pytest.raises(NightBotError):
+                server.point(AoE2NightbotAPI()).rank(profile_id=1_000_000)
+
+    def test_throttling(self):
+        with StandInServer(num_players=10, max_requests_per_second=2) as server:
+            client = server.point(AoE2NetAPI())
+            client.strings()
+            client.strings()
+            with pytest.raises(Aoe2NetError):
+                client.strings()
+            assert server.requests_served == 3
+
+    def test_latency(self):
+        with StandInServer(num_players=10, latency=0.1) as server:
+            client = server.point(AoE2NetAPI())
+            assert client.session.get(server.url + "/strings").elapsed.total_seconds() >= 0.1
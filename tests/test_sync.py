@@ -0,0 +1,177 @@
+import json
+
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+import responses
+
+from aoe2netwrapper.sync import InMemoryRatingStore, MatchHighWaterMark, MatchHistorySync, RatingHistorySync
+
+
+def _paginated_callback(items: list[dict]):
+    """Serve the given items (most recent first), honoring the 'start' and 'count' parameters."""
+
+    def callback(request):
+        params = parse_qs(urlparse(request.url).query)
+        start, count = int(params["start"][0]), int(params["count"][0])
+        return 200, {}, json.dumps(items[start : start + count])
+
+    return callback
+
+
+def _requested_counts() -> list[int]:
+    return [int(parse_qs(urlparse(call.request.url).query)["count"][0]) for call in responses.calls]
+
+
+@pytest.fixture
+def matches() -> list[dict]:
+    """A history of 100 matches, most recent first."""
+    return [{"match_id": 1_000 + i, "started": 1_600_000_000 + 60 * i} for i in reversed(range(100))]
+
+
+class TestMatchHistorySync:
+    @responses.activate
+    def test_first_sync_fetches_one_page(self, matches):
+        responses.add_callback(
+            responses.GET, "https://aoe2.net/api/player/matches", callback=_paginated_callback(matches)
+        )
+        syncer = MatchHistorySync(min_page_size=10)
+        new = syncer.fetch_new(459658)
+
+        assert [match.match_id for match in new] == [1099 - i for i in range(10)]
+        assert syncer.marks[459658].match_id == 1099
+        assert len(responses.calls) == 1
+
+    @responses.activate
+    def test_only_new_matches_are_fetched(self, matches):
+        history = list(matches)
+        responses.add_callback(
+            responses.GET, "https://aoe2.net/api/player/matches", callback=_paginated_callback(history)
+        )
+        syncer = MatchHistorySync(min_page_size=10)
+        syncer.fetch_new(459658)
+
+        history[:0] = [{"match_id": 2_000 + i, "started": 1_700_000_000 + i} for i in reversed(range(3))]
+        new = syncer.fetch_new(459658)
+
+        assert [match.match_id for match in new] == [2002, 2001, 2000]
+        assert syncer.marks[459658].match_id == 2002
+        assert len(responses.calls) == 2
+        assert syncer.fetch_new(459658) == []
+
+    @responses.activate
+    def test_busy_players_get_wider_pages(self, matches):
+        history = list(matches)
+        responses.add_callback(
+            responses.GET, "https://aoe2.net/api/player/matches", callback=_paginated_callback(history)
+        )
+        syncer = MatchHistorySync(min_page_size=5)
+        syncer.fetch_new(459658)
+
+        history[:0] = [{"match_id": 2_000 + i, "started": 1_700_000_000 + i} for i in reversed(range(12))]
+        new = syncer.fetch_new(459658)
+
+        assert len(new) == 12
+        assert _requested_counts() == [5, 5, 10]
+        assert syncer.marks[459658].page_size == 10
+
+        responses.calls.reset()
+        syncer.fetch_new(459658)  # nothing new, page size narrows back down
+        assert _requested_counts() == [10]
+        assert syncer.marks[459658].page_size == 5
+
+    @responses.activate
+    def test_max_pages(self, matches):
+        history = list(matches)
+        responses.add_callback(
+            responses.GET, "https://aoe2.net/api/player/matches", callback=_paginated_callback(history)
+        )
+        syncer = MatchHistorySync(min_page_size=2, max_page_size=2, max_pages=3)
+        syncer.fetch_new(459658)
+        history[:0] = [{"match_id": 2_000 + i, "started": 1_700_000_000 + i} for i in reversed(range(20))]
+
+        assert len(syncer.fetch_new(459658)) == 6
+
+    @responses.activate
+    def test_load_persisted_marks(self, matches):
+        responses.add_callback(
+            responses.GET, "https://aoe2.net/api/player/matches", callback=_paginated_callback(matches)
+        )
+        syncer = MatchHistorySync()
+        mark = MatchHighWaterMark(profile_id=1, match_id=1095, started=None, page_size=10)
+        syncer.load([mark.model_dump()])
+        result = syncer.sync([1])
+
+        assert [match.match_id for match in result[1]] == [1099, 1098, 1097, 1096]
+
+
+@pytest.fixture
+def rating_points() -> list[dict]:
+    """A rating history of 50 points, most recent first."""
+    return [
+        {"rating": 1_500 + i, "num_wins": i, "num_losses": 0, "timestamp": 1_600_000_000 + 60 * i}
+        for i in reversed(range(50))
+    ]
+
+
+class TestRatingHistorySync:
+    @responses.activate
+    def test_first_sync_fetches_whole_history(self, rating_points):
+        responses.add_callback(
+            responses.GET,
+            "https://aoe2.net/api/player/ratinghistory",
+            callback=_paginated_callback(rating_points),
+        )
+        syncer = RatingHistorySync(max_page_size=20)
+        new = syncer.fetch_new(459658)
+
+        assert len(new) == 50
+        assert [point.timestamp for point in new] == sorted(point.timestamp for point in new)
+        assert syncer.store.last_timestamp(459658, 3) == rating_points[0]["timestamp"]
+        assert _requested_counts() == [20, 20, 20]
+
+    @responses.activate
+    def test_only_new_points_are_appended(self, rating_points):
+        history = list(rating_points)
+        responses.add_callback(
+            responses.GET,
+            "https://aoe2.net/api/player/ratinghistory",
+            callback=_paginated_callback(history),
+        )
+        syncer = RatingHistorySync(min_page_size=2)
+        syncer.fetch_new(459658)
+        responses.calls.reset()
+
+        history[:0] = [{"rating": 1_600 + i, "timestamp": 1_700_000_000 + i} for i in reversed(range(5))]
+        new = syncer.fetch_new(459658)
+
+        assert [point.rating for point in new] == [1_600, 1_601, 1_602, 1_603, 1_604]
+        assert _requested_counts() == [2, 4]  # growing pages until overlap
+        assert len(syncer.store.get(459658, 3)) == 55
+        assert syncer.store.get(459658, 3)[-1].rating == 1_604
+        assert syncer.fetch_new(459658) == []
+
+    @responses.activate
+    def test_max_pages(self, rating_points):
+        responses.add(  # an upstream ignoring 'start', which keeps returning the same full page
+            responses.GET, "https://aoe2.net/api/player/ratinghistory", json=rating_points[:10], status=200
+        )
+        syncer = RatingHistorySync(max_page_size=10, max_pages=3)
+
+        assert len(syncer.fetch_new(459658)) == 10
+        assert len(responses.calls) == 3
+
+    @responses.activate
+    def test_series_are_per_leaderboard(self, rating_points):
+        responses.add_callback(
+            responses.GET,
+            "https://aoe2.net/api/player/ratinghistory",
+            callback=_paginated_callback(rating_points),
+        )
+        store = InMemoryRatingStore()
+        syncer = RatingHistorySync(store=store)
+        result = syncer.sync([1, 2], leaderboard_id=4)
+
+        assert set(result) == {1, 2}
+        assert store.last_timestamp(1, 3) is None
+        assert len(store.get(2, 4)) == 50
@@ -0,0 +1,116 @@
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from aoe2netwrapper.converters import Convert
+from aoe2netwrapper.models import RatingTimePoint
+from aoe2netwrapper.sync import RatingHistorySync
+from aoe2netwrapper.timeseries import RatingSeriesStore
+
+
+@pytest.fixture
+def rating_points(rating_history_profileid_payload) -> list[RatingTimePoint]:
+    """The rating history points of the test payload, oldest first."""
+    return [RatingTimePoint(**point) for point in reversed(rating_history_profileid_payload)]
+
+
+class TestRatingSeriesStore:
+    def test_dataframe_matches_converter(self, rating_points, rating_history_converted):
+        store = RatingSeriesStore()
+        store.append(459658, 3, rating_points)
+
+        pd.testing.assert_frame_equal(store.to_dataframe(459658, 3), rating_history_converted)
+        assert Convert.rating_history(rating_points[::-1]).equals(store.to_dataframe(459658, 3))
+
+    def test_save_and_memory_map(self, tmp_path, rating_points, rating_history_converted):
+        path = tmp_path / "ratings.bin"
+        store = RatingSeriesStore(path)
+        store.append(459658, 3, rating_points[:60])
+        store.append(1, 4, rating_points[:5])
+        store.save()
+
+        reopened = RatingSeriesStore(path)
+        assert reopened.keys() == [(1, 4), (459658, 3)]
+        assert isinstance(reopened._columns["rating"], np.memmap)
+        assert reopened.last_timestamp(459658, 3) == rating_points[59].timestamp
+
+        reopened.append(459658, 3, rating_points[60:])  # kept in memory until saved
+        pd.testing.assert_frame_equal(reopened.to_dataframe(459658, 3), rating_history_converted)
+        reopened.save()
+        saved = RatingSeriesStore(path).to_dataframe(459658, 3)
+        pd.testing.assert_frame_equal(saved, rating_history_converted)
+
+    def test_packed_size(self, tmp_path, rating_points):
+        store = RatingSeriesStore()
+        store.append(459658, 3, rating_points)
+        path = store.save(tmp_path / "ratings.bin")
+
+        assert path.stat().st_size < 14 * len(rating_points) + 2_048
+
+    def test_range_queries(self, rating_points):
+        store = RatingSeriesStore()
+        store.append(459658, 3, rating_points)
+        start, end = rating_points[10].timestamp, rating_points[20].timestamp
+
+        arrays = store.series(459658, 3, start=start, end=end)
+        assert arrays["timestamp"].tolist() == [point.timestamp for point in rating_points[10:20]]
+        assert arrays["rating"].tolist() == [point.rating for point in rating_points[10:20]]
+
+        as_datetime = store.series(459658, 3, start=datetime.fromtimestamp(start, tz=timezone.utc))
+        assert len(as_datetime["timestamp"]) == 90
+        assert len(store.series(459658, 3, end=0)["timestamp"]) == 0
+        assert len(store.series(1, 3)["rating"]) == 0
+
+    def test_append_out_of_order(self, rating_points):
+        store = RatingSeriesStore()
+        store.append(459658, 3, rating_points[10:])
+        with pytest.raises(ValueError):
+            store.append(459658, 3, rating_points[:10])
+
+    def test_save_without_path(self):
+        with pytest.raises(ValueError):
+            RatingSeriesStore().save()
+
+    def test_invalid_file(self, tmp_path):
+        path = tmp_path / "not_a_store.bin"
+        path.write_bytes(b"definitely not a store")
+        with pytest.raises(ValueError):
+            RatingSeriesStore(path)
+
+    def test_delta_overflow(self, tmp_path):
+        store = RatingSeriesStore()
+        points = [RatingTimePoint(rating=0, timestamp=1), RatingTimePoint(rating=40_000, timestamp=2)]
+        store.append(1, 3, points)
+        with pytest.raises(OverflowError):
+            store.save(tmp_path / "ratings.bin")
+
+    def test_missing_values_stay_missing(self, tmp_path):
+        ratings = [None, 1800, None, 1816, 1820, None]
+        points = [
+            RatingTimePoint(
+                rating=rating, num_wins=position, num_losses=0, streak=1, drops=0, timestamp=position
+            )
+            for position, rating in enumerate(ratings)
+        ]
+        expected = Convert.rating_history(points[::-1])
+        store = RatingSeriesStore(tmp_path / "ratings.bin")
+        store.append(1, 3, points[:3])
+        store.save()
+        store.append(1, 3, points[3:])  # the series spans the saved file and the pending points
+
+        assert store.series(1, 3)["rating"].tolist() == ratings
+        pd.testing.assert_frame_equal(store.to_dataframe(1, 3), expected)
+        store.save()
+        saved = RatingSeriesStore(tmp_path / "ratings.bin")
+        assert saved.series(1, 3)["rating"].tolist() == ratings
+        assert saved.series(1, 3)["num_wins"].tolist() == list(range(6))
+        pd.testing.assert_frame_equal(saved.to_dataframe(1, 3), expected)
+
+    def test_as_sync_store(self, rating_points):
+        store = RatingSeriesStore()
+        syncer = RatingHistorySync(store=store)
+        store.append(459658, 3, rating_points)
+
+        assert syncer.store.last_timestamp(459658, 3) == rating_points[-1].timestamp
@@ -0,0 +1,90 @@
+import gzip
+import json
+
+import pytest
+import requests
+import responses
+
+from aoe2netwrapper.api import AoE2NetAPI
+from aoe2netwrapper.exceptions import NightBotError
+from aoe2netwrapper.nightbot import AoE2NightbotAPI
+from aoe2netwrapper.transport import CassetteAdapter, use_cassettes
+
+
+class TestExceptions:
+    def test_invalid_mode(self, tmp_path, caplog):
+        with pytest.raises(ValueError):
+            CassetteAdapter(tmp_path, mode="rewind")
+
+        for record in caplog.records:
+            assert record.levelname == "ERROR"
+            assert "Invalid cassette mode" in caplog.text
+
+    def test_replay_missing_cassette(self, tmp_path, caplog):
+        client = use_cassettes(AoE2NetAPI(), tmp_path, mode="replay")
+        with pytest.raises(requests.exceptions.ConnectionError):
+            client.strings()
+
+        for record in caplog.records:
+            assert record.levelname == "ERROR"
+            assert "No cassette recorded" in caplog.text
+
+
+class TestCassettes:
+    @responses.activate
+    def test_record_then_replay(self, tmp_path, leaderboard_defaults_payload):
+        responses.add(
+            responses.GET, "https://aoe2.net/api/leaderboard", json=leaderboard_defaults_payload, status=200
+        )
+        recorded = use_cassettes(AoE2NetAPI(), tmp_path, mode="record").leaderboard()
+        cassettes = list(tmp_path.glob("*.json.gz"))
+        assert len(cassettes) == 1
+        with gzip.open(cassettes[0], "rt") as fileobj:
+            assert json.load(fileobj)["status_code"] == 200
+
+        responses.reset()  # any request reaching the network layer would now fail
+        replayed = use_cassettes(AoE2NetAPI(), tmp_path, mode="replay").leaderboard()
+        assert replayed == recorded
+        assert len(responses.calls) == 0
+
+    def test_parameter_order_does_not_matter(self, tmp_path):
+        adapter = CassetteAdapter(tmp_path)
+        first = requests.Request("GET", "https://aoe2.net/api/leaderboard?game=aoe2de&start=1").prepare()
+        second = requests.Request("GET", "https://aoe2.net/api/leaderboard?start=1&game=aoe2de").prepare()
+        other = requests.Request("GET", "https://aoe2.net/api/leaderboard?start=2&game=aoe2de").prepare()
+
+        assert adapter.cassette_path(first) == adapter.cassette_path(second)
+        assert adapter.cassette_path(first) != adapter.cassette_path(other)
+
+    @responses.activate
+    def test_nightbot_text_and_errors(self, tmp_path):
+        responses.add(responses.GET, "https://aoe2.net/api/nightbot/rank", body="🇳🇴 GL.TheViper", status=200)
+        responses.add(responses.GET, "https://aoe2.net/api/nightbot/map", body="Oops", status=500)
+        recorder = use_cassettes(AoE2NightbotAPI(), tmp_path, mode="record")
+        recorder.rank(profile_id=196240)
+        with pytest.raises(NightBotError):
+            recorder.map(profile_id=196240)
+
+        responses.reset()
+        replayer = use_cassettes(AoE2NightbotAPI(), tmp_path, mode="replay")
+        assert replayer.rank(profile_id=196240) == "🇳🇴 GL.TheViper"
+        with pytest.raises(NightBotError):
+            replayer.map(profile_id=196240)
+
+    @responses.activate
+    def test_replay_latency(self, tmp_path, strings_defaults_payload):
+        responses.add(
+            responses.GET, "https://aoe2.net/api/strings", json=strings_defaults_payload, status=200
+        )
+        use_cassettes(AoE2NetAPI(), tmp_path, mode="record").strings()
+        cassette = next(tmp_path.glob("*.json.gz"))
+        with gzip.open(cassette, "rt") as fileobj:
+            content = json.load(fileobj)
+        with gzip.open(cassette, "wt") as fileobj:
+            json.dump(dict(content, elapsed=0.2), fileobj)
+
+        responses.reset()
+        response = use_cassettes(AoE2NetAPI(), tmp_path, mode="replay", latency=True).session.get(
+            "https://aoe2.net/api/strings?game=aoe2de"
+        )
+        assert response.elapsed.total_seconds() >= 0.2
@@ -0,0 +1,113 @@
+import pandas as pd
+import pytest
+
+from aoe2netwrapper.models import MatchLobby
+from aoe2netwrapper.winrates import WinRates, aggregate_matches, aggregate_parquet
+from aoe2netwrapper.writers import ParquetWriter
+
+
+@pytest.fixture
+def matches(match_history_profileid_payload) -> list[MatchLobby]:
+    return [MatchLobby(**match) for match in match_history_profileid_payload]
+
+
+def _reference(matches: list[MatchLobby], column: str, bracket_width: int = 100) -> pd.DataFrame:
+    """Win and game counts computed one player at a time, without any deduplication."""
+    rows = [
+        {
+            "civ": player.civ,
+            "map_type": match.map_type,
+            "bracket": None if player.rating is None else player.rating // bracket_width * bracket_width,
+            "won": player.won,
+        }
+        for match in matches
+        for player in match.players
+        if player.won is not None
+    ]
+    dframe = pd.DataFrame(rows).dropna(subset=[column])
+    dframe[column] = dframe[column].astype("int64")
+    return dframe.groupby(column).agg(wins=("won", "sum"), games=("won", "size"))
+
+
+class TestAggregateMatches:
+    @pytest.mark.parametrize("column", ["civ", "map_type", "bracket"])
+    def test_counts_match_reference(self, matches, column):
+        result = aggregate_matches([matches], workers=1)
+        table = result.table(column)
+        pd.testing.assert_frame_equal(table[["wins", "games"]], _reference(matches, column))
+        assert (table["win_rate"] == table["wins"] / table["games"]).all()
+        assert result.matches == len(matches)
+
+    def test_matches_are_deduplicated_across_streams(self, matches):
+        single = aggregate_matches([matches], workers=1)
+        overlapping = aggregate_matches([matches[:6], matches, matches[4:]], workers=1)
+
+        assert overlapping.matches == len(matches)
+        for dimension in single.counts:
+            pd.testing.assert_frame_equal(overlapping.table(*dimension), single.table(*dimension))
+
+    def test_known_outcome_is_kept_over_unknown(self, matches):
+        pending = matches[0].model_copy(
+            update={"players": [player.model_copy(update={"won": None}) for player in matches[0].players]}
+        )
+        result = aggregate_matches([[pending], matches], workers=1)
+        assert result.table("civ")["games"].sum() == _reference(matches, "civ")["games"].sum()
+
+    def test_combined_dimensions_and_brackets(self, matches):
+        result = aggregate_matches([matches], bracket_width=500, dimensions=[("civ", "bracket")], workers=1)
+        table = result.table("civ", "bracket")
+        assert table.index.names == ["civ", "bracket"]
+        assert set(table.index.get_level_values("bracket")) <= {1500, 2000, 2500}
+        assert table["games"].sum() == _reference(matches, "civ")["games"].sum()
+
+    def test_process_pool_gives_same_counts(self, matches):
+        inline = aggregate_matches([matches], workers=1)
+        pooled = aggregate_matches([matches, matches], workers=3)
+
+        assert pooled.matches == inline.matches
+        for dimension in inline.counts:
+            pd.testing.assert_frame_equal(pooled.table(*dimension), inline.table(*dimension))
+
+    def test_invalid_dimension(self, matches):
+        with pytest.raises(ValueError, match="rms"):
+            aggregate_matches([matches], dimensions=[("civ", "rms")], workers=1)
+
+
+class TestAggregateParquet:
+    def test_parquet_partitions_match_streams(self, tmp_path, matches, match_history_converted):
+        writer = ParquetWriter(tmp_path)
+        writer.match_history(match_history_converted)
+        writer.match_history(match_history_converted.iloc[:10])  # overlapping crawl
+        (tmp_path / "match_history" / ".ignored.parquet").write_bytes(b"not a parquet file")
+
+        from_parquet = aggregate_parquet([tmp_path / "match_history"], workers=2)
+        from_streams = aggregate_matches([matches], workers=1)
+
+        assert from_parquet.matches == from_streams.matches
+        for dimension in from_streams.counts:
+            pd.testing.assert_frame_equal(from_parquet.table(*dimension), from_streams.table(*dimension))
+
+    def test_large_ids_keep_their_precision(self, tmp_path, matches, match_history_converted):
+        codes, uniques = pd.factorize(match_history_converted["match_id"])
+        shifted = match_history_converted.assign(match_id=codes + 2**60)  # float64 cannot tell these apart
+        shifted.to_parquet(tmp_path / "history.parquet")
+
+        result = aggregate_parquet([tmp_path / "history.parquet"], workers=1)
+        assert result.matches == len(uniques)
+
+
+class TestWinRates:
+    def test_merge_sums_counts(self):
+        first = WinRates({("civ",): pd.DataFrame({"wins": [1, 2], "games": [2, 4]}, index=[1, 2])}, matches=3)
+        second = WinRates({("civ",): pd.DataFrame({"wins": [5], "games": [5]}, index=[3])}, matches=2)
+        third = WinRates({("civ",): pd.DataFrame({"wins": [1], "games": [2]}, index=[1])}, matches=1)
+
+        merged = sum([first, second, third])
+        assert merged.matches == 6
+        assert merged.table("civ")["wins"].tolist() == [2, 2, 5]
+        assert merged.table("civ")["games"].tolist() == [4, 4, 5]
+        assert merged.table("civ")["games"].dtype == "int64"
+
+    def test_missing_dimension(self):
+        with pytest.raises(KeyError):
+            WinRates().table("civ")
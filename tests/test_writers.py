@@ -0,0 +1,134 @@
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+from aoe2netwrapper.converters import _compact_dataframe
+from aoe2netwrapper.writers import ParquetWriter
+
+
+class TestParquetWriter:
+    def test_leaderboard_partitions(self, tmp_path, leaderboard_converted):
+        writer = ParquetWriter(tmp_path)
+        snapshot = datetime(2021, 1, 1, 12, tzinfo=timezone.utc)
+        written = writer.leaderboard(leaderboard_converted, snapshot_time=snapshot)
+
+        assert len(written) == 1
+        partition = tmp_path / "leaderboard" / "game=aoe2de" / "leaderboard_id=3" / "day=2021-01-01"
+        assert written[0].parent == partition
+        assert not list(tmp_path.rglob(".*.tmp"))  # no temporary file left behind
+
+    def test_leaderboard_roundtrip(self, tmp_path, leaderboard_converted):
+        writer = ParquetWriter(tmp_path)
+        writer.leaderboard(leaderboard_converted)
+        result = writer.read("leaderboard")
+
+        assert len(result) == len(leaderboard_converted)
+        assert (result["game"] == "aoe2de").all()
+        assert (result["leaderboard_id"] == 3).all()
+        assert result["profile_id"].tolist() == leaderboard_converted["profile_id"].tolist()
+        assert result["last_match"].tolist() == leaderboard_converted["last_match"].tolist()
+
+    def test_match_history_partitioned_by_start_day(self, tmp_path, match_history_converted):
+        writer = ParquetWriter(tmp_path)
+        written = writer.match_history(match_history_converted)
+        expected_days = set(match_history_converted["started"].dt.strftime("%Y-%m-%d"))
+
+        assert {path.parent.name for path in written} == {f"day={day}" for day in expected_days}
+        assert len(writer.read("match_history")) == len(match_history_converted)
+
+    def test_rating_history_selective_read(self, tmp_path, rating_history_converted):
+        writer = ParquetWriter(tmp_path)
+        writer.rating_history(rating_history_converted, leaderboard_id=3)
+        writer.rating_history(rating_history_converted, leaderboard_id=4)
+
+        filters = [("leaderboard_id", "=", 4)]
+        result = writer.read("rating_history", columns=["rating", "day"], filters=filters)
+        assert list(result.columns) == ["rating", "day"]
+        assert len(result) == len(rating_history_converted)
+
+    def test_compact_merges_partition_files(self, tmp_path, leaderboard_converted):
+        writer = ParquetWriter(tmp_path, row_group_size=4)
+        snapshot = datetime(2021, 1, 1, tzinfo=timezone.utc)
+        for _ in range(3):
+            writer.leaderboard(leaderboard_converted, snapshot_time=snapshot)
+
+        assert len(list(tmp_path.rglob("*.parquet"))) == 3
+        assert writer.compact("leaderboard") == 1
+        assert len(list(tmp_path.rglob("*.parquet"))) == 1
+        assert len(writer.read("leaderboard")) == 3 * len(leaderboard_converted)
+        assert writer.compact("leaderboard") == 0
+
+    def test_compact_handles_mixed_dtypes(self, tmp_path, leaderboard_converted):
+        writer = ParquetWriter(tmp_path)
+        snapshot = datetime(2021, 1, 1, tzinfo=timezone.utc)
+        writer.leaderboard(leaderboard_converted, snapshot_time=snapshot)
+        writer.leaderboard(leaderboard_converted.astype({"rating": "Int16"}), snapshot_time=snapshot)
+
+        writer.compact("leaderboard")
+        assert writer.read("leaderboard")["rating"].notna().all()
+
+    def test_compact_and_default_frames_share_partitions(self, tmp_path, leaderboard_converted):
+        writer = ParquetWriter(tmp_path)
+        snapshot = datetime(2021, 1, 1, tzinfo=timezone.utc)
+        writer.leaderboard(leaderboard_converted, snapshot_time=snapshot)
+        writer.leaderboard(_compact_dataframe(leaderboard_converted), snapshot_time=snapshot)
+
+        assert len(writer.read("leaderboard")) == 2 * len(leaderboard_converted)
+        assert writer.compact("leaderboard") == 1
+        result = writer.read("leaderboard")
+        assert result["clan"].tolist() == 2 * leaderboard_converted["clan"].tolist()
+
+    def test_compact_leaves_no_temporary_file(self, tmp_path, leaderboard_converted):
+        writer = ParquetWriter(tmp_path)
+        for _ in range(2):
+            writer.leaderboard(leaderboard_converted)
+        writer.compact("leaderboard")
+
+        assert [file.name.startswith("part-") for file in tmp_path.rglob("*") if file.is_file()] == [True]
+
+    def test_interrupted_compaction(self, tmp_path, leaderboard_converted, monkeypatch):
+        writer = ParquetWriter(tmp_path)
+        for _ in range(2):
+            writer.leaderboard(leaderboard_converted)
+
+        def crash(self, missing_ok=False):
+            raise KeyboardInterrupt
+
+        with monkeypatch.context() as patch:  # interrupted after the merged file is renamed into place
+            patch.setattr(Path, "unlink", crash)
+            with pytest.raises(KeyboardInterrupt):
+                writer.compact("leaderboard")
+        assert len(list(tmp_path.rglob("*.parquet"))) == 3
+        assert len(writer.read("leaderboard")) == 2 * len(leaderboard_converted)
+
+        assert writer.compact("leaderboard") == 0
+        assert len(list(tmp_path.rglob("*.parquet"))) == 1
+        assert len(writer.read("leaderboard")) == 2 * len(leaderboard_converted)
+
+    def test_failed_write_leaves_no_temporary_file(self, tmp_path, leaderboard_converted, monkeypatch):
+        def failing_write(table, where, **kwargs):
+            Path(where).write_bytes(b"PAR1")
+            raise OSError
+
+        monkeypatch.setattr(pq, "write_table", failing_write)
+        with pytest.raises(OSError):
+            ParquetWriter(tmp_path).leaderboard(leaderboard_converted)
+        assert not [file for file in tmp_path.rglob("*") if file.is_file()]
+
+    @pytest.mark.parametrize("game", ["../aoe2de", "aoe2de/x", "", "game=aoe2de"])
+    def test_invalid_game(self, tmp_path, leaderboard_converted, game):
+        with pytest.raises(ValueError, match="game"):
+            ParquetWriter(tmp_path).leaderboard(leaderboard_converted, game=game)
+        assert not list(tmp_path.rglob("*.parquet"))
+
+    def test_read_missing_dataset(self, tmp_path):
+        result = ParquetWriter(tmp_path).read("leaderboard")
+        assert isinstance(result, pd.DataFrame)
+        assert result.empty
+
+    @pytest.mark.parametrize("dataset", ["leaderboard", "match_history"])
+    def test_compact_missing_dataset(self, tmp_path, dataset):
+        assert ParquetWriter(tmp_path).compact(dataset) == 0